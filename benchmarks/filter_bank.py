@@ -0,0 +1,57 @@
+"""
+Benchmark: One Euro Filter từng kênh vs OneEuroFilterBank vectorized
+Chi phí mỗi frame khi lọc 4 giá trị (Normalizer) đến cả face mesh
+
+Chạy: python -m benchmarks.filter_bank --frames 2000
+"""
+import argparse
+import time
+import numpy as np
+from normalize import OneEuroFilter, OneEuroFilterBank
+
+
+# (tên, shape khối cần lọc)
+BLOCKS = (
+    ('normalizer', (6,)),       # cursor, neck, rotation, scale
+    ('hand', (21, 3)),          # 21 landmark tay
+    ('face_mesh', (478, 3)),    # cả face mesh (refine_landmarks=True)
+)
+
+
+def run_singles(shape, frames, values):
+    """Cách cũ: 1 OneEuroFilter cho mỗi hàng, gọi lần lượt"""
+    filters = [OneEuroFilter(min_cutoff=0.5, beta=0.01) for _ in range(shape[0])]
+    start = time.perf_counter()
+    for i in range(frames):
+        block = values[i % len(values)]
+        for row, single in enumerate(filters):
+            single(block[row], dt=1.0 / 30)
+    return time.perf_counter() - start
+
+
+def run_bank(shape, frames, values):
+    bank = OneEuroFilterBank(shape, min_cutoff=0.5, beta=0.01)
+    start = time.perf_counter()
+    for i in range(frames):
+        bank(values[i % len(values)], timestamp=i / 30.0)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"frames={args.frames}")
+    print(f"{'block':>11} {'values':>7} {'per-row us':>11} {'bank us':>8}")
+    for name, shape in BLOCKS:
+        values = rng.random((64,) + shape)
+        singles = run_singles(shape, args.frames, values)
+        bank = run_bank(shape, args.frames, values)
+        scale = 1e6 / args.frames
+        print(f"{name:>11} {int(np.prod(shape)):>7} {singles * scale:>11.1f} {bank * scale:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: số byte bị copy mỗi frame trên đường capture -> perception/MJPEG
+So sánh đường cũ (copy ở read_frame, process_loop, mỗi viewer) với Frame bất biến
+
+Chạy: python -m benchmarks.frame_copy --viewers 2
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+from camera import Frame
+
+
+RESOLUTIONS = {
+    '480p': (640, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+}
+
+
+class CopyCounter:
+    """Đếm số byte được cấp phát mới bởi copy/cvtColor"""
+    def __init__(self):
+        self.bytes = 0
+
+    def add(self, array):
+        self.bytes += array.nbytes
+        return array
+
+
+def legacy_handoff(frame_bgr, viewers, process, counter):
+    """Đường cũ: Camera.read_frame + process_loop + video_stream_handler"""
+    # Camera.read_frame
+    last_frame_bgr = counter.add(frame_bgr.copy())
+    frame_rgb = counter.add(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB))
+    # process_loop: copy vào current_frame_bgr
+    current_frame_bgr = counter.add(last_frame_bgr.copy())
+    # video_stream_handler: mỗi viewer copy 1 lần
+    for _ in range(viewers):
+        counter.add(current_frame_bgr.copy())
+    return frame_rgb if process else None
+
+
+def frame_handoff(frame_bgr, frame_id, viewers, process, counter):
+    """Đường mới: 1 Frame bất biến, consumer giữ reference"""
+    frame = Frame(frame_bgr, frame_id, time.time())
+    current_frame = frame
+    for _ in range(viewers):
+        _ = current_frame.bgr
+    if process:
+        # RGB chỉ tạo cho frame thực sự được perception xử lý
+        return counter.add(frame.rgb)
+    return None
+
+
+def run(width, height, frames, viewers, process_ratio):
+    rng = np.random.default_rng(0)
+    source = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    process_every = max(1, int(round(1.0 / process_ratio))) if process_ratio > 0 else None
+
+    results = {}
+    for name in ('legacy', 'frame'):
+        counter = CopyCounter()
+        elapsed = 0.0
+        for i in range(frames):
+            # Mỗi frame capture là 1 buffer mới (như cap.read())
+            frame_bgr = source.copy()
+            process = process_every is not None and i % process_every == 0
+            start = time.perf_counter()
+            if name == 'legacy':
+                legacy_handoff(frame_bgr, viewers, process, counter)
+            else:
+                frame_handoff(frame_bgr, i, viewers, process, counter)
+            elapsed += time.perf_counter() - start
+        results[name] = (counter.bytes / frames, elapsed / frames * 1000.0)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--viewers', type=int, default=1, help="Số client MJPEG")
+    parser.add_argument('--process-ratio', type=float, default=1.0,
+                        help="Tỉ lệ frame được perception nhận (phần còn lại bị drop)")
+    args = parser.parse_args()
+
+    print(f"viewers={args.viewers} process_ratio={args.process_ratio} frames={args.frames}")
+    print(f"{'res':>6} {'path':>7} {'MB copied/frame':>16} {'ms/frame':>9} {'MB/s @30fps':>12}")
+    for label, (width, height) in RESOLUTIONS.items():
+        results = run(width, height, args.frames, args.viewers, args.process_ratio)
+        for name, (bytes_per_frame, ms) in results.items():
+            mb = bytes_per_frame / 1e6
+            print(f"{label:>6} {name:>7} {mb:>16.2f} {ms:>9.3f} {mb * 30:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
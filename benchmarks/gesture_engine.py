@@ -0,0 +1,88 @@
+"""
+Benchmark: chi phí gesture layer mỗi frame theo số gesture trong bảng
+So đánh giá vectorized (GestureDetector.evaluate) với vòng Python từng gesture / điều kiện
+
+Chạy: python -m benchmarks.gesture_engine --rules 7 20 50 100
+"""
+import argparse
+import time
+import numpy as np
+from gesture import FEATURES, GESTURE_RULES, GestureDetector
+from motion import MotionFeatureExtractor
+
+
+def make_rules(count, seed=0):
+    """GESTURE_RULES + gesture ngẫu nhiên (3-5 điều kiện) cho đủ `count` dòng"""
+    rng = np.random.default_rng(seed)
+    rules = list(GESTURE_RULES)
+    while len(rules) < count:
+        names = rng.choice(FEATURES, size=rng.integers(3, 6), replace=False)
+        conditions = {str(name): (float(rng.uniform(-0.5, 0.2)), float(rng.uniform(0.3, 1.0)))
+                      for name in names}
+        rules.append((f'CUSTOM_{len(rules)}', conditions, bool(rng.integers(2))))
+    return rules[:count]
+
+
+def evaluate_loop(rules, features):
+    """Cách cũ: mỗi gesture 1 nhánh Python"""
+    detected = []
+    for _, conditions, _ in rules:
+        ok = True
+        for name, (lo, hi) in conditions.items():
+            value = features[FEATURES.index(name)]
+            if (lo is not None and not value > lo) or (hi is not None and not value < hi):
+                ok = False
+                break
+        detected.append(ok)
+    return detected
+
+
+def make_hands(frames, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.random((21, 3)) * 0.3 + 0.35
+    return [base + 0.01 * rng.standard_normal((21, 3)) for _ in range(frames)]
+
+
+def run(rules, hands):
+    motion = MotionFeatureExtractor()
+    detector = GestureDetector(motion, rules)
+    features = []
+    start = time.perf_counter()
+    for i, hand in enumerate(hands):
+        t = i / 30.0
+        motion.update(hand[8, 0], hand[8, 1], t)
+        detector.process(hand)   # Không cooldown: frame nào cũng đánh giá bảng
+        features.append(detector.features.copy())
+    total = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for vector in features:
+        detector.evaluate(vector)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for vector in features:
+        evaluate_loop(rules, vector)
+    loop = time.perf_counter() - start
+    return total, vectorized, loop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rules', type=int, nargs='+', default=[7, 20, 50, 100])
+    parser.add_argument('--frames', type=int, default=3000)
+    args = parser.parse_args()
+
+    hands = make_hands(args.frames)
+    run(make_rules(len(GESTURE_RULES)), hands[:50])   # Warm-up
+    print(f"frames={args.frames}")
+    print(f"{'rules':>6} {'process us':>11} {'evaluate us':>12} {'loop us':>9}")
+    for count in args.rules:
+        total, vectorized, loop = run(make_rules(count), hands)
+        scale = 1e6 / args.frames
+        print(f"{count:>6} {total * scale:>11.1f} {vectorized * scale:>12.1f} "
+              f"{loop * scale:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
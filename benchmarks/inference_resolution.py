@@ -0,0 +1,122 @@
+"""
+Benchmark: latency vs sai số landmark theo độ phân giải inference
+Chạy full-res làm tham chiếu, rồi từng scale trên cùng các clip đã ghi
+Sai số tính bằng pixel của frame gốc sau khi map landmark về (kể cả letterbox)
+--hand-roi thêm lần chạy Hands trên crop quanh tay (HandRoiTracker)
+
+Chạy: python -m benchmarks.inference_resolution clip1.mp4 frames/ --scales 1.0 0.75 0.5 --try-on
+"""
+import argparse
+import time
+import numpy as np
+from camera import open_source, PACING_FAST
+from perception import Perception
+
+
+def load_clip(spec, max_frames):
+    """Đọc trước toàn bộ clip (RGB) để các lần chạy nhận đúng cùng frame"""
+    source = open_source(spec, pacing=PACING_FAST)
+    frames = []
+    try:
+        while len(frames) < max_frames:
+            ok, bgr, _ = source.read()
+            if not ok:
+                break
+            frames.append(np.ascontiguousarray(bgr[:, :, ::-1]))
+    finally:
+        source.release()
+    return frames
+
+
+def run_clip(frames, try_on, **perception_kwargs):
+    """
+    Returns:
+        (latencies giây, list kết quả {'hands', 'face_landmarks'} theo frame)
+    """
+    # Cadence 1: đo Face Mesh mọi frame để so sánh công bằng
+    perception = Perception(parallel=False, cadence={'face_mesh': 1, 'pose': 1},
+                            **perception_kwargs)
+    latencies = []
+    outputs = []
+    try:
+        for frame_id, rgb in enumerate(frames):
+            start = time.perf_counter()
+            result = perception.process_frame(rgb, frame_id, try_on=try_on,
+                                              timestamp=frame_id / 30.0)
+            latencies.append(time.perf_counter() - start)
+            face = result['face']
+            outputs.append({
+                'hands': result['hands'],
+                'face_landmarks': None if face is None else face['landmarks']
+            })
+    finally:
+        perception.release()
+    return latencies, outputs
+
+
+def landmark_error(reference, candidate, width, height):
+    """
+    Sai số trung bình (pixel) trên các frame cả 2 lần chạy đều phát hiện
+    Returns:
+        (sai số px hoặc nan, tỉ lệ frame khớp phát hiện)
+    """
+    errors = []
+    agree = 0
+    for ref, cand in zip(reference, candidate):
+        agree += (ref is None) == (cand is None)
+        if ref is None or cand is None or ref.shape != cand.shape:
+            continue
+        delta = (cand[:, :2] - ref[:, :2]) * (width, height)
+        errors.append(np.linalg.norm(delta, axis=1).mean())
+    error = float(np.mean(errors)) if errors else float('nan')
+    return error, agree / max(1, len(reference))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('clips', nargs='*', default=['synthetic'],
+                        help="File video, thư mục ảnh hoặc 'synthetic[:WxH]'")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.35])
+    parser.add_argument('--size', default=None,
+                        help="Thêm 1 lần chạy với ảnh inference cố định WxH (letterbox)")
+    parser.add_argument('--hand-roi', action='store_true',
+                        help="Thêm 1 lần chạy full-res với Hands trên crop quanh tay")
+    parser.add_argument('--frames', type=int, default=150, help="Số frame tối đa mỗi clip")
+    parser.add_argument('--try-on', action='store_true', help="Chạy cả Face Mesh + Pose")
+    args = parser.parse_args()
+
+    configs = [(f"x{scale:g}", {'inference_scale': scale}) for scale in args.scales]
+    if args.size:
+        width, height = (int(v) for v in args.size.lower().split('x'))
+        configs.append((args.size, {'inference_size': (width, height)}))
+    if args.hand_roi:
+        configs.append(('roi', {'hand_roi': True}))
+
+    print(f"try_on={args.try_on} frames<={args.frames}")
+    print(f"{'clip':>20} {'input':>9} {'mean ms':>8} {'p95 ms':>8} "
+          f"{'hand px':>8} {'hand agr':>8} {'face px':>8} {'face agr':>8}")
+    for spec in args.clips:
+        frames = load_clip(spec, args.frames)
+        if not frames:
+            print(f"{spec:>20} không đọc được frame nào")
+            continue
+        height, width = frames[0].shape[:2]
+        _, reference = run_clip(frames, args.try_on)
+
+        for label, kwargs in configs:
+            latencies, outputs = run_clip(frames, args.try_on, **kwargs)
+            latencies = np.array(latencies) * 1000.0
+            hand_px, hand_agree = landmark_error(
+                [r['hands'] for r in reference], [o['hands'] for o in outputs], width, height
+            )
+            face_px, face_agree = landmark_error(
+                [r['face_landmarks'] for r in reference],
+                [o['face_landmarks'] for o in outputs], width, height
+            )
+            print(f"{spec[-20:]:>20} {label:>9} {latencies.mean():>8.2f} "
+                  f"{np.percentile(latencies, 95):>8.2f} {hand_px:>8.2f} {hand_agree:>8.0%} "
+                  f"{face_px:>8.2f} {face_agree:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Microbenchmark: chi phí chuyển landmark protobuf -> numpy mỗi frame
+So sánh list comprehension toàn bộ điểm (cũ) với LandmarkSet chỉ lấy index khai báo
+
+Chạy: python -m benchmarks.landmark_conversion --repeat 2000
+"""
+import argparse
+import timeit
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+from landmarks import LandmarkSet, HAND_INDICES, FACE_INDICES, POSE_INDICES
+
+
+# Số điểm MediaPipe trả về cho mỗi model
+MODELS = (
+    ('hands', 21, HAND_INDICES),
+    ('face_mesh', 478, FACE_INDICES),  # refine_landmarks=True
+    ('pose', 33, POSE_INDICES),
+)
+
+
+def make_landmark_list(count, seed=0):
+    """NormalizedLandmarkList giống output của MediaPipe"""
+    rng = np.random.default_rng(seed)
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in rng.random((count, 4)):
+        landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+    return landmark_list.landmark
+
+
+def legacy_convert(landmark_list):
+    return np.array([[lm.x, lm.y, lm.z] for lm in landmark_list])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"repeat={args.repeat}")
+    print(f"{'model':>10} {'points':>7} {'used':>5} {'legacy us':>10} "
+          f"{'full set us':>12} {'subset us':>10}")
+    total_legacy = total_subset = 0.0
+    for name, count, indices in MODELS:
+        landmark_list = make_landmark_list(count)
+        full_set = LandmarkSet(range(count))
+        subset = LandmarkSet(indices)
+        legacy = timeit.timeit(lambda: legacy_convert(landmark_list), number=args.repeat)
+        full = timeit.timeit(lambda: full_set.fill(landmark_list), number=args.repeat)
+        sparse = timeit.timeit(lambda: subset.fill(landmark_list), number=args.repeat)
+        total_legacy += legacy
+        total_subset += sparse
+        scale = 1e6 / args.repeat
+        print(f"{name:>10} {count:>7} {len(indices):>5} {legacy * scale:>10.1f} "
+              f"{full * scale:>12.1f} {sparse * scale:>10.1f}")
+    scale = 1e6 / args.repeat
+    print(f"{'TRY_ON':>10} frame total: legacy {total_legacy * scale:.1f}us, "
+          f"subset {total_subset * scale:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: chi phí hook metrics mỗi frame so với budget 1 frame
+Mô phỏng đúng số lần ghi của System._sync_logic / _emit_results / CaptureThread
+
+Chạy: python -m benchmarks.metrics_overhead --frames 20000 --fps 30
+"""
+import argparse
+import time
+from metrics import Metrics
+
+
+STAGES = ('color_convert', 'perception', 'normalize', 'motion', 'gesture', 'state')
+MODEL_TIMINGS = {'hands': 0.012, 'face_mesh': 0.01, 'pose': 0.015}
+
+
+def one_frame(metrics):
+    metrics.record('capture', 0.033)
+    metrics.record('input_lag', 0.002)
+    lap = metrics.lap()
+    for stage in STAGES:
+        lap(stage)
+    metrics.record_timings(MODEL_TIMINGS)
+    lap = metrics.lap()
+    lap('broadcast')
+
+
+def run(enabled, frames):
+    metrics = Metrics(enabled=enabled)
+    start = time.perf_counter()
+    for _ in range(frames):
+        one_frame(metrics)
+    return (time.perf_counter() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--fps', type=float, default=30.0)
+    args = parser.parse_args()
+
+    budget = 1.0 / args.fps
+    for enabled in (False, True):
+        per_frame = run(enabled, args.frames)
+        print(f"enabled={enabled!s:>5}: {per_frame * 1e6:7.1f}us/frame "
+              f"({per_frame / budget * 100:.3f}% of {budget * 1000:.1f}ms budget)")
+
+    metrics = Metrics()
+    for _ in range(1024):
+        one_frame(metrics)
+    start = time.perf_counter()
+    metrics.render()
+    print(f"render /metrics: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: chi phí /video theo số viewer, encode mỗi viewer vs MjpegBroadcaster dùng chung
+Nguồn 30 FPS; đo số lần encode / giây, frame mỗi viewer nhận / giây và độ trễ event loop
+(loop lag = heartbeat 1ms bị trễ bao lâu, tức thời gian loop bị chặn, ảnh hưởng WebSocket)
+
+Chạy: python -m benchmarks.mjpeg_viewers --viewers 1 2 4 8 --size 1280x720
+"""
+import argparse
+import asyncio
+import time
+import cv2
+import numpy as np
+from camera import Frame
+from mjpeg import MjpegBroadcaster
+
+
+class NullResponse:
+    """StreamResponse giả: chỉ đếm part"""
+    def __init__(self):
+        self.parts = 0
+
+    async def write(self, data):
+        self.parts += 1
+
+
+class Source:
+    """Frame mới mỗi 1/fps giây (ảnh có nhiễu để JPEG tốn như camera thật)"""
+    def __init__(self, width, height, fps, on_frame=None):
+        rng = np.random.default_rng(0)
+        self.images = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(4)]
+        self.interval = 1.0 / fps
+        self.on_frame = on_frame
+        self.current = None
+
+    async def run(self):
+        frame_id = 0
+        while True:
+            frame_id += 1
+            self.current = Frame(self.images[frame_id % len(self.images)].copy(), frame_id,
+                                 time.time())
+            if self.on_frame is not None:
+                self.on_frame(self.current)
+            await asyncio.sleep(self.interval)
+
+
+async def legacy_viewer(source, response, counter):
+    """video_stream_handler cũ: mỗi viewer tự encode trên event loop"""
+    while True:
+        frame = source.current
+        if frame is None:
+            await asyncio.sleep(0.01)
+            continue
+        _, buffer = cv2.imencode('.jpg', frame.bgr, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        counter[0] += 1
+        await response.write(b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+        await asyncio.sleep(0.03)
+
+
+async def heartbeat(lags):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def run(mode, viewers, width, height, fps, seconds):
+    responses = [NullResponse() for _ in range(viewers)]
+    lags = []
+    video = None
+    counter = [0]
+    if mode == 'shared':
+        video = MjpegBroadcaster(quality=80, max_fps=fps)
+        source = Source(width, height, fps, on_frame=video.publish)
+        tasks = [asyncio.create_task(video.run())]
+        tasks += [asyncio.create_task(video.stream(response)) for response in responses]
+    else:
+        source = Source(width, height, fps)
+        tasks = [asyncio.create_task(legacy_viewer(source, response, counter))
+                 for response in responses]
+    tasks += [asyncio.create_task(source.run()), asyncio.create_task(heartbeat(lags))]
+
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if video is not None:
+        video.close()
+        counter[0] = video.encodes
+    lags = np.array(lags)
+    delivered = sum(response.parts for response in responses) / viewers
+    return counter[0] / seconds, delivered / seconds, np.percentile(lags, 99), lags.max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--viewers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--size', default='1280x720', help="WxH")
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split('x'))
+
+    print(f"{width}x{height} @ {args.fps:.0f} FPS, {args.seconds:.0f}s mỗi lần chạy")
+    print(f"{'viewers':>7} {'mode':>7} {'encodes/s':>10} {'fps/viewer':>11} "
+          f"{'p99 lag ms':>11} {'max lag ms':>11}")
+    for viewers in args.viewers:
+        for mode in ('legacy', 'shared'):
+            encodes, delivered, p99, worst = asyncio.run(
+                run(mode, viewers, width, height, args.fps, args.seconds))
+            print(f"{viewers:>7} {mode:>7} {encodes:>10.1f} {delivered:>11.1f} "
+                  f"{p99 * 1000:>11.2f} {worst * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
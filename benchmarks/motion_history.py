@@ -0,0 +1,64 @@
+"""
+Benchmark: motion history deque + np.var mỗi frame vs ring buffer cập nhật O(1)
+Mỗi frame: update, velocity, distance 10 mẫu, variance (như GestureDetector)
+
+Chạy: python -m benchmarks.motion_history --frames 20000
+"""
+import argparse
+import time
+from collections import deque
+import numpy as np
+from motion import MotionFeatureExtractor
+
+
+def run_deque(frames, positions):
+    """Cách cũ: deque tuple, velocity 2 mẫu cuối, list -> np.var mỗi frame"""
+    position_history = deque(maxlen=10)
+    time_history = deque(maxlen=10)
+    start = time.perf_counter()
+    for i in range(frames):
+        x, y = positions[i % len(positions)]
+        position_history.append((x, y))
+        time_history.append(i / 30.0)
+        if len(position_history) < 10:
+            continue
+        (x1, y1), (x2, y2) = position_history[-2], position_history[-1]
+        dt = time_history[-1] - time_history[-2]
+        np.sqrt(((x2 - x1) / dt) ** 2 + ((y2 - y1) / dt) ** 2)
+        np.sqrt((x2 - position_history[-10][0]) ** 2 + (y2 - position_history[-10][1]) ** 2)
+        window = list(position_history)[-10:]
+        np.var([p[0] for p in window])
+        np.var([p[1] for p in window])
+    return time.perf_counter() - start
+
+
+def run_ring(frames, positions):
+    motion = MotionFeatureExtractor(history_size=10)
+    start = time.perf_counter()
+    for i in range(frames):
+        x, y = positions[i % len(positions)]
+        motion.update(x, y, i / 30.0)
+        if len(motion) < 10:
+            continue
+        motion.get_velocity()
+        motion.get_distance(start_idx=-10, end_idx=-1)
+        motion.get_variance()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=20000)
+    args = parser.parse_args()
+
+    positions = np.random.default_rng(0).random((256, 2)).tolist()
+    scale = 1e6 / args.frames
+    old = run_deque(args.frames, positions)
+    new = run_ring(args.frames, positions)
+    print(f"frames={args.frames}")
+    print(f"deque + np.var: {old * scale:6.1f} us/frame")
+    print(f"ring buffer:    {new * scale:6.1f} us/frame ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
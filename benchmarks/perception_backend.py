@@ -0,0 +1,88 @@
+"""
+Benchmark: perception chạy trong thread vs process riêng (shared memory ring)
+Có thể thêm thread Python giả lập tải GIL (JSON encode, WebSocket fan-out)
+
+Chạy: python -m benchmarks.perception_backend --frames 150 --gil-load 2 --try-on
+"""
+import argparse
+import json
+import threading
+import time
+import numpy as np
+from camera import Camera, SyntheticSource, PACING_FAST
+from perception import Perception
+from perception_process import ProcessPerception
+
+
+def gil_load(stop_event):
+    """Việc thuần Python giữ GIL liên tục (giống encode JSON / fan-out)"""
+    payload = {'type': 'CURSOR_MOVE', 'x': 100, 'y': 200, 'items': list(range(50))}
+    while not stop_event.is_set():
+        json.dumps(payload)
+
+
+def run_backend(perception, frames, width, height, try_on, gil_threads):
+    camera = Camera(source=SyntheticSource(width, height, pacing=PACING_FAST))
+    # Warm up (khởi tạo graph, attach ring)
+    for _ in range(5):
+        _, frame = camera.read_frame()
+        perception.process_hands(frame.rgb)
+        if try_on:
+            perception.process_face(frame.rgb)
+
+    stop_event = threading.Event()
+    workers = [threading.Thread(target=gil_load, args=(stop_event,), daemon=True)
+               for _ in range(gil_threads)]
+    for worker in workers:
+        worker.start()
+
+    latencies = []
+    start = time.perf_counter()
+    try:
+        for _ in range(frames):
+            _, frame = camera.read_frame()
+            rgb = frame.rgb
+            t0 = time.perf_counter()
+            perception.process_hands(rgb)
+            if try_on:
+                perception.process_face(rgb)
+            latencies.append(time.perf_counter() - t0)
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000.0
+    return {
+        'mean_ms': float(latencies.mean()),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'fps': frames / elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=150)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--gil-load', type=int, default=0,
+                        help="Số thread Python giữ GIL chạy song song")
+    parser.add_argument('--try-on', action='store_true', help="Chạy cả Face Mesh + Pose")
+    args = parser.parse_args()
+
+    print(f"{args.width}x{args.height} frames={args.frames} "
+          f"gil_load={args.gil_load} try_on={args.try_on}")
+    print(f"{'backend':>8} {'mean ms':>8} {'p95 ms':>8} {'FPS':>7}")
+    for name, factory in (('thread', Perception), ('process', ProcessPerception)):
+        perception = factory()
+        try:
+            result = run_backend(perception, args.frames, args.width, args.height,
+                                 args.try_on, args.gil_load)
+        finally:
+            perception.release()
+        print(f"{name:>8} {result['mean_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['fps']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
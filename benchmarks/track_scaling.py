@@ -0,0 +1,65 @@
+"""
+Benchmark: chi phí mỗi frame của pipeline (track, normalize, motion, gesture) theo số tay
+Tay tổng hợp di chuyển vòng tròn, thứ tự detection xáo trộn mỗi frame như MediaPipe
+
+Chạy: python -m benchmarks.track_scaling --tracks 1 2 4 8
+"""
+import argparse
+import time
+import numpy as np
+from clock import SimulatedClock
+from pipeline import InteractionPipeline
+from tracking import HandTracker, palm_centers
+
+
+def make_frames(tracks, frames, seed=0):
+    """list (mỗi frame) các tay (21, 3), mỗi tay quanh 1 tâm riêng"""
+    rng = np.random.default_rng(seed)
+    base = rng.random((21, 3)) * 0.08
+    centers = np.column_stack([np.linspace(0.15, 0.85, tracks), np.full(tracks, 0.5)])
+    result = []
+    for i in range(frames):
+        angle = i / 15.0
+        offset = 0.03 * np.array([np.cos(angle), np.sin(angle), 0.0])
+        hands = [base + [cx, cy, 0.0] + offset for cx, cy in centers]
+        rng.shuffle(hands)
+        result.append(hands)
+    return result
+
+
+def run_pipeline(tracks, frames):
+    pipeline = InteractionPipeline(clock=SimulatedClock(), max_tracks=tracks)
+    start = time.perf_counter()
+    for i, hands in enumerate(frames):
+        pipeline.step(hands, None, i / 30.0)
+    return time.perf_counter() - start, pipeline.tracker.next_id - 1
+
+
+def run_tracker(tracks, frames):
+    tracker = HandTracker(max_tracks=tracks)
+    centers = [palm_centers(hands) for hands in frames]
+    start = time.perf_counter()
+    for frame_centers in centers:
+        tracker.update(frame_centers)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tracks', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--frames', type=int, default=3000)
+    args = parser.parse_args()
+
+    print(f"frames={args.frames}")
+    print(f"{'tracks':>6} {'pipeline us':>12} {'us/track':>9} {'tracker us':>11} {'ids':>4}")
+    for tracks in args.tracks:
+        frames = make_frames(tracks, args.frames)
+        pipeline, ids = run_pipeline(tracks, frames)
+        tracker = run_tracker(tracks, frames)
+        scale = 1e6 / args.frames
+        print(f"{tracks:>6} {pipeline * scale:>12.1f} {pipeline * scale / tracks:>9.1f} "
+              f"{tracker * scale:>11.1f} {ids:>4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: chi phí trajectory gesture mỗi frame theo số template
+So matching có LB_Keogh + early abandon với DTW đầy đủ mọi template mỗi cửa sổ
+Luồng cursor tổng hợp: chuyển động ngẫu nhiên xen CIRCLE / WAVE / CHECK
+(us/frame là trung bình, p99 us là frame chậm nhất trong 99%)
+
+Chạy: python -m benchmarks.trajectory_matching --templates 14 28 56 112
+"""
+import argparse
+import time
+import numpy as np
+from trajectory import TemplateLibrary, TrajectoryRecognizer, default_templates, dtw_distance
+
+
+def make_library(count, seed=0):
+    """default_templates() + bản biến dạng (scale trục, nhiễu) cho đủ `count` template"""
+    rng = np.random.default_rng(seed)
+    base = default_templates()
+    library = TemplateLibrary()
+    for i in range(count):
+        index = i % len(base)
+        path = base.paths[index]
+        if i >= len(base):
+            path = path * rng.uniform(0.8, 1.2, 2) + 0.01 * rng.standard_normal(path.shape)
+        library.add(base.names[index], path)
+    return library
+
+
+def make_stream(frames, fps=30.0, seed=0):
+    """
+    Cursor normalized (frames, 2): trôi chậm có nhiễu (duyệt item),
+    mỗi 3 giây chèn 1 gesture dài 1 giây rồi dừng tay 0.3 giây
+    Returns:
+        tuple: (points, số gesture đã chèn)
+    """
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0.0, 1.0, int(fps))
+    shapes = [
+        np.column_stack((0.1 * np.sin(2 * np.pi * t), 0.1 * np.cos(2 * np.pi * t))),
+        np.column_stack((-0.1 * np.cos(3 * np.pi * t), 0.02 * np.sin(6 * np.pi * t))),
+        np.concatenate([np.linspace([0.0, 0.0], [0.05, 0.06], 10),
+                        np.linspace([0.05, 0.06], [0.2, -0.15], len(t) - 10)]),
+    ]
+    points = []
+    position = np.array([0.5, 0.5])
+    velocity = np.zeros(2)
+    inserted = 0
+    while len(points) < frames:
+        for noise in rng.standard_normal((int(2 * fps), 2)):
+            velocity = 0.9 * velocity + 0.002 * noise
+            position = np.clip(position + velocity, 0.2, 0.8)
+            points.append(position + 0.002 * noise)
+        shape = shapes[inserted % len(shapes)]
+        points.extend(position + shape - shape[0] + 0.002 * rng.standard_normal(shape.shape))
+        position = points[-1]
+        points.extend(position + 0.001 * rng.standard_normal((int(0.3 * fps), 2)))
+        velocity[:] = 0.0
+        inserted += 1
+    points = np.array(points)
+    cycle = int(3.3 * fps)
+    return points[:frames], frames // cycle + (frames % cycle > int(3.0 * fps))
+
+
+class ExhaustiveLibrary(TemplateLibrary):
+    """DTW đầy đủ với mọi template, không lower bound, không bỏ ngang"""
+    def match(self, queries, best=float('inf')):
+        result = None
+        for query_index, query in enumerate(queries):
+            query_list = [tuple(point) for point in query.tolist()]
+            for index, template in enumerate(self._path_lists):
+                self.dtw_calls += 1
+                distance = dtw_distance(query_list, template, self.window)
+                if distance < best:
+                    best = distance
+                    result = (query_index, index, distance)
+        return result
+
+
+def run(library, stream, fps=30.0):
+    recognizer = TrajectoryRecognizer(library)
+    gestures = []
+    costs = np.zeros(len(stream))
+    for i, (x, y) in enumerate(stream):
+        t = i / fps
+        start = time.perf_counter()
+        recognizer.update(x, y, t)
+        gesture = recognizer.process(t)
+        costs[i] = time.perf_counter() - start
+        if gesture:
+            gestures.append(gesture)
+    return costs, gestures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--templates', type=int, nargs='+', default=[14, 28, 56, 112])
+    parser.add_argument('--frames', type=int, default=1800)
+    args = parser.parse_args()
+
+    stream, inserted = make_stream(args.frames)
+    print(f"frames={args.frames}, gestures trong luồng={inserted}")
+    print(f"{'templates':>9} {'mode':>10} {'us/frame':>9} {'p99 us':>8} {'dtw/frame':>10} "
+          f"{'abandoned':>10} {'gestures':>9}")
+    for count in args.templates:
+        for mode, cls in (('pruned', TemplateLibrary), ('exhaustive', ExhaustiveLibrary)):
+            library = make_library(count)
+            library.__class__ = cls
+            costs, gestures = run(library, stream)
+            abandoned = library.abandoned / library.dtw_calls if library.dtw_calls else 0.0
+            print(f"{count:>9} {mode:>10} {costs.mean() * 1e6:>9.1f} "
+                  f"{np.percentile(costs, 99) * 1e6:>8.0f} {library.dtw_calls / args.frames:>10.2f} "
+                  f"{abandoned:>10.0%} {len(gestures):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: byte/giây và thời gian encode của bridge ở 60 Hz, JSON vs binary
+Mỗi frame: CURSOR_MOVE từng tay + ITEM_TRANSFORM (try-on), GESTURE mỗi 2 giây,
+STATE_CHANGE mỗi 10 giây; payload giống WebSocketBridge.emit_* tạo
+'per-type' = 1 message mỗi event, 'frame' = 1 FRAME_UPDATE mỗi frame (msg/s = số lần ghi socket)
+(wire B/s tính cả header WebSocket frame server -> client: 2 byte, 4 byte nếu > 125)
+
+Chạy: python -m benchmarks.wire_protocol --hands 1 2 4
+"""
+import argparse
+import time
+import numpy as np
+from protocol import encode_binary, encode_json
+
+
+def make_frames(count, hands, fps, seed=0):
+    """list payload theo frame (mỗi frame 1 list dict)"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(count):
+        capture_ts = 1760000000.0 + i / fps
+        payloads = []
+        for track_id in range(1, hands + 1):
+            x, y = rng.integers(0, (1280, 720))
+            payloads.append({'type': 'CURSOR_MOVE', 'x': int(x), 'y': int(y),
+                             'track_id': track_id, 'capture_ts': capture_ts})
+        if i % int(2 * fps) == 0:
+            payloads.append({'type': 'GESTURE', 'gesture': 'SWIPE_RIGHT', 'track_id': 1,
+                             'capture_ts': capture_ts})
+        if i % int(10 * fps) == 0:
+            payloads.append({'type': 'STATE_CHANGE', 'state': 'TRY_ON', 'capture_ts': capture_ts})
+        payloads.append({
+            'type': 'ITEM_TRANSFORM',
+            'anchor': {'x': int(rng.integers(500, 700)), 'y': int(rng.integers(400, 500))},
+            'rotation': float(rng.uniform(-0.3, 0.3)),
+            'scale': float(rng.uniform(0.6, 1.2)),
+            'capture_ts': capture_ts
+        })
+        frames.append(payloads)
+    return frames
+
+
+def bundle(payloads):
+    """Các event của 1 frame -> 1 payload FRAME_UPDATE như WebSocketBridge.emit_frame_update"""
+    update = {'type': 'FRAME_UPDATE', 'cursors': [], 'gestures': [],
+              'capture_ts': payloads[0]['capture_ts']}
+    for payload in payloads:
+        if payload['type'] == 'CURSOR_MOVE':
+            update['cursors'].append({'track_id': payload['track_id'], 'x': payload['x'],
+                                      'y': payload['y']})
+        elif payload['type'] == 'GESTURE':
+            update['gestures'].append({'track_id': payload['track_id'],
+                                       'gesture': payload['gesture']})
+        elif payload['type'] == 'STATE_CHANGE':
+            update['state'] = payload['state']
+        else:
+            update['transform'] = {key: payload[key] for key in ('anchor', 'rotation', 'scale')}
+    return [update]
+
+
+def run(frames, encode):
+    """Returns: (giây encode mỗi frame, list message)"""
+    messages = []
+    seq = 0
+    start = time.perf_counter()
+    for payloads in frames:
+        for payload in payloads:
+            seq += 1
+            messages.append(encode(dict(payload), seq))
+    return (time.perf_counter() - start) / len(frames), messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hands', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--fps', type=float, default=60.0)
+    args = parser.parse_args()
+
+    count = int(args.seconds * args.fps)
+    print(f"{args.seconds:.0f}s @ {args.fps:.0f} Hz")
+    print(f"{'hands':>5} {'format':>7} {'messages':>9} {'msg/s':>7} {'B/msg':>6} "
+          f"{'payload B/s':>12} {'wire B/s':>9} {'encode us/frame':>16}")
+    for hands in args.hands:
+        per_type = make_frames(count, hands, args.fps)
+        bundled = [bundle(payloads) for payloads in per_type]
+        for mode, frames in (('per-type', per_type), ('frame', bundled)):
+            for name, encode in (('json', encode_json), ('binary', encode_binary)):
+                per_frame, messages = run(frames, encode)
+                sizes = np.array([len(message) for message in messages])
+                wire = sizes + np.where(sizes > 125, 4, 2)
+                print(f"{hands:>5} {name:>7} {mode:>9} {len(messages) / args.seconds:>7.0f} "
+                      f"{sizes.mean():>6.1f} {sizes.sum() / args.seconds:>12.0f} "
+                      f"{wire.sum() / args.seconds:>9.0f} {per_frame * 1e6:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
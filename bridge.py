@@ -1,84 +1,281 @@
 """
 Bridge Layer - WebSocket emit
 Gửi dữ liệu sang frontend: cursor position, gesture event, item transform
+
+Mỗi client 1 hàng đợi gửi có giới hạn + writer task riêng: broadcast chỉ đặt message
+vào hàng đợi, không chờ socket, nên 1 tab chậm không làm trễ các màn hình khác
+Định dạng message theo subprotocol client chọn: binary hoặc JSON (xem protocol.py)
 """
-import json
 import asyncio
 import websockets
+from websockets.exceptions import ConnectionClosed
+from collections import OrderedDict
 from typing import Optional, Dict, Any
+from protocol import SUBPROTOCOL_BINARY, SUBPROTOCOLS, encode_binary, encode_json
+
+
+# Chỉ cần bản mới nhất: message chưa gửi bị thay bằng bản mới (CURSOR_MOVE theo track;
+# FRAME_UPDATE chỉ khi không có gesture / state change, xem coalesce_key)
+COALESCED_TYPES = ('CURSOR_MOVE', 'ITEM_TRANSFORM', 'FRAME_UPDATE')
+# Số message phải gửi đủ (GESTURE, STATE_CHANGE) tối đa đang chờ của 1 client
+MAX_RELIABLE_PENDING = 256
+# Close code khi client không đọc kịp (1013 = Try Again Later, frontend tự kết nối lại)
+CLOSE_OVERFLOW = 1013
+
+
+def coalesce_key(payload):
+    """
+    Returns:
+        (type, track_id) nếu chỉ cần gửi bản mới nhất, None nếu phải gửi đủ
+    """
+    message_type = payload['type']
+    if message_type not in COALESCED_TYPES:
+        return None
+    if message_type == 'FRAME_UPDATE' and (payload['gestures'] or 'state' in payload):
+        return None
+    return (message_type, payload.get('track_id'))
+
+
+class ClientQueue:
+    """
+    Hàng đợi gửi của 1 client, writer task gửi lần lượt theo thứ tự vào hàng
+    - Message coalesced (key = (type, track_id)): bản chờ cũ bị bỏ, bản mới xếp cuối hàng
+      nên vẫn đúng thứ tự với GESTURE / STATE_CHANGE đứng trước nó
+    - Message reliable: gửi đủ, đúng thứ tự; quá max_reliable đang chờ = client quá chậm,
+      đóng kết nối thay vì buffer vô hạn
+    """
+    def __init__(self, websocket, client_id, max_reliable=MAX_RELIABLE_PENDING):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.binary = getattr(websocket, 'subprotocol', None) == SUBPROTOCOL_BINARY
+        self.max_reliable = max_reliable
+        self.pending = OrderedDict()  # key -> message; key int = reliable, tuple = coalesced
+        self.reliable_pending = 0
+        self.event = asyncio.Event()
+        self.task = None
+        self.overflowed = False
+        self._next_key = 0
+        # Counter (xem WebSocketBridge.client_stats)
+        self.sent = 0
+        self.bytes_sent = 0
+        self.coalesced = 0   # Message bị bản mới hơn thay trước khi gửi
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, message, key=None):
+        """
+        Args:
+            message: str (JSON) hoặc bytes (binary) đã encode
+            key: None = reliable; (type, track_id) = coalesced
+        Returns:
+            bool: False nếu hàng reliable đầy (client sẽ bị đóng)
+        """
+        if self.overflowed:
+            return False
+        if key is None:
+            if self.reliable_pending >= self.max_reliable:
+                self.overflowed = True
+                self.event.set()
+                return False
+            key = self._next_key
+            self._next_key += 1
+            self.reliable_pending += 1
+        elif self.pending.pop(key, None) is not None:
+            self.coalesced += 1
+        self.pending[key] = message
+        if len(self.pending) > self.max_depth:
+            self.max_depth = len(self.pending)
+        self.event.set()
+        return True
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        """Writer: gửi hết hàng đợi, chờ khi trống"""
+        websocket = self.websocket
+        try:
+            while True:
+                await self.event.wait()
+                self.event.clear()
+                while self.pending and not self.overflowed:
+                    key, message = self.pending.popitem(last=False)
+                    if not isinstance(key, tuple):
+                        self.reliable_pending -= 1
+                    await websocket.send(message)
+                    self.sent += 1
+                    self.bytes_sent += len(message)
+                if self.overflowed:
+                    self.pending.clear()
+                    await websocket.close(CLOSE_OVERFLOW, 'send queue overflow')
+                    return
+        except ConnectionClosed:
+            pass
+
+    async def stop(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
 
 
 class WebSocketBridge:
-    def __init__(self, host='localhost', port=8765):
+    def __init__(self, host='localhost', port=8765, max_reliable=MAX_RELIABLE_PENDING):
         self.host = host
         self.port = port
-        self.clients = set()
+        self.max_reliable = max_reliable
+        self.clients = {}  # {websocket: ClientQueue}
         self.server = None
+        self.last_cursors = {}  # {track_id: (x, y)} cursor đã gửi gần nhất
+        self.last_frame_cursors = {}  # {track_id: (x, y)} trong FRAME_UPDATE gần nhất
+        self.next_client_id = 1
+        self.seq = 0  # Số thứ tự message broadcast (chung mọi client)
+        # Tổng cộng cả client đã ngắt
+        self.coalesced_total = 0
+        self.overflow_disconnects = 0
     
     async def register_client(self, websocket):
-        """Đăng ký client mới"""
-        self.clients.add(websocket)
-        print(f"Client connected. Total clients: {len(self.clients)}")
+        """Đăng ký client mới, khởi động writer task"""
+        queue = ClientQueue(websocket, self.next_client_id, self.max_reliable)
+        self.next_client_id += 1
+        self.clients[websocket] = queue
+        queue.start()
+        protocol = 'binary' if queue.binary else 'json'
+        print(f"Client {queue.client_id} connected ({protocol}). Total clients: {len(self.clients)}")
+        return queue
     
     async def unregister_client(self, websocket):
-        """Hủy đăng ký client"""
-        self.clients.discard(websocket)
-        print(f"Client disconnected. Total clients: {len(self.clients)}")
+        """Hủy đăng ký client, dừng writer task"""
+        queue = self.clients.pop(websocket, None)
+        if queue is None:
+            return
+        await queue.stop()
+        self.coalesced_total += queue.coalesced
+        if queue.overflowed:
+            self.overflow_disconnects += 1
+            print(f"Client {queue.client_id}: send queue overflow, closed")
+        print(f"Client {queue.client_id} disconnected. Total clients: {len(self.clients)}")
     
-    async def handler(self, websocket, path):
+    async def handler(self, websocket, path=None):
         """WebSocket handler"""
-        await self.register_client(websocket)
+        queue = await self.register_client(websocket)
         try:
             # Giữ connection mở
             async for message in websocket:
-                # Frontend có thể gửi ping
+                # Frontend có thể gửi ping (trả lời qua hàng đợi, không gửi song song writer)
                 if message == "ping":
-                    await websocket.send("pong")
-        except websockets.exceptions.ConnectionClosed:
+                    queue.put("pong")
+        except ConnectionClosed:
             pass
         finally:
             await self.unregister_client(websocket)
+
+    def client_stats(self):
+        """
+        Returns:
+            list dict: mỗi client {'client', 'depth', 'max_depth', 'sent', 'bytes_sent', 'coalesced'}
+        """
+        return [
+            {'client': queue.client_id, 'depth': len(queue), 'max_depth': queue.max_depth,
+             'sent': queue.sent, 'bytes_sent': queue.bytes_sent, 'coalesced': queue.coalesced}
+            for queue in self.clients.values()
+        ]
     
-    async def emit_cursor_move(self, x, y):
+    async def emit_cursor_move(self, x, y, capture_ts=None, track_id=None):
         """
-        Emit cursor position (có throttle dựa trên khoảng cách thay đổi)
+        Emit cursor position (có throttle dựa trên khoảng cách thay đổi, riêng từng track)
         Args:
             x, y: pixel coordinates
+            capture_ts: timestamp capture của frame (giây, epoch)
+            track_id: id track tay (None = 1 tay, không gắn id)
         """
-        if hasattr(self, 'last_cursor'):
+        last = self.last_cursors.get(track_id)
+        if last is not None:
             # Chỉ gửi nếu di chuyển đủ xa (> 2 pixel) để giảm noise/bandwidth
-            dx = abs(x - self.last_cursor[0])
-            dy = abs(y - self.last_cursor[1])
+            dx = abs(x - last[0])
+            dy = abs(y - last[1])
             if dx < 2 and dy < 2:
                 return
         
-        self.last_cursor = (x, y)
+        if last is None and len(self.last_cursors) >= 64:
+            # Track cũ đã kết thúc, id không quay lại
+            self.last_cursors.clear()
+        self.last_cursors[track_id] = (x, y)
         payload = {
             'type': 'CURSOR_MOVE',
             'x': x,
             'y': y
         }
-        await self.broadcast(payload)
+        if track_id is not None:
+            payload['track_id'] = track_id
+        await self.broadcast(payload, capture_ts)
     
-    async def emit_gesture_event(self, gesture):
+    async def emit_frame_update(self, cursors, gestures=(), state=None, transform=None,
+                                capture_ts=None):
+        """
+        Emit mọi thứ 1 frame sinh ra trong 1 message FRAME_UPDATE (frontend áp dụng cùng lúc)
+        Cursor là snapshot mọi track của frame (bản mới thay hẳn bản cũ khi coalesce),
+        nên không throttle từng cursor; frame chỉ có cursor di chuyển < 2 pixel thì bỏ qua
+        Args:
+            cursors: list (track_id, x, y) pixel
+            gestures: list (track_id, gesture)
+            state: str state mới hoặc None
+            transform: dict {'anchor': (x, y), 'rotation', 'scale'} hoặc None
+            capture_ts: timestamp capture của frame (giây, epoch)
+        """
+        current = {track_id: (x, y) for track_id, x, y in cursors}
+        if not gestures and state is None and transform is None:
+            last = self.last_frame_cursors
+            if current.keys() == last.keys() and all(
+                    abs(x - last[track_id][0]) < 2 and abs(y - last[track_id][1]) < 2
+                    for track_id, (x, y) in current.items()):
+                return
+        self.last_frame_cursors = current
+
+        payload = {
+            'type': 'FRAME_UPDATE',
+            'cursors': [{'track_id': track_id, 'x': x, 'y': y} for track_id, x, y in cursors],
+            'gestures': [{'track_id': track_id, 'gesture': gesture}
+                         for track_id, gesture in gestures]
+        }
+        if state is not None:
+            payload['state'] = state
+        if transform is not None:
+            payload['transform'] = {
+                'anchor': {'x': transform['anchor'][0], 'y': transform['anchor'][1]},
+                'rotation': transform['rotation'],
+                'scale': transform['scale']
+            }
+        await self.broadcast(payload, capture_ts)
+
+    async def emit_gesture_event(self, gesture, capture_ts=None, track_id=None):
         """
         Emit gesture event
         Args:
             gesture: str (SWIPE_LEFT, SWIPE_RIGHT, PINCH, HOLD)
+            capture_ts: timestamp capture của frame (giây, epoch)
+            track_id: id track tay sinh ra gesture (None = không gắn id)
         """
         payload = {
             'type': 'GESTURE',
             'gesture': gesture
         }
-        await self.broadcast(payload)
+        if track_id is not None:
+            payload['track_id'] = track_id
+        await self.broadcast(payload, capture_ts)
     
-    async def emit_item_transform(self, neck_anchor, rotation, scale):
+    async def emit_item_transform(self, neck_anchor, rotation, scale, capture_ts=None):
         """
         Emit item transform cho try-on
         Args:
             neck_anchor: tuple (x, y) pixel coordinates
             rotation: float (radians)
             scale: float
+            capture_ts: timestamp capture của frame (giây, epoch)
         """
         payload = {
             'type': 'ITEM_TRANSFORM',
@@ -89,53 +286,65 @@ class WebSocketBridge:
             'rotation': rotation,
             'scale': scale
         }
-        await self.broadcast(payload)
+        await self.broadcast(payload, capture_ts)
     
-    async def emit_state_change(self, state):
+    async def emit_state_change(self, state, capture_ts=None):
         """
         Emit state change
         Args:
             state: str (IDLE, BROWSE_ITEM, TRY_ON)
+            capture_ts: timestamp capture của frame (giây, epoch)
         """
         payload = {
             'type': 'STATE_CHANGE',
             'state': state
         }
-        await self.broadcast(payload)
+        await self.broadcast(payload, capture_ts)
     
-    async def broadcast(self, payload):
+    async def broadcast(self, payload, capture_ts=None):
         """
-        Broadcast message đến tất cả clients
+        Broadcast message đến tất cả clients: encode 1 lần mỗi định dạng đang có client dùng,
+        đặt vào hàng đợi từng client (không chờ socket; writer task của client gửi)
         Args:
             payload: dict
+            capture_ts: timestamp capture của frame sinh ra payload,
+                        frontend dùng để đo latency glass-to-glass
         """
         if not self.clients:
             return
         
-        message = json.dumps(payload)
-        disconnected = set()
-        
-        for client in self.clients:
-            try:
-                await client.send(message)
-            except websockets.exceptions.ConnectionClosed:
-                disconnected.add(client)
+        if capture_ts is not None:
+            payload['capture_ts'] = capture_ts
         
-        # Xóa các client đã disconnect
-        for client in disconnected:
-            self.clients.discard(client)
+        self.seq += 1
+        json_message = binary_message = None
+        key = coalesce_key(payload)
+        for queue in self.clients.values():
+            if queue.binary:
+                if binary_message is None:
+                    # Type không có layout binary: gửi JSON text frame
+                    binary_message = encode_binary(payload, self.seq) or False
+                if binary_message:
+                    queue.put(binary_message, key)
+                    continue
+            if json_message is None:
+                json_message = encode_json(payload, self.seq)
+            queue.put(json_message, key)
     
     async def start_server(self):
         """Khởi động WebSocket server"""
         self.server = await websockets.serve(
             self.handler,
             self.host,
-            self.port
+            self.port,
+            subprotocols=list(SUBPROTOCOLS)
         )
         print(f"WebSocket server started on ws://{self.host}:{self.port}")
     
     async def stop_server(self):
         """Dừng WebSocket server"""
+        for websocket in list(self.clients):
+            await self.unregister_client(websocket)
         if self.server:
             self.server.close()
             await self.server.wait_closed()
@@ -1,41 +1,440 @@
 """
-Sensor Layer - Chỉ đọc frame từ camera
+Sensor Layer - Chỉ đọc frame từ nguồn (camera, file video, thư mục ảnh, synthetic)
 Không xử lý logic, chỉ capture
 """
+import asyncio
+import os
+import sys
+import threading
+import time
 import cv2
+import numpy as np
 
 
-class Camera:
-    def __init__(self, camera_id=0):
-        self.cap = cv2.VideoCapture(camera_id, cv2.CAP_DSHOW)
+# Chế độ pacing cho nguồn không phải camera
+PACING_FAST = 'fast'          # Đọc nhanh nhất có thể (benchmark, soak test)
+PACING_REALTIME = 'realtime'  # Phát đúng theo timestamp gốc
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class FrameSource:
+    """
+    Interface chung cho mọi nguồn frame
+    read() trả về (success, frame_bgr, timestamp)
+    """
+    def __init__(self, pacing=PACING_REALTIME):
+        if pacing not in (PACING_FAST, PACING_REALTIME):
+            raise ValueError(f"Pacing không hợp lệ: {pacing}")
+        self.pacing = pacing
+        self.finished = False
+        self._clock_start = None  # Wall time khi phát frame đầu tiên
+        self._media_start = None  # Media time của frame đầu tiên
+
+    def read(self):
+        """
+        Đọc frame tiếp theo
+        Returns:
+            tuple: (success, frame_bgr, timestamp) hoặc (False, None, None)
+        """
+        raise NotImplementedError
+
+    def _pace(self, media_time):
+        """
+        Quy đổi media time sang timestamp capture
+        - PACING_REALTIME: chờ đến đúng thời điểm, trả về wall time thật
+        - PACING_FAST: không chờ, trả về timestamp theo media time
+          (velocity ở các tầng sau vẫn đúng dù chạy nhanh hơn realtime)
+        Args:
+            media_time: float (giây) tính từ đầu nguồn
+        Returns:
+            float: timestamp capture
+        """
+        now = time.time()
+        if self._clock_start is None:
+            self._clock_start = now
+            self._media_start = media_time
+            return now
+
+        target = self._clock_start + (media_time - self._media_start)
+        if self.pacing == PACING_FAST:
+            return target
+
+        delay = target - now
+        if delay > 0:
+            time.sleep(delay)
+            now = time.time()
+        return now
+
+    def release(self):
+        """Giải phóng nguồn"""
+        pass
+
+
+class LiveCameraSource(FrameSource):
+    """Camera vật lý qua cv2.VideoCapture (thiết bị tự giữ nhịp)"""
+    def __init__(self, camera_id=0, backend=None):
+        super().__init__(PACING_REALTIME)
+        if backend is None:
+            # CAP_DSHOW chỉ có trên Windows
+            backend = cv2.CAP_DSHOW if sys.platform.startswith('win') else cv2.CAP_ANY
+        self.cap = cv2.VideoCapture(camera_id, backend)
         if not self.cap.isOpened():
             raise RuntimeError(f"Không thể mở camera {camera_id}")
-        self.last_frame_bgr = None
-    
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if ret:
+            return True, frame, time.time()
+        return False, None, None
+
+    def release(self):
+        if self.cap:
+            self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    """
+    File video, timestamp lấy từ timestamp của frame trong container (CAP_PROP_POS_MSEC,
+    đúng cả với video frame rate thay đổi); backend không có thì theo index / fps
+    """
+    def __init__(self, path, pacing=PACING_REALTIME, loop=False):
+        super().__init__(pacing)
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Không thể mở video {path}")
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.frame_index = 0
+        self._position = 0.0     # Media time (giây, trong file) của frame vừa đọc
+        self._loop_offset = 0.0  # Cộng dồn thời lượng mỗi vòng lặp
+
+    def read(self):
+        if self.finished:
+            return False, None, None
+
+        ret, frame = self.cap.read()
+        if not ret and self.loop and self.frame_index > 0:
+            # Thời lượng vòng = frame cuối + 1 frame
+            self._loop_offset += self._position + 1.0 / self.fps
+            self.frame_index = 0
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if not ret:
+            self.finished = True
+            return False, None, None
+
+        # Frame đầu có timestamp 0 nên chỉ tin giá trị dương
+        position = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if position <= 0:
+            position = self.frame_index / self.fps
+        self._position = position
+        self.frame_index += 1
+        return True, frame, self._pace(self._loop_offset + position)
+
+    def release(self):
+        if self.cap:
+            self.cap.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Thư mục ảnh (sắp xếp theo tên), phát với fps cố định"""
+    def __init__(self, path, fps=30.0, pacing=PACING_REALTIME, loop=False):
+        super().__init__(pacing)
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.files:
+            raise RuntimeError(f"Không có ảnh trong thư mục {path}")
+        self.frame_index = 0
+
+    def read(self):
+        if self.finished:
+            return False, None, None
+
+        position = self.frame_index
+        if position >= len(self.files):
+            if not self.loop:
+                self.finished = True
+                return False, None, None
+            position %= len(self.files)
+
+        frame = cv2.imread(self.files[position])
+        if frame is None:
+            raise RuntimeError(f"Không đọc được ảnh {self.files[position]}")
+
+        media_time = self.frame_index / self.fps
+        self.frame_index += 1
+        return True, frame, self._pace(media_time)
+
+
+class SyntheticSource(FrameSource):
+    """
+    Sinh frame tổng hợp (chấm tròn chuyển động), không cần thiết bị
+    Dùng để đo throughput của pipeline trên máy build
+    """
+    def __init__(self, width=640, height=480, fps=30.0, num_frames=None,
+                 pacing=PACING_REALTIME):
+        super().__init__(pacing)
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.num_frames = num_frames
+        self.frame_index = 0
+        # Nền gradient cố định, mỗi frame copy rồi vẽ lên
+        row = np.linspace(40, 120, width, dtype=np.uint8)
+        self.background = np.repeat(
+            np.tile(row, (height, 1))[:, :, None], 3, axis=2
+        )
+
+    def read(self):
+        if self.num_frames is not None and self.frame_index >= self.num_frames:
+            self.finished = True
+            return False, None, None
+
+        media_time = self.frame_index / self.fps
+        frame = self.background.copy()
+        cx = int(self.width * (0.5 + 0.35 * np.sin(media_time * 1.3)))
+        cy = int(self.height * (0.5 + 0.35 * np.sin(media_time * 0.9 + 1.0)))
+        radius = max(4, min(self.width, self.height) // 12)
+        cv2.circle(frame, (cx, cy), radius, (0, 200, 255), -1)
+
+        self.frame_index += 1
+        return True, frame, self._pace(media_time)
+
+
+def open_source(spec, pacing=PACING_REALTIME, loop=False, fps=30.0):
+    """
+    Tạo FrameSource từ chuỗi mô tả (dùng cho command line)
+    Args:
+        spec: "0" (camera id), "synthetic", "synthetic:1280x720",
+              đường dẫn thư mục ảnh, hoặc đường dẫn file video
+    Returns:
+        FrameSource
+    """
+    spec = str(spec)
+    if spec.isdigit():
+        return LiveCameraSource(int(spec))
+    if spec == 'synthetic' or spec.startswith('synthetic:'):
+        width, height = 640, 480
+        if ':' in spec:
+            width, height = (int(v) for v in spec.split(':', 1)[1].split('x'))
+        return SyntheticSource(width, height, fps=fps, pacing=pacing)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, fps=fps, pacing=pacing, loop=loop)
+    return VideoFileSource(spec, pacing=pacing, loop=loop)
+
+
+class Frame:
+    """
+    Frame bất biến, dùng chung giữa perception, MJPEG stream và recording
+    Consumer giữ reference thay vì copy; buffer bị khóa ghi (read-only)
+    RGB cho MediaPipe được tạo lazy và tối đa 1 lần
+    """
+    __slots__ = ('bgr', 'frame_id', 'timestamp', 'arrival', '_rgb', '_lock')
+
+    def __init__(self, bgr, frame_id, timestamp, arrival=None):
+        """
+        Args:
+            bgr: np.array (H, W, 3) uint8, frame sở hữu buffer này
+            frame_id: int tăng dần theo thứ tự capture
+            timestamp: float, thời điểm capture (media time với nguồn PACING_FAST)
+            arrival: wall clock lúc frame được đọc từ nguồn, dùng đo input lag
+                     (None = time.time() lúc tạo Frame)
+        """
+        bgr.setflags(write=False)
+        self.bgr = bgr
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.arrival = time.time() if arrival is None else arrival
+        self._rgb = None
+        self._lock = threading.Lock()
+
+    @property
+    def rgb(self):
+        """Ảnh RGB (read-only), chỉ chuyển màu ở lần truy cập đầu tiên"""
+        rgb = self._rgb
+        if rgb is None:
+            with self._lock:
+                if self._rgb is None:
+                    converted = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+                    converted.setflags(write=False)
+                    self._rgb = converted
+                rgb = self._rgb
+        return rgb
+
+    @property
+    def has_rgb(self):
+        """True nếu RGB đã được tạo"""
+        return self._rgb is not None
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+
+class Camera:
+    def __init__(self, camera_id=0, source=None):
+        """
+        Args:
+            camera_id: id camera vật lý (dùng khi không truyền source)
+            source: FrameSource bất kỳ (file, thư mục ảnh, synthetic)
+        """
+        self.source = source if source is not None else LiveCameraSource(camera_id)
+        self.last_frame = None
+        self.next_frame_id = 0
+
+    @property
+    def finished(self):
+        """True khi nguồn hữu hạn đã phát hết frame"""
+        return self.source.finished
+
     def read_frame(self):
         """
-        Đọc frame từ camera (RGB cho MediaPipe)
+        Đọc frame từ nguồn
+        Buffer của source được chuyển thẳng vào Frame, không copy
         Returns:
-            tuple: (success, frame_rgb) hoặc (False, None)
+            tuple: (success, Frame) hoặc (False, None)
         """
-        ret, frame = self.cap.read()
+        ret, frame_bgr, timestamp = self.source.read()
         if ret:
-            # Lưu frame BGR để dùng cho video stream
-            self.last_frame_bgr = frame.copy()
-            # Chuyển BGR sang RGB cho MediaPipe
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            return True, frame_rgb
+            frame = Frame(frame_bgr, self.next_frame_id, timestamp)
+            self.next_frame_id += 1
+            self.last_frame = frame
+            return True, frame
         return False, None
-    
+
     def get_last_frame_bgr(self):
         """
         Lấy frame BGR cuối cùng đã đọc (cho video stream)
         Returns:
-            numpy array hoặc None
+            numpy array (read-only) hoặc None
         """
-        return self.last_frame_bgr
-    
+        if self.last_frame is None:
+            return None
+        return self.last_frame.bgr
+
     def release(self):
         """Giải phóng camera"""
-        if self.cap:
-            self.cap.release()
+        if self.source:
+            self.source.release()
+
+
+class FrameMailbox:
+    """
+    Hộp thư 1 slot, frame mới nhất thắng
+    Capture thread put(), event loop được đánh thức qua call_soon_threadsafe
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item = None
+        self._loop = None
+        self._event = None
+        self.closed = False
+        self.published = 0    # Tổng số frame đã put
+        self.overwritten = 0  # Frame bị ghi đè trước khi loop kịp lấy
+
+    def bind(self, loop):
+        """Gắn mailbox vào event loop (gọi từ trong loop)"""
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def put(self, item):
+        """Đặt frame mới (gọi từ capture thread), ghi đè frame chưa lấy"""
+        with self._lock:
+            if self._item is not None:
+                self.overwritten += 1
+            self._item = item
+            self.published += 1
+        self._wake()
+
+    def take(self):
+        """Lấy frame hiện có (không chờ), None nếu trống"""
+        with self._lock:
+            item = self._item
+            self._item = None
+            return item
+
+    async def get(self, timeout=None):
+        """
+        Chờ frame mới (không busy-poll)
+        Args:
+            timeout: giây, None = chờ mãi
+        Returns:
+            item hoặc None nếu timeout / mailbox đã đóng
+        """
+        while True:
+            self._event.clear()
+            item = self.take()
+            if item is not None:
+                return item
+            if self.closed:
+                return None
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+    def close(self):
+        """Đánh dấu nguồn đã hết, đánh thức loop"""
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._event.set)
+
+
+class CaptureThread(threading.Thread):
+    """
+    Thread riêng cho capture: cap.read() block ở đây, không block asyncio loop
+    Mỗi frame được publish vào FrameMailbox
+    """
+    def __init__(self, camera, mailbox, max_frames=None, metrics=None):
+        """
+        Args:
+            camera: Camera
+            mailbox: FrameMailbox nhận frame
+            max_frames: dừng sau N frame (None = chạy mãi)
+            metrics: Metrics ghi latency stage 'capture' (None = không đo)
+        """
+        super().__init__(name='capture', daemon=True)
+        self.camera = camera
+        self.mailbox = mailbox
+        self.max_frames = max_frames
+        self.metrics = metrics
+        self.frames_captured = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                start = time.perf_counter()
+                success, frame = self.camera.read_frame()
+                if not success:
+                    if self.camera.finished:
+                        break
+                    time.sleep(0.01)
+                    continue
+
+                self.frames_captured += 1
+                if self.metrics is not None:
+                    # Gồm cả thời gian chờ thiết bị / pacing của nguồn
+                    self.metrics.record('capture', time.perf_counter() - start)
+                self.mailbox.put(frame)
+                if self.max_frames is not None and self.frames_captured >= self.max_frames:
+                    break
+        finally:
+            self.mailbox.close()
+
+    def stop(self, timeout=1.0):
+        """Dừng thread và chờ nó thoát"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,33 @@
+"""
+Clock - nguồn thời gian inject vào các tầng (state machine, normalizer, pipeline)
+Clock là callable trả về giây (như time.time); advance_to(timestamp) báo timestamp capture mới
+- SystemClock: đồng hồ thật, advance_to không làm gì
+- SimulatedClock: chỉ chạy theo timestamp được báo, replay nhanh hơn realtime
+  mà timeout / cooldown vẫn giống hệt lúc ghi
+"""
+import time
+
+
+class SystemClock:
+    """Wall clock (time.time)"""
+    def __call__(self):
+        return time.time()
+
+    def advance_to(self, timestamp):
+        pass
+
+
+class SimulatedClock:
+    """Thời gian giả lập, tiến theo timestamp frame (không bao giờ lùi)"""
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def __call__(self):
+        return self.now
+
+    def advance_to(self, timestamp):
+        if timestamp > self.now:
+            self.now = float(timestamp)
+
+    def advance(self, seconds):
+        self.now += seconds
@@ -1,146 +1,185 @@
 """
 Gesture Layer
 Nhận chuỗi feature theo thời gian từ motion layer
-Phát event rời rạc: SWIPE_LEFT, SWIPE_RIGHT, PINCH, HOLD
+Phát event rời rạc: PINCH, SWIPE_LEFT, SWIPE_RIGHT, HOLD, POINT, FIST, OPEN
 Không biết UI, không biết item
+
+Mỗi frame tính 1 feature vector (khoảng cách đầu ngón - cổ tay, pinch, velocity,
+variance...), mọi gesture là bảng điều kiện lo < feature < hi trên vector đó và được
+đánh giá trong 1 lượt vectorized; hysteresis là array counter theo gesture.
+Thêm gesture = thêm dòng vào bảng, không thêm code Python chạy mỗi frame
 """
 import numpy as np
 
 
+# Feature vector mỗi frame (1 tay); NaN = chưa đủ dữ liệu (điều kiện luôn sai)
+FEATURES = (
+    'd_index', 'd_middle', 'd_ring', 'd_pinky',  # Đầu ngón -> cổ tay (8, 12, 16, 20 -> 0)
+    'pinch',                                     # Thumb tip (4) - index tip (8)
+    'index_dz',                                  # z index tip - z cổ tay (âm = chỉ về camera)
+    'vx', 'vy', 'speed',                         # Velocity (motion layer)
+    'horizontal',                                # |vx| - |vy| (> 0: chuyển động ngang)
+    'distance',                                  # Quãng đường 10 mẫu gần nhất
+    'swipe_confidence',
+    'var_max', 'var_mean',                       # Variance vị trí trên history
+    'history',                                   # Số mẫu trong history
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+_FINGERTIPS = [8, 12, 16, 20]
+_WRIST = 0
+
+# Thresholds
+SWIPE_VELOCITY_THRESHOLD = 0.3   # Tốc độ tối thiểu cho swipe
+SWIPE_DISTANCE_THRESHOLD = 0.15  # Khoảng cách tối thiểu
+PINCH_DISTANCE_THRESHOLD = 0.04  # Khoảng cách thumb-index cho pinch
+FINGER_FOLDED = 0.2              # Đầu ngón gần cổ tay hơn mức này = gập
+FINGER_EXTENDED = 0.25           # Xa hơn mức này = duỗi
+
+# Bảng gesture theo thứ tự ưu tiên: (tên, {feature: (lo, hi)}, repeat)
+# lo < feature < hi (None = không giới hạn phía đó)
+# repeat=True: giữ gesture thì phát lại sau mỗi hysteresis + cooldown
+# repeat=False: tư thế tĩnh, chỉ phát 1 lần mỗi lần tư thế xuất hiện
+GESTURE_RULES = (
+    ('PINCH', {'pinch': (None, PINCH_DISTANCE_THRESHOLD)}, True),
+    # Swipe: đủ nhanh, đủ xa, confidence (velocity + distance) >= 60%, ưu tiên ngang
+    ('SWIPE_LEFT', {
+        'speed': (SWIPE_VELOCITY_THRESHOLD, None),
+        'distance': (SWIPE_DISTANCE_THRESHOLD, None),
+        'swipe_confidence': (0.6, None),
+        'horizontal': (0.0, None),
+        'vx': (None, -0.1),
+    }, True),
+    ('SWIPE_RIGHT', {
+        'speed': (SWIPE_VELOCITY_THRESHOLD, None),
+        'distance': (SWIPE_DISTANCE_THRESHOLD, None),
+        'swipe_confidence': (0.6, None),
+        'horizontal': (0.0, None),
+        'vx': (0.1, None),
+    }, True),
+    # Hold: gần như đứng yên, variance thấp trên 10 mẫu (confidence >= 70%)
+    ('HOLD', {
+        'speed': (None, 0.05),
+        'history': (9.5, None),
+        'var_max': (None, 0.001),
+        'var_mean': (None, 0.0003),
+    }, True),
+    # Tư thế tĩnh (example_detect_camera.py)
+    ('POINT', {
+        'd_index': (FINGER_EXTENDED, None),
+        'd_middle': (None, FINGER_FOLDED),
+        'd_ring': (None, FINGER_FOLDED),
+        'd_pinky': (None, FINGER_FOLDED),
+        'index_dz': (None, -0.02),
+    }, False),
+    ('FIST', {
+        'd_index': (None, FINGER_FOLDED),
+        'd_middle': (None, FINGER_FOLDED),
+        'd_ring': (None, FINGER_FOLDED),
+        'd_pinky': (None, FINGER_FOLDED),
+    }, False),
+    ('OPEN', {
+        'd_index': (FINGER_EXTENDED, None),
+        'd_middle': (FINGER_EXTENDED, None),
+        'd_ring': (FINGER_EXTENDED, None),
+        'd_pinky': (FINGER_EXTENDED, None),
+    }, False),
+)
+
+
 class GestureDetector:
-    def __init__(self, motion_extractor):
+    def __init__(self, motion_extractor, rules=GESTURE_RULES):
         """
         Args:
             motion_extractor: MotionFeatureExtractor instance từ motion layer
+            rules: bảng gesture (xem GESTURE_RULES)
         """
         self.motion_extractor = motion_extractor
-        
-        # Thresholds
-        self.SWIPE_VELOCITY_THRESHOLD = 0.3  # Tốc độ tối thiểu cho swipe
-        self.SWIPE_DISTANCE_THRESHOLD = 0.15  # Khoảng cách tối thiểu
-        self.PINCH_DISTANCE_THRESHOLD = 0.04  # Khoảng cách thumb-index cho pinch
-        self.HOLD_TIME_THRESHOLD = 1.0  # Giây để hold
-        
+
         # State tracking
         self.last_gesture_time = {}
         self.gesture_cooldown = 0.3  # Giây giữa các gesture
-        
-        # Hysteresis: Frame-counter buffer để tránh flicker
-        # Gesture phải được detect trong N frames liên tiếp mới được emit
+
+        # Hysteresis: gesture phải được detect trong N frames liên tiếp mới được emit
         self.HYSTERESIS_FRAMES = 3
-        self.gesture_buffer = {}  # {gesture_name: frame_count}
-    
-    def detect_swipe(self):
-        """
-        Detect swipe gesture với confidence scoring
-        Returns:
-            str: 'SWIPE_LEFT', 'SWIPE_RIGHT', hoặc None
-        """
-        velocity = self.motion_extractor.get_velocity()
-        if velocity is None:
-            return None
-        
-        vx, vy, magnitude = velocity
-        
-        # Kiểm tra velocity threshold
-        if magnitude < self.SWIPE_VELOCITY_THRESHOLD:
-            return None
-        
-        # Kiểm tra distance threshold
-        distance = self.motion_extractor.get_distance(start_idx=-10, end_idx=-1)
-        if distance is None or distance < self.SWIPE_DISTANCE_THRESHOLD:
-            return None
-        
-        # Confidence: dựa trên velocity magnitude và distance
-        # Velocity càng cao, distance càng xa = confidence càng cao
-        velocity_confidence = min(1.0, magnitude / (self.SWIPE_VELOCITY_THRESHOLD * 2))
-        distance_confidence = min(1.0, distance / (self.SWIPE_DISTANCE_THRESHOLD * 2))
-        overall_confidence = (velocity_confidence + distance_confidence) / 2
-        
-        # Chỉ accept nếu confidence >= 60%
-        if overall_confidence < 0.6:
-            return None
-        
-        # Xác định hướng (ưu tiên ngang hơn dọc)
-        if abs(vx) > abs(vy):
-            if vx < -0.1:  # Chuyển động sang trái
-                return 'SWIPE_LEFT'
-            elif vx > 0.1:  # Chuyển động sang phải
-                return 'SWIPE_RIGHT'
-        
-        return None
-    
-    def detect_pinch(self, hand_landmarks):
+
+        self.features = np.full(len(FEATURES), np.nan)
+        self._compile(rules)
+
+    def _compile(self, rules):
+        """Bảng gesture -> array điều kiện (feature, lo, hi) và gesture sở hữu"""
+        self.rules = tuple(rules)
+        self.gestures = tuple(name for name, _, _ in rules)
+        feature_ids, lows, highs, owners = [], [], [], []
+        for gesture_id, (_, conditions, _) in enumerate(rules):
+            for feature, (lo, hi) in conditions.items():
+                feature_ids.append(FEATURE_INDEX[feature])
+                lows.append(-np.inf if lo is None else lo)
+                highs.append(np.inf if hi is None else hi)
+                owners.append(gesture_id)
+        self._condition_features = np.array(feature_ids, dtype=np.intp)
+        self._condition_lo = np.array(lows)
+        self._condition_hi = np.array(highs)
+        self._condition_owner = np.array(owners, dtype=np.intp)
+        self._required = np.bincount(self._condition_owner, minlength=len(rules))
+        self._repeat = np.array([repeat for _, _, repeat in rules])
+        self.counters = np.zeros(len(rules), dtype=np.int64)
+        self.latched = np.zeros(len(rules), dtype=bool)
+
+    def register(self, name, conditions, repeat=True):
+        """Thêm gesture (ưu tiên thấp nhất) vào bảng"""
+        self._compile(self.rules + ((name, dict(conditions), repeat),))
+
+    def compute_features(self, hand_landmarks):
         """
-        Detect pinch gesture (thumb và index gần nhau) với confidence
+        Feature vector của frame hiện tại (ghi vào self.features)
         Args:
             hand_landmarks: np.array shape (21, 3)
         Returns:
-            str: 'PINCH' hoặc None
+            np.array (len(FEATURES),)
         """
-        if hand_landmarks is None or len(hand_landmarks) < 9:
-            return None
-        
-        # Landmark 4: thumb tip, 8: index tip
-        thumb_tip = hand_landmarks[4]
-        index_tip = hand_landmarks[8]
-        
-        distance = np.linalg.norm(thumb_tip[:3] - index_tip[:3])
-        
-        # Confidence: càng gần threshold càng thấp confidence
-        # Distance < 0.02: confidence cao, 0.02-0.04: confidence trung bình
-        if distance < self.PINCH_DISTANCE_THRESHOLD:
-            # Tính confidence (1.0 = rất chắc chắn, 0.5 = ngưỡng)
-            confidence = 1.0 - (distance / self.PINCH_DISTANCE_THRESHOLD) * 0.5
-            if confidence >= 0.5:  # Chỉ accept nếu confidence >= 50%
-                return 'PINCH'
-        
-        return None
-    
-    def detect_hold(self, hand_landmarks, current_time):
+        features = self.features
+        fingertips = hand_landmarks[_FINGERTIPS] - hand_landmarks[_WRIST]
+        features[0:4] = np.sqrt((fingertips * fingertips).sum(axis=1))
+        pinch = hand_landmarks[4] - hand_landmarks[8]
+        features[4] = np.sqrt(pinch.dot(pinch))
+        features[5] = hand_landmarks[8, 2] - hand_landmarks[_WRIST, 2]
+
+        motion = self.motion_extractor
+        velocity = motion.get_velocity()
+        if velocity is None:
+            features[6:10] = np.nan
+        else:
+            vx, vy, magnitude = velocity
+            features[6:10] = (vx, vy, magnitude, abs(vx) - abs(vy))
+        distance = motion.get_distance(start_idx=-10, end_idx=-1)
+        features[10] = np.nan if distance is None else distance
+        if velocity is None or distance is None:
+            features[11] = np.nan
+        else:
+            # Velocity càng cao, distance càng xa = confidence càng cao
+            features[11] = (min(1.0, velocity[2] / (SWIPE_VELOCITY_THRESHOLD * 2)) +
+                            min(1.0, distance / (SWIPE_DISTANCE_THRESHOLD * 2))) / 2
+        variance = motion.get_variance()
+        if variance is None:
+            features[12:14] = np.nan
+        else:
+            features[12:14] = (max(variance), (variance[0] + variance[1]) / 2)
+        features[14] = len(motion)
+        return features
+
+    def evaluate(self, features):
         """
-        Detect hold gesture (giữ tay ở một vị trí) với confidence
-        Args:
-            hand_landmarks: np.array shape (21, 3)
-            current_time: timestamp
+        Mọi gesture trong 1 lượt
         Returns:
-            str: 'HOLD' hoặc None
+            np.array bool (số gesture,) - gesture thoả mọi điều kiện
         """
-        if hand_landmarks is None:
-            return None
-        
-        # Kiểm tra velocity thấp
-        velocity = self.motion_extractor.get_velocity()
-        if velocity is None:
-            return None
-        
-        vx, vy, magnitude = velocity
-        
-        # Velocity rất thấp = đang giữ
-        if magnitude < 0.05:
-            # Kiểm tra thời gian giữ
-            if len(self.motion_extractor.position_history) >= 10:
-                # Tính variance của vị trí
-                positions = list(self.motion_extractor.position_history)[-10:]
-                positions_x = [p[0] for p in positions]
-                positions_y = [p[1] for p in positions]
-                
-                var_x = np.var(positions_x)
-                var_y = np.var(positions_y)
-                
-                # Variance thấp = giữ yên
-                # Confidence: variance càng thấp, confidence càng cao
-                max_variance = 0.001
-                var_confidence_x = 1.0 - min(1.0, var_x / max_variance)
-                var_confidence_y = 1.0 - min(1.0, var_y / max_variance)
-                overall_confidence = (var_confidence_x + var_confidence_y) / 2
-                
-                # Chỉ accept nếu confidence >= 70% (hold cần chắc chắn hơn)
-                if var_x < 0.001 and var_y < 0.001 and overall_confidence >= 0.7:
-                    return 'HOLD'
-        
-        return None
-    
+        values = features[self._condition_features]
+        satisfied = (values > self._condition_lo) & (values < self._condition_hi)
+        counts = np.bincount(self._condition_owner, weights=satisfied,
+                             minlength=len(self.gestures))
+        return counts == self._required
+
     def process(self, hand_landmarks, current_time=None):
         """
         Xử lý và detect tất cả gestures với hysteresis
@@ -149,51 +188,41 @@ class GestureDetector:
             str: gesture name hoặc None
         """
         if hand_landmarks is None:
-            # Reset buffer khi không có hand
-            self.gesture_buffer.clear()
+            # Reset counter khi không có hand
+            self.counters[:] = 0
+            self.latched[:] = False
             return None
-        
+
         # Kiểm tra cooldown
         if current_time is not None:
             last_time = self.last_gesture_time.get('last', 0)
             if current_time - last_time < self.gesture_cooldown:
                 return None
-        
-        # Detect tất cả gestures
-        detected_gestures = []
-        
-        # Priority: PINCH > SWIPE > HOLD
-        pinch = self.detect_pinch(hand_landmarks)
-        if pinch:
-            detected_gestures.append(pinch)
-        
-        swipe = self.detect_swipe()
-        if swipe:
-            detected_gestures.append(swipe)
-        
-        hold = self.detect_hold(hand_landmarks, current_time)
-        if hold:
-            detected_gestures.append(hold)
-        
-        # Hysteresis: Cập nhật buffer cho các gestures được detect
-        # Reset buffer cho gestures không được detect
-        for gesture_name in ['PINCH', 'SWIPE_LEFT', 'SWIPE_RIGHT', 'HOLD']:
-            if gesture_name in detected_gestures:
-                self.gesture_buffer[gesture_name] = self.gesture_buffer.get(gesture_name, 0) + 1
-            else:
-                # Reset counter nếu gesture không được detect
-                if gesture_name in self.gesture_buffer:
-                    self.gesture_buffer[gesture_name] = 0
-        
-        # Chỉ emit gesture nếu đã được detect trong N frames liên tiếp
-        for gesture_name in ['PINCH', 'SWIPE_LEFT', 'SWIPE_RIGHT', 'HOLD']:
-            if gesture_name in self.gesture_buffer:
-                if self.gesture_buffer[gesture_name] >= self.HYSTERESIS_FRAMES:
-                    # Reset buffer sau khi emit
-                    self.gesture_buffer[gesture_name] = 0
-                    if current_time is not None:
-                        self.last_gesture_time['last'] = current_time
-                    return gesture_name
-        
-        return None
 
+        detected = self.evaluate(self.compute_features(hand_landmarks))
+
+        # Hysteresis: cộng counter gesture được detect, reset gesture không được detect
+        counters = self.counters
+        counters += 1
+        counters *= detected
+        self.latched &= detected
+
+        # Chỉ emit gesture (ưu tiên cao nhất) đã được detect trong N frames liên tiếp
+        ready = (counters >= self.HYSTERESIS_FRAMES) & ~self.latched
+        if not ready.any():
+            return None
+        gesture_id = int(ready.argmax())
+        if self._repeat[gesture_id]:
+            # Reset counter sau khi emit
+            counters[gesture_id] = 0
+        else:
+            self.latched[gesture_id] = True
+        if current_time is not None:
+            self.last_gesture_time['last'] = current_time
+        return self.gestures[gesture_id]
+
+    def reset(self):
+        """Quên hysteresis và cooldown (track tay mới)"""
+        self.counters[:] = 0
+        self.latched[:] = False
+        self.last_gesture_time.clear()
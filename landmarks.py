@@ -0,0 +1,113 @@
+"""
+Landmark representation - buffer float32 cấp phát sẵn, dùng lại giữa các frame
+Chỉ chuyển các index được khai báo (Face Mesh 478 điểm nhưng chỉ cần vài điểm)
+Không biết MediaPipe graph, chỉ đọc thuộc tính x, y, z, visibility của landmark
+"""
+import numpy as np
+
+
+# Index thực sự được dùng ở các tầng sau
+HAND_INDICES = tuple(range(21))
+# 33, 263: mắt (rotation), 152: cằm, 234, 454: má (face scale)
+FACE_INDICES = (33, 263, 152, 234, 454)
+# 11, 12: vai (neck anchor)
+POSE_INDICES = (11, 12)
+
+
+class LandmarkSet:
+    """
+    Landmark của 1 model cho 1 frame: points (K, 3) và visibility (K,) float32
+    K = số index khai báo; truy cập theo index gốc của model qua set[index]
+    """
+    __slots__ = ('indices', 'points', 'visibility', 'present', '_buffer', '_rows')
+
+    def __init__(self, indices):
+        """
+        Args:
+            indices: tuple index gốc của model cần lấy (vd. FACE_INDICES)
+        """
+        self.indices = tuple(indices)
+        # 1 buffer (K, 4): fill chỉ cần 1 lần gán; points / visibility là view
+        self._buffer = np.zeros((len(self.indices), 4), dtype=np.float32)
+        self.points = self._buffer[:, :3]
+        self.visibility = self._buffer[:, 3]
+        self.present = False
+        self._rows = {index: row for row, index in enumerate(self.indices)}
+
+    def fill(self, landmark_list):
+        """
+        Chép các index khai báo từ list landmark của MediaPipe vào buffer
+        Args:
+            landmark_list: sequence có .x, .y, .z, .visibility (vd. hand.landmark)
+        Returns:
+            np.array points (K, 3) - view vào buffer, bị ghi đè khi set được dùng lại
+        """
+        self._buffer[:] = [
+            (lm.x, lm.y, lm.z, lm.visibility)
+            for lm in map(landmark_list.__getitem__, self.indices)
+        ]
+        self.present = True
+        return self.points
+
+    def clear(self):
+        self.present = False
+
+    def __getitem__(self, index):
+        """Điểm (3,) theo index gốc của model"""
+        return self.points[self._rows[index]]
+
+    def __len__(self):
+        return len(self.indices)
+
+
+class LandmarkFrame:
+    """
+    Landmark của mọi model cho 1 frame, gắn frame id và timestamp capture
+    hand_sets: 1 LandmarkSet cho mỗi tay (tối đa max_hands), hands = hand_sets[0]
+    """
+    __slots__ = ('frame_id', 'timestamp', 'hands', 'hand_sets', 'face', 'pose')
+
+    def __init__(self, hand_indices=HAND_INDICES, face_indices=FACE_INDICES,
+                 pose_indices=POSE_INDICES, max_hands=1):
+        self.frame_id = None
+        self.timestamp = None
+        self.hand_sets = tuple(LandmarkSet(hand_indices) for _ in range(max(1, max_hands)))
+        self.hands = self.hand_sets[0]
+        self.face = LandmarkSet(face_indices)
+        self.pose = LandmarkSet(pose_indices)
+
+    def present_hands(self):
+        """list points (K, 3) của các tay có mặt ở frame này"""
+        return [hand.points for hand in self.hand_sets if hand.present]
+
+    def reset(self, frame_id=None, timestamp=None):
+        """Chuẩn bị dùng lại cho frame mới (không cấp phát)"""
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        for hand in self.hand_sets:
+            hand.clear()
+        self.face.clear()
+        self.pose.clear()
+
+
+class LandmarkFramePool:
+    """
+    Ring LandmarkFrame cấp phát 1 lần
+    Array trả về từ 1 frame còn hợp lệ cho tới khi pool quay lại frame đó
+    (sau `size` lần acquire)
+    """
+    def __init__(self, size=3, **kwargs):
+        """
+        Args:
+            size: số frame trong ring
+            kwargs: hand_indices / face_indices / pose_indices / max_hands (xem LandmarkFrame)
+        """
+        self.frames = [LandmarkFrame(**kwargs) for _ in range(size)]
+        self.next_index = 0
+
+    def acquire(self, frame_id=None, timestamp=None):
+        """Lấy frame kế tiếp trong ring, đã reset"""
+        frame = self.frames[self.next_index]
+        self.next_index = (self.next_index + 1) % len(self.frames)
+        frame.reset(frame_id, timestamp)
+        return frame
@@ -1,62 +1,164 @@
 import asyncio
 import time
-import cv2
-import signal
-import sys
+import argparse
 from aiohttp import web
-import threading
 from concurrent.futures import ThreadPoolExecutor
-from camera import Camera
-from perception import Perception
-from normalize import Normalizer
-from motion import MotionFeatureExtractor
-from gesture import GestureDetector
-from state import StateMachine, SystemState
+from camera import Camera, CaptureThread, FrameMailbox, open_source, PACING_FAST, PACING_REALTIME
+from perception import Perception, DEFAULT_CADENCE
+from perception_process import ProcessPerception
+from quality import QualityController, QUALITY_LEVELS, DEFAULT_LEVEL, level_for_cadence
+from metrics import Metrics
+from profiler import SamplingProfiler, ProfilerBusy
+from pipeline import InteractionPipeline
+from recording import LandmarkRecorder
+from trajectory import TemplateLibrary
+from state import SystemState
 from bridge import WebSocketBridge
+from mjpeg import MjpegBroadcaster, CONTENT_TYPE
+
+
+# Chế độ lập lịch perception
+SCHEDULE_DROP = 'drop'      # Bỏ frame đến khi worker bận, xử lý frame kế tiếp khi rảnh
+SCHEDULE_LATEST = 'latest'  # Worker rảnh là lấy ngay frame mới nhất, bỏ frame cũ
+
+# Backend chạy MediaPipe
+BACKEND_THREAD = 'thread'    # Cùng process, chung GIL
+BACKEND_PROCESS = 'process'  # Process riêng, frame qua shared memory
+
+
+def export_quality_metrics(metrics, quality):
+    """Counter / gauge của QualityController cho /metrics (quality_level: 0 = mức cao nhất)"""
+    metrics.set_counter('quality_changes_total', quality.changes)
+    metrics.set_counter('quality_graph_rebuilds_total', quality.rebuilds)
+    metrics.set_counter('quality_deferred_total', quality.deferred)
+    metrics.set_gauge('quality_level', quality.level_index)
 
 
 class System:
-    def __init__(self):
+    def __init__(self, source=None, max_frames=None, schedule=SCHEDULE_DROP,
+                 perception_backend=BACKEND_THREAD, parallel_models=True, cadence=None,
+                 target_fps=None, inference_scale=1.0, inference_size=None, hand_roi=False,
+                 metrics=True, record_path=None, clock=None, max_hands=1, templates=None):
+        """
+        Args:
+            source: FrameSource (file, thư mục ảnh, synthetic). None = camera 0
+            max_frames: dừng sau N frame đọc được (None = chạy mãi)
+            schedule: SCHEDULE_LATEST hoặc SCHEDULE_DROP
+            perception_backend: BACKEND_THREAD hoặc BACKEND_PROCESS
+            parallel_models: TRY_ON chạy Hands/Face Mesh/Pose song song
+            cadence: dict {'face_mesh': N, 'pose': M} (None = mặc định của Perception)
+            target_fps: bật quality controller giữ FPS perception này (None = tắt)
+            inference_scale: tỉ lệ resize frame trước khi đưa vào model
+            inference_size: (width, height) cố định của ảnh inference (letterbox nếu khác aspect)
+            hand_roi: Hands chạy trên crop quanh tay của frame trước
+            metrics: đo latency từng stage, xem tại /metrics
+            record_path: ghi kết quả perception mỗi frame ra file (xem recording.py)
+            clock: clock cho pipeline, tiến theo timestamp capture (None = SystemClock)
+            max_hands: số tay theo dõi cùng lúc, mỗi tay 1 track id (nhiều người)
+            templates: TemplateLibrary cho trajectory gesture (None = template mặc định)
+        """
+        if schedule not in (SCHEDULE_DROP, SCHEDULE_LATEST):
+            raise ValueError(f"Schedule không hợp lệ: {schedule}")
+        # Quality controller điều khiển cadence: mức khởi đầu là mức có đúng cadence người dùng chọn
+        start_level = None
+        if target_fps:
+            start_level = DEFAULT_LEVEL if cadence is None else level_for_cadence(cadence)
+            if start_level is None:
+                options = ', '.join(
+                    f"{level['name']} {level['cadence']['face_mesh']}/{level['cadence']['pose']}"
+                    for level in QUALITY_LEVELS
+                )
+                raise ValueError(
+                    f"--target-fps: cadence face/pose {cadence['face_mesh']}/{cadence['pose']} "
+                    f"không thuộc mức chất lượng nào ({options})"
+                )
         # Khởi tạo các tầng
         try:
             print("Đang khởi tạo camera...")
-            self.camera = Camera(camera_id=0)
-            print("Camera đã khởi tạo")
+            self.camera = Camera(camera_id=0, source=source)
+            print(f"Camera đã khởi tạo ({type(self.camera.source).__name__})")
         except Exception as e:
             print(f"Lỗi khởi tạo camera: {e}")
             raise
         
         try:
-            print("Đang khởi tạo MediaPipe...")
-            self.perception = Perception()
+            print(f"Đang khởi tạo MediaPipe ({perception_backend})...")
+            perception_kwargs = {
+                'parallel': parallel_models,
+                'cadence': cadence,
+                'inference_scale': inference_scale,
+                'inference_size': inference_size,
+                'hand_roi': hand_roi,
+                'max_hands': max_hands
+            }
+            if perception_backend == BACKEND_PROCESS:
+                self.perception = ProcessPerception(**perception_kwargs)
+            else:
+                self.perception = Perception(**perception_kwargs)
             print("MediaPipe đã khởi tạo")
         except Exception as e:
             print(f"Lỗi khởi tạo MediaPipe: {e}")
             raise
         
-        self.normalizer = Normalizer(screen_width=1920, screen_height=1080)
-        self.motion_extractor = MotionFeatureExtractor()
-        self.gesture_detector = GestureDetector(self.motion_extractor)
-        self.state_machine = StateMachine(idle_timeout=8.0) # 8s timeout
+        # Adaptive quality: đổi độ phân giải inference / complexity / cadence theo latency
+        self.quality = None
+        if target_fps:
+            self.quality = QualityController(target_fps=target_fps, start_level=start_level)
+            self.perception.apply_quality(self.quality.level)
+        
+        # Normalize → Motion → Gesture → State (dùng chung với replay)
+        self.pipeline = InteractionPipeline(screen_width=1920, screen_height=1080,
+                                            idle_timeout=8.0, # 8s timeout
+                                            clock=clock, max_tracks=max_hands,
+                                            templates=templates)
+        self.clock = self.pipeline.clock
+        self.normalizer = self.pipeline.normalizer
+        self.state_machine = self.pipeline.state_machine
+        
+        # Ghi kết quả perception ra file để replay (None = không ghi)
+        self.recorder = LandmarkRecorder(record_path) if record_path else None
         self.bridge = WebSocketBridge(host='localhost', port=8765)
         
+        # Latency từng stage + counter, phục vụ tại /metrics
+        self.metrics = Metrics(enabled=metrics)
+        
+        # Capture thread riêng, publish vào mailbox 1 slot (frame mới nhất thắng)
+        self.mailbox = FrameMailbox()
+        self.capture_thread = CaptureThread(
+            self.camera, self.mailbox, max_frames=max_frames, metrics=self.metrics
+        )
+        
         # Multithreading cho Perception (tránh block main loop)
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='perception')
         self.perception_task = None
+        self.schedule = schedule
+        self.frame_event = None  # asyncio.Event báo có frame mới (SCHEDULE_LATEST)
+        
+        # MJPEG: encode 1 lần mỗi frame trong worker thread, dùng chung mọi viewer
+        self.video = MjpegBroadcaster(quality=80, max_fps=30.0, metrics=self.metrics)
+        self.video_task = None
         
         # HTTP server cho video stream
         self.app = web.Application()
         self.app.router.add_get('/video', self.video_stream_handler)
+        self.app.router.add_get('/metrics', self.metrics_handler)
+        # Sampling profiler theo yêu cầu, không tốn gì khi không có request
+        self.profiler = SamplingProfiler()
+        self.app.router.add_get('/profile', self.profile_handler)
         self.runner = None
         self.site = None
         
         # State tracking
-        self.last_hand_landmarks = None
         self.frame_count = 0
         self.dropped_frames = 0
+        self.last_processed_id = None
+        # Tuổi frame khi bắt đầu xử lý = input lag thực tế (giây)
+        self.frame_age_last = None
+        self.frame_age_count = 0
+        self.frame_age_sum = 0.0
+        self.frame_age_max = 0.0
         self.start_time = time.time()
-        self.current_frame_bgr = None
-        self.frame_lock = threading.Lock()
+        self.current_frame = None  # Frame bất biến mới nhất (dùng chung, không copy)
         self.running = False
     
     async def initialize(self):
@@ -67,34 +169,61 @@ class System:
         await self.runner.setup()
         self.site = web.TCPSite(self.runner, '0.0.0.0', 9000)
         await self.site.start()
+        self.video_task = asyncio.create_task(self.video.run())
         
         print("System initialized:")
         print("- WebSocket: ws://localhost:8765")
         print("- Video View: http://localhost:9000/video")
+        print("- Metrics: http://localhost:9000/metrics")
+        print("- Profile: http://localhost:9000/profile?seconds=5")
         self.running = True
     
     async def process_loop(self):
         """Main non-blocking processing loop"""
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
+        self.mailbox.bind(loop)
+        self.capture_thread.start()
+        worker = None
+        if self.schedule == SCHEDULE_LATEST:
+            self.frame_event = asyncio.Event()
+            worker = asyncio.create_task(self.perception_worker())
         
+        try:
+            await self._capture_loop(loop)
+        finally:
+            if worker is not None:
+                worker.cancel()
+                await asyncio.gather(worker, return_exceptions=True)
+
+    async def _capture_loop(self, loop):
+        """Nhận frame từ capture thread, phân phối cho MJPEG và perception"""
         while self.running:
-            # 1. Sensor Layer: Đọc frame thô nhất có thể
-            success, frame_rgb = self.camera.read_frame()
-            if not success:
-                await asyncio.sleep(0.01)
+            # 1. Sensor Layer: Chờ frame mới nhất từ capture thread
+            # Timeout để vẫn kiểm tra idle timeout khi không có frame
+            item = await self.mailbox.get(timeout=0.5)
+            if item is None:
+                if self.mailbox.closed:
+                    # Nguồn hữu hạn (file/thư mục/synthetic) đã hết frame
+                    print("Nguồn frame đã kết thúc")
+                    break
+                # Chạy trên executor perception (1 worker): không song song với pipeline.step
+                if await loop.run_in_executor(self.executor, self.pipeline.check_timeout):
+                    await self.bridge.emit_state_change(SystemState.IDLE.value)
                 continue
+            frame = item
             
-            # Cập nhật frame cho video stream (MJPEG)
-            frame_bgr = self.camera.get_last_frame_bgr()
-            if frame_bgr is not None:
-                with self.frame_lock:
-                    self.current_frame_bgr = frame_bgr.copy()
+            # Cập nhật frame cho video stream (MJPEG): chỉ đổi reference, không copy
+            self.current_frame = frame
+            self.video.publish(frame)
             
             # 2. Perception & Logic: Đẩy sang thread khác để không lag camera
+            if self.schedule == SCHEDULE_LATEST:
+                # Worker tự lấy frame mới nhất khi rảnh
+                self.frame_event.set()
             # Frame Dropping: Bỏ qua frame mới nếu executor đang busy để tránh latency tích lũy
-            if self.perception_task is None or self.perception_task.done():
+            elif self.perception_task is None or self.perception_task.done():
                 self.perception_task = loop.run_in_executor(
-                    self.executor, self._sync_logic, frame_rgb
+                    self.executor, self._process_frame, frame
                 )
                 # Đăng ký callback để gửi dữ liệu sang Bridge khi xử lý xong
                 self.perception_task.add_done_callback(
@@ -107,74 +236,94 @@ class System:
                 if self.dropped_frames % 30 == 0:  # Log mỗi 30 frames
                     print(f"Frame dropping: {self.dropped_frames} frames dropped (maintaining realtime)")
 
-            # Check timeout state machine
-            if self.state_machine.check_timeout():
-                await self.bridge.emit_state_change(SystemState.IDLE.value)
+            # Nhường event loop cho WebSocket/HTTP giữa các frame
+            # (chỉ chạy khi có frame, không phải busy-poll)
+            await asyncio.sleep(0)
 
-            await asyncio.sleep(0.001)
+    async def perception_worker(self):
+        """
+        SCHEDULE_LATEST: mỗi khi rảnh, xử lý ngay frame mới nhất đã capture
+        Các frame cũ hơn bị bỏ qua (đếm vào dropped_frames)
+        """
+        loop = asyncio.get_running_loop()
+        while self.running:
+            await self.frame_event.wait()
+            self.frame_event.clear()
+            frame = self.current_frame
+            if frame is None or frame.frame_id == self.last_processed_id:
+                continue
+            
+            try:
+                results = await loop.run_in_executor(self.executor, self._process_frame, frame)
+            except Exception as e:
+                # Lỗi 1 frame không được làm chết worker
+                print(f"Lỗi xử lý frame {frame.frame_id}: {e}")
+                continue
+            self.frame_count += 1
+            await self._emit_results(results)
+
+    def _process_frame(self, frame):
+        """Chạy trong executor: ghi nhận tuổi frame rồi xử lý"""
+        # Theo wall clock lúc frame đến: timestamp là media time với nguồn PACING_FAST
+        age = time.time() - frame.arrival
+        if self.last_processed_id is not None and self.schedule == SCHEDULE_LATEST:
+            # Frame bị bỏ qua giữa 2 lần xử lý (kể cả frame bị ghi đè trong mailbox)
+            self.dropped_frames += max(0, frame.frame_id - self.last_processed_id - 1)
+        self.last_processed_id = frame.frame_id
+        
+        self.frame_age_last = age
+        self.frame_age_count += 1
+        self.frame_age_sum += age
+        self.frame_age_max = max(self.frame_age_max, age)
+        self.metrics.record('input_lag', age)
+        if self.frame_age_count % 90 == 0:  # Log mỗi 90 frames
+            print(f"Input lag: last {age * 1000:.1f}ms, "
+                  f"mean {self.frame_age_sum / self.frame_age_count * 1000:.1f}ms, "
+                  f"max {self.frame_age_max * 1000:.1f}ms")
+        return self._sync_logic(frame)
 
-    def _sync_logic(self, frame_rgb):
+    def _sync_logic(self, frame):
         """Xử lý đồng bộ trong thread riêng"""
-        current_time = time.time() - self.start_time
-        results = {'gesture': None, 'cursor': None, 'transform': None}
-
-        # Perception: Hands
-        hand_landmarks = self.perception.process_hands(frame_rgb)
-        if hand_landmarks is not None:
-            self.last_hand_landmarks = hand_landmarks
-            # Normalize & Smooth
-            norm_pos = self.normalizer.get_index_finger_position(hand_landmarks)
-            if norm_pos:
-                pixel_x, pixel_y = self.normalizer.normalize_to_pixel(norm_pos[0], norm_pos[1])
-                results['cursor'] = (pixel_x, pixel_y)
-                self.motion_extractor.update(norm_pos[0], norm_pos[1], current_time)
-
-        # Gesture Detection
-        gesture = self.gesture_detector.process(self.last_hand_landmarks, current_time)
-        if gesture:
-            is_valid, should_emit = self.state_machine.handle_gesture(gesture)
-            if is_valid and should_emit:
-                results['gesture'] = gesture
-                results['new_state'] = self.state_machine.get_state().value
-
-        # Try-on logic (nếu đang trong state TRY_ON)
-        if self.state_machine.get_state() == SystemState.TRY_ON:
-            face_data = self.perception.process_face(frame_rgb)
-            if face_data:
-                # Smooth neck anchor
-                smooth_anchor = self.normalizer.smooth_neck_anchor(
-                    face_data['neck_anchor'][0], 
-                    face_data['neck_anchor'][1]
-                )
-                anchor_x, anchor_y = self.normalizer.normalize_to_pixel(
-                    smooth_anchor[0], smooth_anchor[1]
-                )
-                
-                # Smooth rotation và scale
-                smooth_rotation = self.normalizer.smooth_rotation(face_data['rotation'])
-                smooth_scale = self.normalizer.smooth_scale(face_data['face_scale'])
-                
-                results['transform'] = {
-                    'anchor': (anchor_x, anchor_y),
-                    'rotation': smooth_rotation,
-                    'scale': smooth_scale
-                }
+        # Mọi tầng dùng timestamp capture của frame, không tự lấy đồng hồ
+        lap = self.metrics.lap()
+
+        # Perception: TRY_ON chạy Hands + Face Mesh + Pose song song
+        # (state lấy ở đầu frame; RGB tạo lazy, chỉ frame được xử lý mới tốn cvtColor)
+        try_on = self.pipeline.is_try_on()
+        rgb = frame.rgb
+        lap('color_convert')
+        perceived = self.perception.process_frame(
+            rgb, frame.frame_id, try_on=try_on, timestamp=frame.timestamp
+        )
+        lap('perception')
+        # Latency từng model MediaPipe ('total' đã nằm trong 'perception')
+        self.metrics.record_timings(
+            {model: seconds for model, seconds in perceived['timings'].items() if model != 'total'}
+        )
+        if self.quality is not None:
+            # Đổi chất lượng giữa 2 frame, ngay trên thread perception
+            new_level = self.quality.observe(perceived['timings'])
+            if new_level is not None:
+                self.perception.apply_quality(new_level)
+        if self.recorder is not None:
+            self.recorder.write(perceived, frame.timestamp, try_on)
+            lap('record')
         
+        # Normalize → Motion → Gesture → State → transform try-on
+        results = self.pipeline.step(perceived['multi_hands'], perceived['face'], frame.timestamp, lap)
+        # Idle timeout theo timestamp capture, cùng thread với step; gửi kèm FRAME_UPDATE
+        if self.pipeline.check_timeout(frame.timestamp):
+            results['new_state'] = SystemState.IDLE.value
         return results
 
     async def _emit_results(self, results):
-        """Gửi kết quả từ thread xử lý sang WebSocket"""
-        if results['cursor']:
-            await self.bridge.emit_cursor_move(*results['cursor'])
-        
-        if results['gesture']:
-            await self.bridge.emit_gesture_event(results['gesture'])
-            if 'new_state' in results:
-                await self.bridge.emit_state_change(results['new_state'])
-                
-        if results['transform']:
-            t = results['transform']
-            await self.bridge.emit_item_transform(t['anchor'], t['rotation'], t['scale'])
+        """Gửi kết quả từ thread xử lý sang WebSocket: 1 FRAME_UPDATE mỗi frame (kèm timestamp capture)"""
+        lap = self.metrics.lap()
+        await self.bridge.emit_frame_update(
+            results['cursors'], results['gestures'], results.get('new_state'),
+            results['transform'], results['capture_ts']
+        )
+        lap('broadcast')
 
     async def run(self):
         """Khởi động hệ thống"""
@@ -186,50 +335,187 @@ class System:
         finally:
             await self.cleanup()
     
+    async def metrics_handler(self, request):
+        """Latency từng stage (p50/p95/p99) + counter, dạng text scrape được"""
+        self.metrics.set_counter('frames_captured_total', self.capture_thread.frames_captured)
+        self.metrics.set_counter('frames_processed_total', self.frame_count)
+        self.metrics.set_counter('frames_dropped_total', self.dropped_frames)
+        self.metrics.set_counter('mailbox_overwritten_total', self.mailbox.overwritten)
+        self.metrics.set_counter('mjpeg_encodes_total', self.video.encodes)
+        self.metrics.set_counter('mjpeg_unchanged_total', self.video.unchanged)
+        self.metrics.set_counter('mjpeg_viewer_skipped_total', self.video.viewer_skips)
+        self.metrics.set_gauge('mjpeg_viewers', self.video.viewers)
+        if self.quality is not None:
+            export_quality_metrics(self.metrics, self.quality)
+        # Hàng đợi gửi WebSocket: tổng (cả client đã ngắt) + từng client đang kết nối
+        stats = self.bridge.client_stats()
+        self.metrics.set_counter('bridge_coalesced_total', self.bridge.coalesced_total +
+                                 sum(client['coalesced'] for client in stats))
+        self.metrics.set_counter('bridge_overflow_disconnects_total',
+                                 self.bridge.overflow_disconnects)
+        for field, name in (('depth', 'bridge_client_queue_depth'),
+                            ('max_depth', 'bridge_client_queue_max_depth'),
+                            ('sent', 'bridge_client_sent'),
+                            ('bytes_sent', 'bridge_client_bytes_sent'),
+                            ('coalesced', 'bridge_client_coalesced')):
+            self.metrics.clear_gauge(name)
+            for client in stats:
+                self.metrics.set_gauge(name, client[field], {'client': client['client']})
+        return web.Response(text=self.metrics.render(), content_type='text/plain')
+    
+    async def profile_handler(self, request):
+        """
+        Lấy mẫu stack mọi thread trong `seconds` giây (tần số `hz`)
+        Trả về collapsed stack cho flame graph
+        """
+        try:
+            seconds = float(request.query.get('seconds', 5.0))
+            hz = float(request.query.get('hz', 100.0))
+        except ValueError:
+            return web.Response(status=400, text="seconds / hz phải là số\n")
+        
+        loop = asyncio.get_running_loop()
+        try:
+            # Thread riêng (không dùng executor perception), event loop vẫn chạy và bị lấy mẫu
+            stacks, samples = await loop.run_in_executor(None, self.profiler.sample, seconds, hz)
+        except ProfilerBusy as e:
+            return web.Response(status=409, text=f"{e}\n")
+        print(f"Profile: {samples} samples, {len(stacks)} unique stacks")
+        return web.Response(text=self.profiler.render(stacks), content_type='text/plain')
+    
     async def video_stream_handler(self, request):
-        """MJPEG Streamer"""
+        """MJPEG Streamer: nhận part đã encode sẵn từ MjpegBroadcaster"""
         response = web.StreamResponse()
-        response.headers['Content-Type'] = 'multipart/x-mixed-replace; boundary=frame'
+        response.headers['Content-Type'] = CONTENT_TYPE
         response.headers['Access-Control-Allow-Origin'] = '*'
         await response.prepare(request)
         
         try:
-            while self.running:
-                with self.frame_lock:
-                    if self.current_frame_bgr is None:
-                        await asyncio.sleep(0.01)
-                        continue
-                    frame = self.current_frame_bgr.copy()
-                
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                await response.write(
-                    b'--frame\r\n'
-                    b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n'
-                )
-                await asyncio.sleep(0.03) # ~30 FPS
-        except:
+            await self.video.stream(response)
+        except ConnectionResetError:
             pass
         return response
     
+    def report_throughput(self):
+        """In throughput đo được (dùng khi chạy headless với file/synthetic)"""
+        elapsed = time.time() - self.start_time
+        if elapsed <= 0:
+            return
+        print(f"Throughput ({self.schedule}): {self.frame_count} frames processed, "
+              f"{self.dropped_frames} dropped, "
+              f"{self.mailbox.overwritten} overwritten in mailbox, "
+              f"{self.capture_thread.frames_captured} captured in {elapsed:.1f}s "
+              f"({self.frame_count / elapsed:.1f} FPS)")
+        if self.quality is not None:
+            print(f"Quality: {self.quality.level['name']}, {self.quality.changes} changes, "
+                  f"{self.quality.rebuilds} graph rebuilds, {self.quality.deferred} deferred")
+        # Chỉ có với backend thread (process backend giữ tracker trong process con)
+        hand_roi = getattr(self.perception, 'hand_roi', None)
+        if hand_roi is not None:
+            print(f"Hand ROI: {hand_roi.roi_frames} cropped, {hand_roi.full_frames} full frame, "
+                  f"{hand_roi.fallbacks} fallbacks")
+        if self.frame_age_count:
+            print(f"Input lag: mean {self.frame_age_sum / self.frame_age_count * 1000:.1f}ms, "
+                  f"max {self.frame_age_max * 1000:.1f}ms")
+
     async def cleanup(self):
         """Dọn dẹp resources"""
         print("Cleaning up...")
         self.running = False
+        self.report_throughput()
+        self.video.close()
+        if self.video_task is not None:
+            await asyncio.gather(self.video_task, return_exceptions=True)
         if self.runner: await self.runner.cleanup()
+        self.capture_thread.stop()
         self.camera.release()
+        # Chờ frame đang xử lý xong trước khi đóng MediaPipe graph
+        self.executor.shutdown(wait=True)
         self.perception.release()
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"Recording: {self.recorder.frames_written} frames -> {self.recorder.path}")
         await self.bridge.stop_server()
-        self.executor.shutdown(wait=False)
         print("Done.")
 
 
-async def main():
-    system = System()
+def parse_size(value):
+    """'WxH' -> (W, H)"""
+    try:
+        width, height = (int(v) for v in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Kích thước không hợp lệ: {value} (cần WxH)")
+    return (width, height)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Touchless interaction backend")
+    parser.add_argument('--source', default='0',
+                        help="Camera id, 'synthetic[:WxH]', thư mục ảnh hoặc file video")
+    parser.add_argument('--pacing', choices=[PACING_REALTIME, PACING_FAST],
+                        default=PACING_REALTIME,
+                        help="realtime: giữ timestamp gốc, fast: nhanh nhất có thể")
+    parser.add_argument('--fps', type=float, default=30.0,
+                        help="FPS cho thư mục ảnh và synthetic")
+    parser.add_argument('--loop', action='store_true',
+                        help="Lặp lại file/thư mục ảnh (soak test)")
+    parser.add_argument('--schedule', choices=[SCHEDULE_DROP, SCHEDULE_LATEST],
+                        default=SCHEDULE_DROP,
+                        help="drop: bỏ frame khi worker bận, latest: luôn xử lý frame mới nhất")
+    parser.add_argument('--perception', choices=[BACKEND_THREAD, BACKEND_PROCESS],
+                        default=BACKEND_THREAD,
+                        help="thread: MediaPipe trong executor, process: process riêng + shared memory")
+    parser.add_argument('--serial-models', action='store_true',
+                        help="TRY_ON chạy Hands, Face Mesh, Pose tuần tự (mặc định song song)")
+    parser.add_argument('--face-cadence', type=int, default=DEFAULT_CADENCE['face_mesh'],
+                        help="TRY_ON: Face Mesh chạy mỗi N frame")
+    parser.add_argument('--pose-cadence', type=int, default=DEFAULT_CADENCE['pose'],
+                        help="TRY_ON: Pose chạy mỗi N frame")
+    parser.add_argument('--inference-scale', type=float, default=1.0,
+                        help="Tỉ lệ resize frame trước khi đưa vào model")
+    parser.add_argument('--inference-size', type=parse_size, default=None,
+                        help="Kích thước ảnh inference WxH (letterbox nếu khác aspect)")
+    parser.add_argument('--hand-roi', action='store_true',
+                        help="Hands chạy trên crop quanh tay của frame trước")
+    parser.add_argument('--max-hands', type=int, default=1,
+                        help="Số tay theo dõi cùng lúc (nhiều người trước 1 camera)")
+    parser.add_argument('--templates', default=None, metavar='PATH',
+                        help="Thư viện template trajectory gesture (python trajectory.py PATH --add ...)")
+    parser.add_argument('--target-fps', type=float, default=None,
+                        help="Bật adaptive quality giữ FPS perception này")
+    parser.add_argument('--no-metrics', action='store_true',
+                        help="Tắt đo latency từng stage (/metrics chỉ còn counter)")
+    parser.add_argument('--record', default=None, metavar='PATH',
+                        help="Ghi landmark mỗi frame ra file để replay (python replay.py PATH)")
+    parser.add_argument('--max-frames', type=int, default=None,
+                        help="Dừng sau N frame (đo throughput headless)")
+    args = parser.parse_args()
+    if args.target_fps and level_for_cadence(
+            {'face_mesh': args.face_cadence, 'pose': args.pose_cadence}) is None:
+        parser.error("--target-fps: --face-cadence/--pose-cadence phải là cadence của 1 mức chất lượng "
+                     "(1/2 high, 2/3 medium, 2/4 low, 3/6 lowest)")
+    return args
+
+
+async def main(args):
+    source = open_source(args.source, pacing=args.pacing, loop=args.loop, fps=args.fps)
+    system = System(source=source, max_frames=args.max_frames, schedule=args.schedule,
+                    perception_backend=args.perception,
+                    parallel_models=not args.serial_models,
+                    cadence={'face_mesh': args.face_cadence, 'pose': args.pose_cadence},
+                    target_fps=args.target_fps,
+                    inference_scale=args.inference_scale,
+                    inference_size=args.inference_size,
+                    hand_roi=args.hand_roi,
+                    metrics=not args.no_metrics,
+                    record_path=args.record,
+                    max_hands=args.max_hands,
+                    templates=TemplateLibrary.load(args.templates) if args.templates else None)
     try:
         await system.run()
     except KeyboardInterrupt:
         pass
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
 
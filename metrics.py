@@ -0,0 +1,143 @@
+"""
+Metrics - latency từng stage và counter, xuất dạng text (Prometheus exposition)
+Ghi nhận O(1) vào ring buffer cấp phát sẵn, percentile chỉ tính khi scrape
+Không biết camera, không biết MediaPipe
+"""
+import time
+import numpy as np
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageStats:
+    """Latency rolling của 1 stage: `window` mẫu gần nhất + tổng tích luỹ"""
+    __slots__ = ('samples', 'index', 'count', 'total')
+
+    def __init__(self, window=1024):
+        self.samples = np.zeros(window)
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        self.samples[self.index] = seconds
+        self.index = (self.index + 1) % len(self.samples)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, quantiles=QUANTILES):
+        """Percentile trên cửa sổ hiện tại (copy để không lẫn với ghi đồng thời)"""
+        filled = min(self.count, len(self.samples))
+        if filled == 0:
+            return None
+        return np.quantile(self.samples[:filled].copy(), quantiles)
+
+
+class Lap:
+    """
+    Đo liên tiếp các stage trong 1 frame: mỗi lần gọi ghi thời gian từ lần gọi trước
+        lap = metrics.lap(); normalize(); lap('normalize'); detect(); lap('gesture')
+    """
+    __slots__ = ('metrics', 'last')
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.last = time.perf_counter()
+
+    def __call__(self, stage):
+        now = time.perf_counter()
+        self.metrics.record(stage, now - self.last)
+        self.last = now
+
+
+class Metrics:
+    """
+    Latency từng stage + counter
+    Mỗi stage / counter nên chỉ được ghi từ 1 thread (capture, perception, event loop);
+    scrape đọc từ event loop
+    """
+    def __init__(self, enabled=True, window=1024, prefix='touchless'):
+        """
+        Args:
+            enabled: False = mọi hook là no-op
+            window: số mẫu gần nhất dùng tính percentile mỗi stage
+            prefix: tiền tố tên metric
+        """
+        self.enabled = enabled
+        self.window = window
+        self.prefix = prefix
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}  # {name: {labels (tuple cặp key, value): giá trị}}
+
+    def record(self, stage, seconds):
+        """Ghi 1 mẫu latency (giây) cho stage"""
+        if not self.enabled:
+            return
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = StageStats(self.window)
+        stats.record(seconds)
+
+    def record_timings(self, timings, rename=None):
+        """Ghi cả dict {stage: giây} (vd. timings của Perception.process_frame)"""
+        if not self.enabled:
+            return
+        for stage, seconds in timings.items():
+            self.record(rename.get(stage, stage) if rename else stage, seconds)
+
+    def lap(self):
+        return Lap(self)
+
+    def increment(self, name, amount=1):
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_counter(self, name, value):
+        """Counter do nơi khác đếm sẵn (vd. System.frame_count)"""
+        self.counters[name] = value
+
+    def set_gauge(self, name, value, labels=None):
+        """
+        Giá trị hiện tại (vd. độ sâu hàng đợi gửi của từng client)
+        Args:
+            labels: dict label -> giá trị, mỗi tổ hợp label là 1 series
+        """
+        key = tuple(sorted(labels.items())) if labels else ()
+        self.gauges.setdefault(name, {})[key] = value
+
+    def clear_gauge(self, name):
+        """Xoá mọi series của gauge (vd. trước khi set lại theo danh sách client hiện tại)"""
+        self.gauges.pop(name, None)
+
+    def render(self):
+        """
+        Returns:
+            str: text exposition format (scrape được bằng Prometheus)
+        """
+        lines = []
+        name = f'{self.prefix}_stage_latency_seconds'
+        lines.append(f'# HELP {name} Latency từng stage (cửa sổ {self.window} mẫu gần nhất)')
+        lines.append(f'# TYPE {name} summary')
+        for stage in sorted(self.stages):
+            stats = self.stages[stage]
+            values = stats.quantiles()
+            if values is not None:
+                for quantile, value in zip(QUANTILES, values):
+                    lines.append(f'{name}{{stage="{stage}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {stats.total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {stats.count}')
+        for counter in sorted(self.counters):
+            counter_name = f'{self.prefix}_{counter}'
+            lines.append(f'# TYPE {counter_name} counter')
+            lines.append(f'{counter_name} {self.counters[counter]}')
+        for gauge in sorted(self.gauges):
+            gauge_name = f'{self.prefix}_{gauge}'
+            lines.append(f'# TYPE {gauge_name} gauge')
+            for labels, value in sorted(self.gauges[gauge].items()):
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f'{gauge_name}{{{label_text}}} {value}' if labels
+                             else f'{gauge_name} {value}')
+        return '\n'.join(lines) + '\n'
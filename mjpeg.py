@@ -0,0 +1,110 @@
+"""
+MJPEG broadcaster cho /video
+Encode mỗi frame mới đúng 1 lần trong worker thread rồi gửi cùng bytes cho mọi viewer
+(thay vì mỗi viewer tự cv2.imencode trên event loop)
+- Không có viewer hoặc frame_id không đổi: không encode
+- Viewer chậm chỉ nhận bản mới nhất khi ghi xong (bỏ frame), không buffer
+"""
+import asyncio
+import time
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+
+BOUNDARY = 'frame'
+CONTENT_TYPE = f'multipart/x-mixed-replace; boundary={BOUNDARY}'
+
+
+class MjpegBroadcaster:
+    def __init__(self, quality=80, max_fps=30.0, metrics=None):
+        """
+        Args:
+            quality: chất lượng JPEG (0-100)
+            max_fps: số lần encode tối đa mỗi giây
+            metrics: Metrics ghi latency stage 'mjpeg_encode' (None = không đo)
+        """
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.interval = 1.0 / max_fps
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mjpeg')
+        self.closed = False
+        self.viewers = 0
+
+        self._frame = None          # Frame mới nhất được publish
+        self._frame_event = asyncio.Event()
+        self._published = asyncio.Event()  # Thay mới mỗi lần có part mới
+        self.frame_id = None        # frame_id của part hiện tại
+        self.part = None            # Part multipart (header + JPEG) dùng chung mọi viewer
+        self.version = 0            # Tăng mỗi lần encode
+
+        # Counter (xem System.metrics_handler)
+        self.encodes = 0
+        self.unchanged = 0      # Lần bỏ encode vì frame_id không đổi
+        self.viewer_skips = 0   # Part viewer chậm bỏ qua
+
+    def publish(self, frame):
+        """Frame mới từ capture loop (gọi trong event loop, chỉ giữ reference)"""
+        self._frame = frame
+        self._frame_event.set()
+
+    def _encode(self, frame):
+        """Chạy trong worker thread (cv2.imencode nhả GIL)"""
+        start = time.perf_counter()
+        _, buffer = cv2.imencode('.jpg', frame.bgr, self.params)
+        part = (f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n\r\n'.encode()
+                + buffer.tobytes() + b'\r\n')
+        if self.metrics is not None:
+            self.metrics.record('mjpeg_encode', time.perf_counter() - start)
+        return part
+
+    async def run(self):
+        """Encoder task: chờ frame mới, encode trong worker thread, giới hạn max_fps"""
+        loop = asyncio.get_running_loop()
+        while not self.closed:
+            await self._frame_event.wait()
+            self._frame_event.clear()
+            frame = self._frame
+            if self.closed or frame is None or not self.viewers:
+                continue
+            if frame.frame_id == self.frame_id:
+                self.unchanged += 1
+                continue
+
+            start = time.perf_counter()
+            part = await loop.run_in_executor(self.executor, self._encode, frame)
+            self.frame_id = frame.frame_id
+            self.part = part
+            self.version += 1
+            self.encodes += 1
+            published, self._published = self._published, asyncio.Event()
+            published.set()
+            # Frame đến trong lúc chờ chỉ ghi đè _frame, lần sau lấy bản mới nhất
+            await asyncio.sleep(max(0.0, self.interval - (time.perf_counter() - start)))
+
+    async def stream(self, response):
+        """
+        Gửi part cho 1 viewer đến khi đóng; viewer ghi chậm thì bỏ qua các part ở giữa
+        Args:
+            response: aiohttp StreamResponse đã prepare
+        """
+        self.viewers += 1
+        # Viewer mới: encode frame hiện có ngay (nguồn có thể đang dừng)
+        self._frame_event.set()
+        version = self.version if self.part is None else self.version - 1
+        try:
+            while not self.closed:
+                if self.version == version:
+                    await self._published.wait()
+                    continue
+                if version:
+                    self.viewer_skips += self.version - version - 1
+                version = self.version
+                await response.write(self.part)
+        finally:
+            self.viewers -= 1
+
+    def close(self):
+        """Dừng encoder task và mọi viewer"""
+        self.closed = True
+        self._frame_event.set()
+        self._published.set()
+        self.executor.shutdown(wait=True)
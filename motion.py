@@ -2,18 +2,43 @@
 Motion Feature Layer
 Tính toán: vector chuyển động, velocity, distance, depth feature
 Đây là tầng toán học thuần túy
+
+History là ring buffer float64 cấp phát sẵn; mean / variance (Welford trên cửa sổ trượt)
+và velocity (least-squares trên `velocity_window` mẫu cuối) cập nhật O(1) mỗi frame
 """
 import numpy as np
-from collections import deque
+
+
+# Tính lại tổng từ ring sau chừng này lần update (chặn sai số cộng dồn)
+_RESYNC_INTERVAL = 1024
+# Đổi gốc thời gian khi timestamp cách gốc quá xa (giữ t^2 nhỏ cho least-squares)
+_REBASE_SECONDS = 60.0
 
 
 class MotionFeatureExtractor:
-    def __init__(self, history_size=10):
+    def __init__(self, history_size=10, velocity_window=5):
+        """
+        Args:
+            history_size: số mẫu giữ lại (cửa sổ tính mean / variance)
+            velocity_window: số mẫu cuối dùng fit velocity (least-squares)
+        """
+        if history_size < 2:
+            raise ValueError("history_size phải >= 2")
         self.history_size = history_size
-        self.position_history = deque(maxlen=history_size)
-        self.time_history = deque(maxlen=history_size)
-        self.last_time = None
-    
+        self.velocity_window = max(2, min(velocity_window, history_size))
+        self.positions = np.zeros((history_size, 2))
+        self.times = np.zeros(history_size)
+        self.reset()
+
+    def __len__(self):
+        return self.count
+
+    def _index(self, i):
+        """Index trong ring của mẫu thứ i (âm: tính từ mẫu mới nhất như list)"""
+        if i < 0:
+            return (self.head + i) % self.history_size
+        return (self.head - self.count + i) % self.history_size
+
     def update(self, x, y, current_time=None):
         """
         Cập nhật vị trí và thời gian
@@ -22,61 +47,153 @@ class MotionFeatureExtractor:
             current_time: timestamp (nếu None thì dùng frame count)
         """
         if current_time is None:
-            current_time = len(self.position_history)
-        
-        self.position_history.append((x, y))
-        self.time_history.append(current_time)
+            current_time = self.updates
+        x = float(x)
+        y = float(y)
+        t = float(current_time)
+        if self.count == 0:
+            self._t_ref = t
+        size = self.history_size
+        head = self.head
+        n = self.count
+
+        # Mẫu rời cửa sổ velocity (k mẫu cuối)
+        k = self.velocity_window
+        if n >= k:
+            out = (head - k) % size
+            self._remove_velocity_sample(self.positions.item(out, 0), self.positions.item(out, 1),
+                                         self.times.item(out) - self._t_ref)
+
+        if n == size:
+            # Welford cửa sổ trượt: thay mẫu cũ nhất bằng mẫu mới
+            old_x = self.positions.item(head, 0)
+            old_y = self.positions.item(head, 1)
+            delta_x = x - old_x
+            delta_y = y - old_y
+            mean_x = self._mean_x + delta_x / n
+            mean_y = self._mean_y + delta_y / n
+            self._m2_x += delta_x * (x - mean_x + old_x - self._mean_x)
+            self._m2_y += delta_y * (y - mean_y + old_y - self._mean_y)
+            self._mean_x = mean_x
+            self._mean_y = mean_y
+        else:
+            n += 1
+            delta_x = x - self._mean_x
+            delta_y = y - self._mean_y
+            self._mean_x += delta_x / n
+            self._mean_y += delta_y / n
+            self._m2_x += delta_x * (x - self._mean_x)
+            self._m2_y += delta_y * (y - self._mean_y)
+            self.count = n
+
+        self.positions[head, 0] = x
+        self.positions[head, 1] = y
+        self.times[head] = t
+        self.head = (head + 1) % size
         self.last_time = current_time
-    
+        self.updates += 1
+
+        if self.updates % _RESYNC_INTERVAL == 0 or t - self._t_ref > _REBASE_SECONDS:
+            self._resync()
+        else:
+            self._add_velocity_sample(x, y, t - self._t_ref)
+
+    def _add_velocity_sample(self, x, y, t):
+        self._s_t += t
+        self._s_tt += t * t
+        self._s_x += x
+        self._s_y += y
+        self._s_tx += t * x
+        self._s_ty += t * y
+
+    def _remove_velocity_sample(self, x, y, t):
+        self._s_t -= t
+        self._s_tt -= t * t
+        self._s_x -= x
+        self._s_y -= y
+        self._s_tx -= t * x
+        self._s_ty -= t * y
+
+    def _resync(self):
+        """
+        Tính lại mọi tổng từ ring (O(history_size), chạy thưa)
+        Gốc thời gian = mẫu cũ nhất trong cửa sổ velocity
+        """
+        order = [self._index(i) for i in range(self.count)]
+        positions = self.positions[order]
+        mean = positions.mean(axis=0)
+        m2 = ((positions - mean) ** 2).sum(axis=0)
+        self._mean_x, self._mean_y = float(mean[0]), float(mean[1])
+        self._m2_x, self._m2_y = float(m2[0]), float(m2[1])
+        window = order[-self.velocity_window:]
+        self._t_ref = self.times.item(window[0])
+        self._s_t = self._s_tt = self._s_x = self._s_y = self._s_tx = self._s_ty = 0.0
+        for i in window:
+            self._add_velocity_sample(self.positions.item(i, 0), self.positions.item(i, 1),
+                                      self.times.item(i) - self._t_ref)
+
     def get_velocity(self):
         """
-        Tính velocity (tốc độ chuyển động)
+        Tính velocity (tốc độ chuyển động): slope least-squares của x(t), y(t)
+        trên `velocity_window` mẫu cuối
         Returns:
             tuple: (vx, vy, magnitude) hoặc None nếu không đủ dữ liệu
         """
-        if len(self.position_history) < 2:
+        k = min(self.count, self.velocity_window)
+        if k < 2:
             return None
-        
-        pos1 = self.position_history[-2]
-        pos2 = self.position_history[-1]
-        time1 = self.time_history[-2]
-        time2 = self.time_history[-1]
-        
-        dt = time2 - time1
-        if dt == 0:
+
+        denominator = k * self._s_tt - self._s_t * self._s_t
+        # Mọi mẫu cùng timestamp (tương đương dt == 0)
+        if denominator <= 1e-12 * max(1.0, k * self._s_tt):
             return None
-        
-        dx = pos2[0] - pos1[0]
-        dy = pos2[1] - pos1[1]
-        
-        vx = dx / dt
-        vy = dy / dt
-        magnitude = np.sqrt(vx**2 + vy**2)
-        
+
+        vx = (k * self._s_tx - self._s_t * self._s_x) / denominator
+        vy = (k * self._s_ty - self._s_t * self._s_y) / denominator
+        magnitude = (vx * vx + vy * vy) ** 0.5
+
         return (vx, vy, magnitude)
-    
+
+    def get_mean(self):
+        """
+        Returns:
+            tuple: (mean_x, mean_y) trên cả history hoặc None
+        """
+        if self.count == 0:
+            return None
+        return (self._mean_x, self._mean_y)
+
+    def get_variance(self):
+        """
+        Variance vị trí trên cả history (như np.var, ddof=0)
+        Returns:
+            tuple: (var_x, var_y) hoặc None
+        """
+        if self.count == 0:
+            return None
+        return (max(0.0, self._m2_x) / self.count, max(0.0, self._m2_y) / self.count)
+
     def get_direction(self):
         """
         Tính hướng chuyển động
         Returns:
             tuple: (dx, dy) normalized direction vector hoặc None
         """
-        if len(self.position_history) < 2:
+        if self.count < 2:
             return None
-        
-        pos1 = self.position_history[-2]
-        pos2 = self.position_history[-1]
-        
-        dx = pos2[0] - pos1[0]
-        dy = pos2[1] - pos1[1]
-        
-        magnitude = np.sqrt(dx**2 + dy**2)
+
+        first = self._index(-2)
+        last = self._index(-1)
+        dx = self.positions.item(last, 0) - self.positions.item(first, 0)
+        dy = self.positions.item(last, 1) - self.positions.item(first, 1)
+
+        magnitude = (dx * dx + dy * dy) ** 0.5
         if magnitude == 0:
             return None
-        
+
         # Normalize
         return (dx / magnitude, dy / magnitude)
-    
+
     def get_distance(self, start_idx=-5, end_idx=-1):
         """
         Tính khoảng cách di chuyển trong khoảng thời gian
@@ -85,17 +202,20 @@ class MotionFeatureExtractor:
         Returns:
             float: distance hoặc None
         """
-        if len(self.position_history) < abs(start_idx):
+        if self.count < abs(start_idx) or self.count < abs(end_idx) or self.count == 0:
             return None
-        
-        pos1 = self.position_history[start_idx]
-        pos2 = self.position_history[end_idx]
-        
-        dx = pos2[0] - pos1[0]
-        dy = pos2[1] - pos1[1]
-        
-        return np.sqrt(dx**2 + dy**2)
-    
+
+        first = self._index(start_idx)
+        last = self._index(end_idx)
+        dx = self.positions.item(last, 0) - self.positions.item(first, 0)
+        dy = self.positions.item(last, 1) - self.positions.item(first, 1)
+
+        return (dx * dx + dy * dy) ** 0.5
+
+    def get_positions(self):
+        """History theo thứ tự thời gian (copy, dùng cho debug / test)"""
+        return self.positions[[self._index(i) for i in range(self.count)]]
+
     def get_depth_feature(self, z_values):
         """
         Tính depth feature từ z coordinates
@@ -110,23 +230,27 @@ class MotionFeatureExtractor:
         """
         if not z_values or len(z_values) == 0:
             return None
-        
+
         z_array = np.array(z_values)
         mean_depth = np.mean(z_array)
         depth_range = np.max(z_array) - np.min(z_array)
-        
+
         # Z âm = gần camera hơn
         is_forward = mean_depth < -0.05
-        
+
         return {
             'mean_depth': mean_depth,
             'depth_range': depth_range,
             'is_forward': is_forward
         }
-    
+
     def reset(self):
         """Reset history"""
-        self.position_history.clear()
-        self.time_history.clear()
+        self.head = 0
+        self.count = 0
+        self.updates = 0
         self.last_time = None
-
+        self._mean_x = self._mean_y = 0.0
+        self._m2_x = self._m2_y = 0.0
+        self._t_ref = 0.0
+        self._s_t = self._s_tt = self._s_x = self._s_y = self._s_tx = self._s_ty = 0.0
@@ -56,26 +56,127 @@ class OneEuroFilter:
         return x_filtered
 
 
-class Normalizer:
-    def __init__(self, screen_width=1920, screen_height=1080):
-        self.screen_width = screen_width
-        self.screen_height = screen_height
+class OneEuroFilterBank:
+    """
+    One Euro Filter cho cả khối (N, D) trong 1 lần cập nhật vectorized
+    min_cutoff / beta riêng từng kênh; mỗi hàng (N) có timestamp và trạng thái riêng
+    nên có thể cập nhật 1 nhóm hàng (slice) khi chỉ nhóm đó có dữ liệu mới
+    """
+    def __init__(self, shape, min_cutoff=1.0, beta=0.0, d_cutoff=1.0, freq=30):
+        """
+        Args:
+            shape: (N,) hoặc (N, D)
+            min_cutoff, beta: scalar, (N,) theo hàng hoặc array broadcast được tới shape
+            d_cutoff: cutoff cho đạo hàm
+            freq: tần số mặc định khi chưa có dt
+        """
+        self.shape = tuple(shape)
+        self.min_cutoff = self._per_channel(min_cutoff)
+        self.beta = self._per_channel(beta)
+        self.d_cutoff = d_cutoff
+        self.freq = freq
+        
+        self.x_prev = np.zeros(self.shape)
+        self.dx_prev = np.zeros(self.shape)
+        self.last_time = np.zeros(self.shape[0])
+        self.ready = np.zeros(self.shape[0], dtype=bool)
+        self._row_shape = (-1,) + (1,) * (len(self.shape) - 1)
+
+    def _per_channel(self, value):
+        value = np.asarray(value, dtype=np.float64)
+        if value.ndim == 1 and len(self.shape) > 1 and value.shape[0] == self.shape[0]:
+            # (N,) = 1 giá trị cho mỗi hàng
+            value = value.reshape((-1,) + (1,) * (len(self.shape) - 1))
+        return np.broadcast_to(value, self.shape).copy()
+
+    def _alpha(self, cutoff, freq):
+        # tau = 1 / (2 pi cutoff), te = 1 / freq
+        return 1.0 / (1.0 + freq / (2 * np.pi * cutoff))
+
+    def __call__(self, x, timestamp, rows=slice(None)):
+        """
+        Lọc 1 khối giá trị
+        Args:
+            x: giá trị mới, shape bằng self.shape[rows]
+            timestamp: thời điểm của giá trị (giây)
+            rows: slice các hàng được cập nhật (mặc định tất cả)
+        Returns:
+            np.array giá trị đã lọc (copy)
+        """
+        x_prev = self.x_prev[rows]
+        x = np.asarray(x, dtype=np.float64).reshape(x_prev.shape)
+        ready = self.ready[rows]
+        all_ready = ready.all()
         
-        # OneEuroFilter cho finger cursor (X, Y)
-        # min_cutoff: càng thấp càng lọc rung tốt khi đứng yên
-        # beta: càng cao càng giảm lag khi di chuyển nhanh
-        self.cursor_filter = OneEuroFilter(min_cutoff=0.5, beta=0.01)
+        # Tần số theo dt riêng của từng hàng (dt <= 0 hoặc hàng mới: freq mặc định)
+        dt = timestamp - self.last_time[rows]
+        freq = np.full(dt.shape, float(self.freq))
+        np.divide(1.0, dt, out=freq, where=(dt > 0) & ready)
+        freq = freq.reshape(self._row_shape)
         
-        # OneEuroFilter cho neck anchor (X, Y) - try-on
-        self.neck_anchor_filter = OneEuroFilter(min_cutoff=0.3, beta=0.005)
+        # Calculate derivative
+        dx = (x - x_prev) * freq
+        alpha_d = self._alpha(self.d_cutoff, freq)
+        edx = self.dx_prev[rows] + alpha_d * (dx - self.dx_prev[rows])
         
-        # OneEuroFilter cho face rotation (single value)
-        self.rotation_filter = OneEuroFilter(min_cutoff=0.4, beta=0.01)
+        # Calculate cutoff based on velocity
+        cutoff = self.min_cutoff[rows] + self.beta[rows] * np.abs(edx)
+        x_filtered = x_prev + self._alpha(cutoff, freq) * (x - x_prev)
         
-        # OneEuroFilter cho face scale (single value)
-        self.scale_filter = OneEuroFilter(min_cutoff=0.2, beta=0.005)
+        # Hàng chưa có giá trị trước: nhận nguyên giá trị, đạo hàm 0
+        if not all_ready:
+            new = (~ready).reshape(self._row_shape)
+            x_filtered = np.where(new, x, x_filtered)
+            edx = np.where(new, 0.0, edx)
         
-        self.last_time = None
+        self.x_prev[rows] = x_filtered
+        self.dx_prev[rows] = edx
+        self.last_time[rows] = timestamp
+        self.ready[rows] = True
+        return x_filtered
+
+    def reset(self, rows=slice(None)):
+        """Quên trạng thái các hàng (lần cập nhật sau nhận nguyên giá trị)"""
+        self.ready[rows] = False
+
+
+# Kênh của Normalizer trong filter bank: mỗi kênh là 1 slice hàng
+# min_cutoff: càng thấp càng lọc rung tốt khi đứng yên
+# beta: càng cao càng giảm lag khi di chuyển nhanh
+NORMALIZER_CHANNELS = {
+    'cursor': (slice(0, 2), 0.5, 0.01),     # Finger cursor (X, Y)
+    'neck': (slice(2, 4), 0.3, 0.005),      # Neck anchor (X, Y) - try-on
+    'rotation': (slice(4, 5), 0.4, 0.01),   # Face rotation
+    'scale': (slice(5, 6), 0.2, 0.005),     # Face scale
+}
+
+
+class Normalizer:
+    def __init__(self, screen_width=1920, screen_height=1080, clock=time.time, max_tracks=1):
+        """
+        Args:
+            screen_width, screen_height: kích thước màn hình (pixel)
+            clock: callable trả về giây, dùng khi không truyền timestamp (xem clock.py)
+            max_tracks: số cursor lọc riêng (1 hàng filter mỗi track tay)
+        """
+        self.clock = clock
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        
+        # 1 filter bank cho mọi kênh, mỗi kênh là 1 slice với min_cutoff / beta riêng
+        size = max(rows.stop for rows, _, _ in NORMALIZER_CHANNELS.values())
+        min_cutoff = np.zeros(size)
+        beta = np.zeros(size)
+        for rows, channel_min_cutoff, channel_beta in NORMALIZER_CHANNELS.values():
+            min_cutoff[rows] = channel_min_cutoff
+            beta[rows] = channel_beta
+        self.filters = OneEuroFilterBank((size,), min_cutoff=min_cutoff, beta=beta)
+        
+        # Cursor của nhiều tay: hàng = slot track, cùng tham số với kênh cursor
+        _, cursor_min_cutoff, cursor_beta = NORMALIZER_CHANNELS['cursor']
+        self.cursor_filters = OneEuroFilterBank(
+            (max_tracks, 2), min_cutoff=cursor_min_cutoff, beta=cursor_beta
+        )
     
     def normalize_to_pixel(self, normalized_x, normalized_y):
         """
@@ -94,77 +195,85 @@ class Normalizer:
         pixel_y = int(ny * self.screen_height)
         return pixel_x, pixel_y
     
-    def smooth_position(self, x, y):
+    def smooth(self, channel, values, timestamp=None):
+        """
+        Làm mượt 1 kênh của filter bank
+        Args:
+            channel: tên kênh trong NORMALIZER_CHANNELS
+            values: giá trị mới của kênh
+            timestamp: thời điểm capture của giá trị (None = clock())
+        Returns:
+            np.array giá trị đã lọc
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        return self.filters(values, timestamp, rows=NORMALIZER_CHANNELS[channel][0])
+    
+    def smooth_position(self, x, y, timestamp=None):
         """
         Làm mượt vị trí bằng One Euro Filter (cho finger cursor)
         Args:
             x, y: normalized coordinates
+            timestamp: thời điểm capture (None = clock())
         Returns:
             tuple: (smoothed_x, smoothed_y) normalized
         """
-        now = time.time()
-        dt = None
-        if self.last_time is not None:
-            dt = now - self.last_time
-        self.last_time = now
-
-        # Áp dụng filter cho vector (x, y)
-        smoothed = self.cursor_filter(np.array([x, y]), dt=dt)
+        smoothed = self.smooth('cursor', (x, y), timestamp)
         return float(smoothed[0]), float(smoothed[1])
     
-    def smooth_neck_anchor(self, x, y):
+    def smooth_neck_anchor(self, x, y, timestamp=None):
         """
         Làm mượt neck anchor position (cho try-on)
         Args:
             x, y: normalized coordinates
+            timestamp: thời điểm capture (None = clock())
         Returns:
             tuple: (smoothed_x, smoothed_y) normalized
         """
-        now = time.time()
-        dt = None
-        if self.last_time is not None:
-            dt = now - self.last_time
-        
-        smoothed = self.neck_anchor_filter(np.array([x, y]), dt=dt)
+        smoothed = self.smooth('neck', (x, y), timestamp)
         return float(smoothed[0]), float(smoothed[1])
     
-    def smooth_rotation(self, rotation):
+    def smooth_rotation(self, rotation, timestamp=None):
         """
         Làm mượt face rotation angle
         Args:
             rotation: float (radians)
+            timestamp: thời điểm capture (None = clock())
         Returns:
             float: smoothed rotation
         """
-        now = time.time()
-        dt = None
-        if self.last_time is not None:
-            dt = now - self.last_time
-        
-        smoothed = self.rotation_filter(np.array([rotation]), dt=dt)
-        return float(smoothed[0])
+        return float(self.smooth('rotation', rotation, timestamp)[0])
     
-    def smooth_scale(self, scale):
+    def smooth_scale(self, scale, timestamp=None):
         """
         Làm mượt face scale
         Args:
             scale: float
+            timestamp: thời điểm capture (None = clock())
         Returns:
             float: smoothed scale
         """
-        now = time.time()
-        dt = None
-        if self.last_time is not None:
-            dt = now - self.last_time
-        
-        smoothed = self.scale_filter(np.array([scale]), dt=dt)
-        return float(smoothed[0])
+        return float(self.smooth('scale', scale, timestamp)[0])
+    
+    def smooth_face(self, neck_x, neck_y, rotation, scale, timestamp=None):
+        """
+        Làm mượt neck anchor, rotation, scale trong 1 lần cập nhật
+        (3 kênh nằm liền nhau trong filter bank)
+        Returns:
+            tuple: ((neck_x, neck_y), rotation, scale) đã lọc
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        rows = slice(NORMALIZER_CHANNELS['neck'][0].start, NORMALIZER_CHANNELS['scale'][0].stop)
+        smoothed = self.filters((neck_x, neck_y, rotation, scale), timestamp, rows=rows)
+        return (float(smoothed[0]), float(smoothed[1])), float(smoothed[2]), float(smoothed[3])
     
-    def get_index_finger_position(self, hand_landmarks):
+    def get_index_finger_position(self, hand_landmarks, timestamp=None):
         """
         Lấy vị trí ngón trỏ (landmark 8) và normalize
         Args:
             hand_landmarks: np.array shape (21, 3)
+            timestamp: thời điểm capture của frame (None = clock())
         Returns:
             tuple: (normalized_x, normalized_y) hoặc None
         """
@@ -176,10 +285,29 @@ class Normalizer:
         x, y = index_tip[0], index_tip[1]
         
         # Smoothing
-        x_smooth, y_smooth = self.smooth_position(x, y)
+        x_smooth, y_smooth = self.smooth_position(x, y, timestamp)
         
         return x_smooth, y_smooth
     
+    def smooth_cursors(self, hands, slots, timestamp=None):
+        """
+        Lấy ngón trỏ (landmark 8) của nhiều tay và lọc theo slot track trong 1 lần cập nhật
+        Args:
+            hands: list np.array (21, 3)
+            slots: np.array (N,) slot track của từng tay
+            timestamp: thời điểm capture của frame (None = clock())
+        Returns:
+            np.array (N, 2) normalized đã lọc
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        tips = np.array([hand[8, :2] for hand in hands], dtype=np.float64)
+        return self.cursor_filters(tips, timestamp, rows=slots)
+    
+    def reset_cursor(self, slot):
+        """Track ở slot kết thúc / mới mở: quên trạng thái filter"""
+        self.cursor_filters.reset(rows=slot)
+    
     def set_screen_size(self, width, height):
         """Cập nhật kích thước màn hình"""
         self.screen_width = width
@@ -3,60 +3,586 @@ Perception Layer - MediaPipe detection
 Lấy landmark từ Hands, Face Mesh, Pose
 Output là tọa độ thô (x, y, z) normalized
 """
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
 import mediapipe as mp
 import numpy as np
+from landmarks import LandmarkFramePool
+
+
+# Cadence mặc định trong TRY_ON: model chạy mỗi N frame
+# Pose chỉ dùng vai (11, 12), Face Mesh chỉ dùng vài điểm -> không cần chạy mỗi frame
+DEFAULT_CADENCE = {'face_mesh': 2, 'pose': 3}
+# Tuổi tối thiểu (giây) của track ngoại suy; FPS thấp + cadence lớn thì nới theo khoảng cách 2 lần chạy
+TRACK_MAX_AGE = 0.3
+
+
+class TrackExtrapolator:
+    """
+    Ngoại suy tuyến tính một vector giá trị giữa các lần model chạy
+    Dùng 2 lần đo gần nhất và timestamp của chúng
+    """
+    def __init__(self, max_age=TRACK_MAX_AGE, angles=()):
+        """
+        Args:
+            max_age: giây, quá hạn này kể từ lần đo cuối thì coi như mất
+            angles: index các giá trị là góc (radians): delta lấy theo đường ngắn nhất
+                    qua ±pi, kết quả wrap về [-pi, pi)
+        """
+        self.max_age = max_age
+        self.angles = list(angles)
+        self.prev = None  # (timestamp, values)
+        self.last = None
+    
+    def update(self, timestamp, values):
+        """Ghi nhận lần đo mới"""
+        self.prev = self.last
+        self.last = (timestamp, np.asarray(values, dtype=np.float64))
+    
+    def reset(self):
+        self.prev = None
+        self.last = None
+    
+    def predict(self, timestamp):
+        """
+        Returns:
+            np.array giá trị ngoại suy tại timestamp hoặc None
+        """
+        if self.last is None:
+            return None
+        last_time, last_values = self.last
+        if timestamp - last_time > self.max_age:
+            return None
+        if self.prev is None:
+            return last_values
+        prev_time, prev_values = self.prev
+        dt = last_time - prev_time
+        if dt <= 0:
+            return last_values
+        delta = last_values - prev_values
+        if self.angles:
+            delta[self.angles] = (delta[self.angles] + np.pi) % (2 * np.pi) - np.pi
+        slope = delta / dt
+        predicted = last_values + slope * (timestamp - last_time)
+        if self.angles:
+            predicted[self.angles] = (predicted[self.angles] + np.pi) % (2 * np.pi) - np.pi
+        return predicted
+
+
+class InferenceInput:
+    """
+    Ảnh đầu vào cho model: resize 1 lần mỗi frame, dùng chung cho mọi model
+    Kích thước cố định khác aspect thì letterbox (giữ tỉ lệ, viền đen)
+    Map landmark normalized của ảnh inference về normalized của frame gốc
+    """
+    def __init__(self, size=None, scale=1.0):
+        """
+        Args:
+            size: (width, height) cố định của ảnh inference, None = theo frame
+            scale: hệ số nhân thêm lên kích thước (quality controller dùng)
+        """
+        self.size = tuple(size) if size else None
+        self.scale = scale
+        self._geometry_key = None
+        self._canvas = None
+        # Affine theo từng trục: frame = inference * scale_xyz + offset_xy
+        self.mapping = None
+
+    def _update_geometry(self, frame_shape):
+        key = (frame_shape, self.size, self.scale)
+        if key == self._geometry_key:
+            return
+        self._geometry_key = key
+        height, width = frame_shape[:2]
+        if self.size is None:
+            target_w = max(1, int(round(width * self.scale)))
+            target_h = max(1, int(round(height * self.scale)))
+        else:
+            target_w = max(1, int(round(self.size[0] * self.scale)))
+            target_h = max(1, int(round(self.size[1] * self.scale)))
+        
+        # Giữ aspect: fit vào target, phần dư là viền letterbox
+        ratio = min(target_w / width, target_h / height)
+        content_w = min(target_w, max(1, int(round(width * ratio))))
+        content_h = min(target_h, max(1, int(round(height * ratio))))
+        pad_x = (target_w - content_w) // 2
+        pad_y = (target_h - content_h) // 2
+        
+        self.target_size = (target_w, target_h)
+        self.content_box = (pad_x, pad_y, content_w, content_h)
+        self.identity = (target_w, target_h) == (width, height)
+        self._canvas = None
+        if (content_w, content_h) != (target_w, target_h):
+            self._canvas = np.zeros((target_h, target_w, 3), dtype=np.uint8)
+        # z của MediaPipe cùng thang với x (theo chiều rộng ảnh)
+        self.mapping = (
+            np.array([target_w / content_w, target_h / content_h, target_w / content_w]),
+            np.array([-pad_x / content_w, -pad_y / content_h, 0.0])
+        )
+
+    def prepare(self, rgb_frame):
+        """
+        Returns:
+            np.array RGB đưa vào model (chính frame gốc nếu không cần resize)
+        """
+        self._update_geometry(rgb_frame.shape)
+        if self.identity:
+            return rgb_frame
+        pad_x, pad_y, content_w, content_h = self.content_box
+        interpolation = cv2.INTER_AREA if content_w < rgb_frame.shape[1] else cv2.INTER_LINEAR
+        resized = cv2.resize(rgb_frame, (content_w, content_h), interpolation=interpolation)
+        if self._canvas is None:
+            return resized
+        # Canvas dùng lại giữa các frame, viền luôn đen
+        self._canvas[pad_y:pad_y + content_h, pad_x:pad_x + content_w] = resized
+        return self._canvas
+
+    def to_frame(self, landmarks):
+        """
+        Map landmarks (N, 2 hoặc 3) từ normalized của ảnh inference
+        về normalized của frame gốc (in-place nếu có thể)
+        """
+        if landmarks is None or self.identity:
+            return landmarks
+        scale, offset = self.mapping
+        dims = landmarks.shape[-1]
+        landmarks *= scale[:dims]
+        landmarks += offset[:dims]
+        return landmarks
+
+
+class HandRoiTracker:
+    """
+    Chạy Hands trên vùng crop quanh bbox tay của frame trước thay vì cả frame
+    Về full frame khi chưa có tay, mất tay trong crop hoặc tay chạm gần mép crop
+    Landmark luôn trả về theo normalized của ảnh đưa vào (không phải của crop)
+    """
+    def __init__(self, padding=0.6, edge_margin=0.05, min_size=0.25, max_area=0.6, step=32):
+        """
+        Args:
+            padding: lề thêm mỗi phía, tính theo cạnh dài của bbox tay
+            edge_margin: landmark cách mép crop ít hơn tỉ lệ này -> chạy lại full frame
+            min_size: cạnh crop tối thiểu, tỉ lệ theo cạnh ngắn của ảnh
+            max_area: crop lớn hơn tỉ lệ diện tích này thì chạy full frame luôn
+            step: cạnh crop làm tròn theo bội số này (pixel) để crop ít đổi kích thước
+        """
+        self.padding = padding
+        self.edge_margin = edge_margin
+        self.min_size = min_size
+        self.max_area = max_area
+        self.step = step
+        self.shape = None
+        self.box = None  # (x0, y0, x1, y1) pixel cho frame kế tiếp
+        
+        # Metrics
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.fallbacks = 0  # Crop thất bại phải chạy lại full frame
+    
+    def reset(self):
+        self.box = None
+    
+    def process(self, rgb_frame, detect_full, detect_crop):
+        """
+        Args:
+            rgb_frame: np.array RGB
+            detect_full: hàm(rgb) -> landmarks (N, 3) hoặc None, chạy trên cả ảnh
+            detect_crop: hàm(rgb) -> landmarks (N, 3) hoặc None, chạy trên crop
+        Returns:
+            np.array (N, 3) normalized theo rgb_frame hoặc None
+        """
+        height, width = rgb_frame.shape[:2]
+        if (height, width) != self.shape:
+            self.shape = (height, width)
+            self.box = None
+        
+        landmarks = None
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            local = detect_crop(np.ascontiguousarray(rgb_frame[y0:y1, x0:x1]))
+            if local is not None and not self._near_edge(local):
+                crop_w, crop_h = x1 - x0, y1 - y0
+                landmarks = local
+                landmarks[:, 0] = (local[:, 0] * crop_w + x0) / width
+                landmarks[:, 1] = (local[:, 1] * crop_h + y0) / height
+                landmarks[:, 2] *= crop_w / width
+                self.roi_frames += 1
+            else:
+                self.fallbacks += 1
+        
+        if landmarks is None:
+            landmarks = detect_full(rgb_frame)
+            self.full_frames += 1
+        
+        self.box = None if landmarks is None else self._box_around(landmarks, width, height)
+        return landmarks
+    
+    def _near_edge(self, local):
+        """True nếu tay chạm gần mép crop (có thể bị cắt)"""
+        xy = local[:, :2]
+        return bool((xy < self.edge_margin).any() or (xy > 1.0 - self.edge_margin).any())
+    
+    def _box_around(self, landmarks, width, height):
+        """Crop vuông quanh bbox tay, None nếu crop gần bằng cả ảnh"""
+        xs = landmarks[:, 0] * width
+        ys = landmarks[:, 1] * height
+        hand_size = max(xs.max() - xs.min(), ys.max() - ys.min())
+        size = max(hand_size * (1.0 + 2.0 * self.padding), self.min_size * min(width, height))
+        size = int(np.ceil(size / self.step) * self.step)
+        if size >= min(width, height) or size * size > self.max_area * width * height:
+            return None
+        
+        # Giữ crop trong ảnh bằng cách dịch, không co lại
+        center_x = (xs.max() + xs.min()) / 2
+        center_y = (ys.max() + ys.min()) / 2
+        x0 = int(min(max(center_x - size / 2, 0), width - size))
+        y0 = int(min(max(center_y - size / 2, 0), height - size))
+        return (x0, y0, x0 + size, y0 + size)
 
 
 class Perception:
-    def __init__(self):
+    def __init__(self, parallel=True, cadence=None, inference_scale=1.0,
+                 pose_complexity=1, refine_landmarks=True, inference_size=None,
+                 hand_roi=False, max_hands=1):
+        """
+        Args:
+            parallel: TRY_ON chạy Hands, Face Mesh, Pose song song,
+                      mỗi model 1 worker riêng với graph riêng
+            cadence: dict {'face_mesh': N, 'pose': M} - model chạy mỗi N frame
+                     trong TRY_ON, frame bỏ qua dùng giá trị ngoại suy
+                     (None = DEFAULT_CADENCE, {} = chạy mọi frame)
+            inference_scale: tỉ lệ resize frame trước khi đưa vào model (giữ aspect)
+            inference_size: (width, height) cố định của ảnh inference, khác aspect
+                            thì letterbox; landmark luôn được map về frame gốc
+            pose_complexity: model_complexity của Pose (0, 1, 2)
+            refine_landmarks: Face Mesh refine (mắt, môi, iris)
+            hand_roi: Hands chạy trên crop quanh tay của frame trước (HandRoiTracker)
+            max_hands: số tay tối đa mỗi frame (nhiều người trước 1 camera)
+        """
+        if hand_roi and max_hands > 1:
+            raise ValueError("hand_roi chỉ hỗ trợ max_hands=1")
+        self.max_hands = max_hands
         # MediaPipe Hands
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
+        self.hands = self._create_hands()
+        
+        # Graph riêng cho crop: tracking nội bộ của MediaPipe theo toạ độ ảnh đưa vào,
+        # dùng chung graph với full frame thì toạ độ crop và frame lẫn vào nhau
+        self.hand_roi = None
+        self.hands_roi = None
+        if hand_roi:
+            self.hand_roi = HandRoiTracker()
+            self.hands_roi = self._create_hands()
+        
+        # MediaPipe Face Mesh (cho try-on)
+        self.mp_face_mesh = mp.solutions.face_mesh
+        self.refine_landmarks = refine_landmarks
+        self.face_mesh = self._create_face_mesh()
+        
+        # MediaPipe Pose (cho anchor cổ)
+        self.mp_pose = mp.solutions.pose
+        self.pose_complexity = pose_complexity
+        self.pose = self._create_pose()
+        
+        self.inference = InferenceInput(size=inference_size, scale=inference_scale)
+        self.base_inference_scale = inference_scale  # apply_quality nhân thêm hệ số của mức
+        
+        # Buffer landmark float32 dùng lại giữa các frame, chỉ lấy index cần dùng
+        self.landmark_pool = LandmarkFramePool(max_hands=max_hands)
+        
+        # Mỗi model 1 worker cố định: graph luôn chạy trên cùng 1 thread,
+        # MediaPipe nhả GIL khi chạy graph nên 3 model chạy song song thật sự
+        self.parallel = parallel
+        self.model_workers = None
+        if parallel:
+            self.model_workers = {
+                name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'mp-{name}')
+                for name in ('hands', 'face_mesh', 'pose')
+            }
+        
+        # Cadence scheduler cho TRY_ON
+        self.cadence = dict(DEFAULT_CADENCE if cadence is None else cadence)
+        self.cadence_counters = {'face_mesh': 0, 'pose': 0}
+        self.face_track = TrackExtrapolator(angles=(0,))  # rotation, face_scale, chin_x, chin_y
+        self.neck_track = TrackExtrapolator()  # neck_x, neck_y (từ Pose)
+        self.last_timestamp = None  # Timestamp frame TRY_ON trước
+        self.frame_interval = None  # Khoảng cách frame TRY_ON (trung bình trượt, giây)
+        self.last_face_landmarks = None
+        self.model_runs = {'face_mesh': 0, 'pose': 0}  # Số lần model thực sự chạy
+        self.graph_rebuilds = 0
+    
+    def _create_hands(self):
+        return self.mp_hands.Hands(
             static_image_mode=False,
             model_complexity=0,
-            max_num_hands=1,
+            max_num_hands=self.max_hands,
             min_detection_confidence=0.6,
             min_tracking_confidence=0.6
         )
-        
-        # MediaPipe Face Mesh (cho try-on)
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
+    
+    def _create_face_mesh(self):
+        return self.mp_face_mesh.FaceMesh(
             static_image_mode=False,
             max_num_faces=1,
-            refine_landmarks=True,
+            refine_landmarks=self.refine_landmarks,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
-        
-        # MediaPipe Pose (cho anchor cổ)
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
+    
+    def _create_pose(self):
+        return self.mp_pose.Pose(
             static_image_mode=False,
-            model_complexity=1,
+            model_complexity=self.pose_complexity,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
     
-    def process_hands(self, rgb_frame):
+    def apply_quality(self, level):
+        """
+        Áp dụng mức chất lượng (xem quality.QUALITY_LEVELS)
+        Chỉ gọi giữa 2 frame, từ thread perception
+        inference_scale của mức nhân với --inference-scale, --inference-size vẫn giữ
+        Graph chỉ được tạo lại khi complexity / refine thay đổi;
+        tạo graph mới lỗi (vd. thiếu file model) thì giữ graph cũ
+        """
+        self.inference.scale = self.base_inference_scale * level['inference_scale']
+        self.cadence = dict(level['cadence'])
+        
+        if level['refine_landmarks'] != self.refine_landmarks:
+            old_refine = self.refine_landmarks
+            self.refine_landmarks = level['refine_landmarks']
+            try:
+                face_mesh = self._create_face_mesh()
+            except Exception as e:
+                print(f"Lỗi tạo lại Face Mesh, giữ cấu hình cũ: {e}")
+                self.refine_landmarks = old_refine
+            else:
+                self.face_mesh.close()
+                self.face_mesh = face_mesh
+                self.graph_rebuilds += 1
+        
+        if level['pose_complexity'] != self.pose_complexity:
+            old_complexity = self.pose_complexity
+            self.pose_complexity = level['pose_complexity']
+            try:
+                pose = self._create_pose()
+            except Exception as e:
+                print(f"Lỗi tạo lại Pose, giữ cấu hình cũ: {e}")
+                self.pose_complexity = old_complexity
+            else:
+                self.pose.close()
+                self.pose = pose
+                self.graph_rebuilds += 1
+    
+    def _timed(self, model, func, rgb_frame):
+        """Chạy model và đo latency"""
+        start = time.perf_counter()
+        result = func(rgb_frame)
+        return result, model, time.perf_counter() - start
+    
+    def process_frame(self, rgb_frame, frame_id=None, try_on=False, timestamp=None):
+        """
+        Chạy các model cần cho 1 frame, kết quả gom theo frame id
+        Ngoài TRY_ON chỉ chạy Hands (trực tiếp, không qua worker)
+        Trong TRY_ON, Face Mesh / Pose chạy theo cadence, frame bỏ qua dùng
+        anchor/rotation/scale ngoại suy
+        Args:
+            rgb_frame: np.array RGB
+            frame_id: id của frame (để ghép kết quả)
+            try_on: True nếu cần Face Mesh + Pose
+            timestamp: thời điểm capture (None = time.time())
+        Returns:
+            dict: {
+                'frame_id': int,
+                'hands': np.array (21, 3) tay đầu tiên hoặc None,
+                'multi_hands': list np.array (21, 3), mọi tay thấy được (tối đa max_hands),
+                'face': dict (xem process_face) hoặc None,
+                'shoulders': np.array (2, 3) vai 11, 12 hoặc None,
+                'timings': dict {model: giây, 'total': giây}
+            }
+        """
+        start = time.perf_counter()
+        # Resize/letterbox 1 lần, mọi model dùng chung ảnh này
+        rgb_frame = self.inference.prepare(rgb_frame)
+        landmark_frame = self.landmark_pool.acquire(frame_id, timestamp)
+        detect_hands = lambda image: self.process_hands(image, landmark_frame)
+        timings = {}
+        
+        if not try_on:
+            self._reset_face_tracks()
+            _, _, timings['hands'] = self._timed('hands', detect_hands, rgb_frame)
+            multi_hands = self._hands_to_frame(landmark_frame)
+            timings['total'] = time.perf_counter() - start
+            return {
+                'frame_id': frame_id,
+                'hands': multi_hands[0] if multi_hands else None,
+                'multi_hands': multi_hands,
+                'face': None,
+                'shoulders': None,
+                'timings': timings
+            }
+        
+        if timestamp is None:
+            timestamp = time.time()
+        self._update_track_age(timestamp)
+        jobs = [('hands', detect_hands)]
+        run_face = self._should_run('face_mesh')
+        run_pose = self._should_run('pose')
+        if run_face:
+            jobs.append(('face_mesh', self.face_mesh.process))
+        if run_pose:
+            jobs.append(('pose', self.pose.process))
+        
+        if self.parallel:
+            # Dispatch song song, latency = model chậm nhất thay vì tổng các model
+            futures = [
+                self.model_workers[model].submit(self._timed, model, func, rgb_frame)
+                for model, func in jobs
+            ]
+            outputs = [future.result() for future in futures]
+        else:
+            outputs = [self._timed(model, func, rgb_frame) for model, func in jobs]
+        
+        results = {}
+        for result, model, seconds in outputs:
+            results[model] = result
+            timings[model] = seconds
+            if model in self.model_runs:
+                self.model_runs[model] += 1
+        
+        face = self._track_face(
+            results.get('face_mesh'), results.get('pose'), run_face, run_pose, timestamp,
+            landmark_frame
+        )
+        multi_hands = self._hands_to_frame(landmark_frame)
+        timings['total'] = time.perf_counter() - start
+        return {
+            'frame_id': frame_id,
+            'hands': multi_hands[0] if multi_hands else None,
+            'multi_hands': multi_hands,
+            'face': face,
+            # Vai (11, 12) nếu Pose chạy và thấy người ở frame này (không ngoại suy)
+            'shoulders': landmark_frame.pose.points if landmark_frame.pose.present else None,
+            'timings': timings
+        }
+    
+    def _hands_to_frame(self, landmark_frame):
+        """Map mọi tay có mặt về normalized của frame gốc (in-place)"""
+        return [self.inference.to_frame(points) for points in landmark_frame.present_hands()]
+
+    def _should_run(self, model):
+        """Cadence: True nếu model đến lượt chạy ở frame này"""
+        counter = self.cadence_counters[model]
+        self.cadence_counters[model] = counter + 1
+        return counter % max(1, self.cadence.get(model, 1)) == 0
+    
+    def _reset_face_tracks(self):
+        """Ra khỏi TRY_ON: lần vào sau chạy lại mọi model ngay frame đầu"""
+        self.cadence_counters = {name: 0 for name in self.cadence_counters}
+        self.face_track.reset()
+        self.neck_track.reset()
+        self.last_face_landmarks = None
+        self.last_timestamp = None
+        self.frame_interval = None
+    
+    def _update_track_age(self, timestamp):
+        """
+        max_age của track = 1.5 x khoảng cách 2 lần model chạy (cadence x khoảng cách frame),
+        để frame bị cadence bỏ qua ở FPS thấp không làm mất track
+        """
+        if self.last_timestamp is not None and timestamp > self.last_timestamp:
+            interval = timestamp - self.last_timestamp
+            if self.frame_interval is None:
+                self.frame_interval = interval
+            else:
+                self.frame_interval += 0.2 * (interval - self.frame_interval)
+        self.last_timestamp = timestamp
+        if self.frame_interval is None:
+            return
+        for track, model in ((self.face_track, 'face_mesh'), (self.neck_track, 'pose')):
+            run_interval = max(1, self.cadence.get(model, 1)) * self.frame_interval
+            track.max_age = max(TRACK_MAX_AGE, 1.5 * run_interval)
+    
+    def _track_face(self, face_results, pose_results, run_face, run_pose, timestamp,
+                    landmark_frame):
+        """
+        Cập nhật track từ model vừa chạy, ngoại suy phần không chạy
+        landmark_frame: LandmarkFrame của frame hiện tại (buffer cho face, pose)
+        Returns:
+            dict (xem process_face) hoặc None
+        """
+        if run_face:
+            face = self._face_measurement(face_results, landmark_frame.face, self.inference)
+            if face is None:
+                # Face Mesh chạy mà không thấy mặt: mất track
+                self.face_track.reset()
+                self.last_face_landmarks = None
+                return None
+            self.face_track.update(timestamp, (
+                face['rotation'], face['face_scale'], face['chin'][0], face['chin'][1]
+            ))
+            self.last_face_landmarks = face['landmarks']
+        
+        if run_pose:
+            neck = self._neck_from_pose(pose_results, landmark_frame.pose, self.inference)
+            if neck is None:
+                self.neck_track.reset()
+            else:
+                self.neck_track.update(timestamp, neck)
+        
+        face_values = self.face_track.predict(timestamp)
+        if face_values is None:
+            return None
+        neck_values = self.neck_track.predict(timestamp)
+        face = {
+            # Landmarks của lần Face Mesh chạy gần nhất
+            'landmarks': self.last_face_landmarks,
+            'rotation': float(face_values[0]),
+            'face_scale': float(face_values[1]),
+            'chin': (float(face_values[2]), float(face_values[3]))
+        }
+        neck_anchor = None
+        if neck_values is not None:
+            neck_anchor = (float(neck_values[0]), float(neck_values[1]))
+        return self._compose_face_data(face, neck_anchor)
+    
+    def process_hands(self, rgb_frame, landmark_frame=None):
         """
         Xử lý hand detection
+        Args:
+            rgb_frame: np.array RGB
+            landmark_frame: LandmarkFrame để ghi kết quả vào hand_sets (None = lấy từ pool)
         Returns:
-            list: Danh sách landmarks [(x, y, z), ...] hoặc None
+            np.array (21, 3) float32 của tay đầu tiên - view vào buffer của pool, hoặc None
         """
-        results = self.hands.process(rgb_frame)
-        if results.multi_hand_landmarks:
-            # Lấy hand đầu tiên
-            hand = results.multi_hand_landmarks[0]
-            landmarks = np.array([[lm.x, lm.y, lm.z] for lm in hand.landmark])
-            return landmarks
-        return None
+        if landmark_frame is None:
+            landmark_frame = self.landmark_pool.acquire()
+        if self.hand_roi is not None:
+            return self.hand_roi.process(
+                rgb_frame,
+                lambda image: self._detect_hands(self.hands, image, landmark_frame),
+                lambda image: self._detect_hands(self.hands_roi, image, landmark_frame)
+            )
+        return self._detect_hands(self.hands, rgb_frame, landmark_frame)
+    
+    def _detect_hands(self, hands, rgb_frame, landmark_frame):
+        """Chạy 1 graph Hands, mỗi tay ghi vào 1 LandmarkSet của frame"""
+        results = hands.process(rgb_frame)
+        detected = results.multi_hand_landmarks or ()
+        hand_sets = landmark_frame.hand_sets
+        count = min(len(detected), len(hand_sets))
+        for hand_set, hand in zip(hand_sets, detected):
+            hand_set.fill(hand.landmark)
+        for hand_set in hand_sets[count:]:
+            hand_set.clear()
+        return hand_sets[0].points if count else None
     
     def _calculate_head_rotation(self, landmarks):
         """
         Tính rotation (yaw, pitch, roll) từ face mesh landmarks
         Args:
-            landmarks: np.array (468, 3)
+            landmarks: LandmarkSet (hoặc array) truy cập theo index Face Mesh
         Returns:
             float: rotation angle (yaw) để xoay item
         """
@@ -79,7 +605,7 @@ class Perception:
         Xử lý face detection cho try-on
         Returns:
             dict: {
-                'landmarks': np.array,  # Face mesh landmarks
+                'landmarks': np.array,  # Face mesh landmarks (chỉ FACE_INDICES)
                 'neck_anchor': tuple,   # (x, y) của cổ
                 'face_scale': float,    # Scale dựa trên kích thước mặt
                 'rotation': float       # Góc xoay (radians)
@@ -87,51 +613,101 @@ class Perception:
         """
         results = self.face_mesh.process(rgb_frame)
         pose_results = self.pose.process(rgb_frame)
+        return self._build_face_data(results, pose_results, self.landmark_pool.acquire())
+    
+    def _face_measurement(self, results, landmark_set, inference=None):
+        """
+        Đo từ Face Mesh: landmarks, rotation, scale, điểm cằm
+        Args:
+            results: output của face_mesh.process
+            landmark_set: LandmarkSet với FACE_INDICES, chỉ các điểm này được chuyển
+            inference: InferenceInput để map landmark về frame gốc (None = không map)
+        Returns:
+            dict hoặc None nếu không thấy mặt
+        """
+        if not results.multi_face_landmarks:
+            landmark_set.clear()
+            return None
         
-        if results.multi_face_landmarks:
-            face = results.multi_face_landmarks[0]
-            landmarks = np.array([[lm.x, lm.y, lm.z] for lm in face.landmark])
-            
-            # 1. Tính rotation
-            rotation = self._calculate_head_rotation(landmarks)
-            
-            # 2. Tính neck anchor
-            # Kết hợp Face Mesh và Pose để có điểm neo ổn định
-            if pose_results and pose_results.pose_landmarks:
-                pose_landmarks = pose_results.pose_landmarks.landmark
-                # Landmark 11, 12 là vai trái/phải
-                left_shoulder = pose_landmarks[11]
-                right_shoulder = pose_landmarks[12]
-                
-                # Cổ nằm ở giữa hai vai và hơi dịch lên
-                neck_x = (left_shoulder.x + right_shoulder.x) / 2
-                neck_y = (left_shoulder.y + right_shoulder.y) / 2 - 0.05
-                neck_anchor = (neck_x, neck_y)
-            else:
-                # Fallback: dùng điểm dưới cằm trong face mesh
-                chin = landmarks[152] 
-                neck_anchor = (chin[0], chin[1] + 0.05)
-            
-            # 3. Tính scale từ kích thước mặt (landmark 234 và 454)
-            left_side = landmarks[234]
-            right_side = landmarks[454]
-            face_width = np.linalg.norm(left_side[:2] - right_side[:2])
-            face_scale = face_width * 2.5  # Tăng hệ số scale để item to hơn
-            
-            return {
-                'landmarks': landmarks,
-                'neck_anchor': neck_anchor,
-                'face_scale': face_scale,
-                'rotation': rotation
-            }
+        landmark_set.fill(results.multi_face_landmarks[0].landmark)
+        if inference is not None:
+            # Map trước khi tính rotation/scale để khớp với frame gốc
+            inference.to_frame(landmark_set.points)
+        landmarks = landmark_set
+        
+        # Tính scale từ kích thước mặt (landmark 234 và 454)
+        left_side = landmarks[234]
+        right_side = landmarks[454]
+        face_width = np.linalg.norm(left_side[:2] - right_side[:2])
         
-        return None
+        return {
+            'landmarks': landmark_set.points,
+            'rotation': float(self._calculate_head_rotation(landmarks)),
+            'face_scale': float(face_width * 2.5),  # Tăng hệ số scale để item to hơn
+            'chin': (float(landmarks[152][0]), float(landmarks[152][1]))
+        }
+    
+    def _neck_from_pose(self, pose_results, landmark_set, inference=None):
+        """
+        Neck anchor từ Pose: giữa hai vai (landmark 11, 12) và hơi dịch lên
+        Args:
+            pose_results: output của pose.process
+            landmark_set: LandmarkSet với POSE_INDICES
+            inference: InferenceInput để map landmark về frame gốc (None = không map)
+        Returns:
+            tuple (x, y) hoặc None
+        """
+        if not (pose_results and pose_results.pose_landmarks):
+            landmark_set.clear()
+            return None
+        
+        landmark_set.fill(pose_results.pose_landmarks.landmark)
+        if inference is not None:
+            inference.to_frame(landmark_set.points)
+        left_shoulder = landmark_set[11]
+        right_shoulder = landmark_set[12]
+        neck_x = float(left_shoulder[0] + right_shoulder[0]) / 2
+        neck_y = float(left_shoulder[1] + right_shoulder[1]) / 2 - 0.05
+        return (neck_x, neck_y)
+    
+    def _compose_face_data(self, face, neck_anchor):
+        """
+        Ghép đo đạc mặt + neck anchor thành dữ liệu try-on
+        Fallback neck anchor: điểm dưới cằm trong face mesh
+        """
+        if face is None:
+            return None
+        if neck_anchor is None:
+            neck_anchor = (face['chin'][0], face['chin'][1] + 0.05)
+        return {
+            'landmarks': face['landmarks'],
+            'neck_anchor': neck_anchor,
+            'face_scale': face['face_scale'],
+            'rotation': face['rotation']
+        }
+    
+    def _build_face_data(self, results, pose_results, landmark_frame):
+        """
+        Ghép kết quả Face Mesh + Pose thành dữ liệu try-on
+        Returns:
+            dict (xem process_face) hoặc None
+        """
+        return self._compose_face_data(
+            self._face_measurement(results, landmark_frame.face),
+            self._neck_from_pose(pose_results, landmark_frame.pose)
+        )
     
     def release(self):
         """Giải phóng resources"""
+        if self.model_workers:
+            for worker in self.model_workers.values():
+                worker.shutdown(wait=True)
+        
         try:
             if self.hands:
                 self.hands.close()
+            if self.hands_roi:
+                self.hands_roi.close()
         except Exception as e:
             print(f"Lỗi khi giải phóng Hands: {e}")
         
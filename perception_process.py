@@ -0,0 +1,313 @@
+"""
+Perception Layer - Backend chạy MediaPipe trong process riêng
+Frame đi qua ring shared memory, kết quả trả về qua pipe dạng bytes gọn
+Tránh tranh GIL với capture, JSON encode, WebSocket fan-out, JPEG encode
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+import struct
+import numpy as np
+from landmarks import HAND_INDICES
+
+
+# Tag 1 byte ở đầu mỗi message trả về
+_TAG_NONE = b'N'
+_TAG_HANDS = b'H'
+_TAG_FACE = b'F'
+_TAG_FRAME = b'R'
+_TAG_OK = b'K'
+_TAG_ERROR = b'E'
+
+# Header kết quả face: neck_x, neck_y, rotation, face_scale, số landmark
+_FACE_HEADER = struct.Struct('<4fI')
+# Header kết quả 1 frame: frame_id (-1 = None), latency từng stage (-1 = không chạy),
+# số byte phần hands, số byte phần face (phần còn lại là shoulders)
+_TIMING_STAGES = ('hands', 'face_mesh', 'pose', 'total')
+_FRAME_HEADER = struct.Struct('<q4fII')
+
+
+class SharedFrameRing:
+    """
+    Ring N slot trong shared memory, mỗi slot chứa 1 frame RGB uint8
+    Process cha ghi, process perception đọc trực tiếp (không pickle frame)
+    """
+    def __init__(self, shape, slots=2, name=None):
+        """
+        Args:
+            shape: (H, W, 3) của frame
+            slots: số slot trong ring
+            name: tên shared memory có sẵn (None = tạo mới)
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        slot_size = int(np.prod(self.shape))
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slot_size * slots)
+        else:
+            # Process con dùng chung resource tracker với process cha (spawn),
+            # chỉ process tạo ring mới unlink
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.buffer = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.next_slot = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame_rgb):
+        """
+        Copy frame vào slot kế tiếp
+        Returns:
+            int: chỉ số slot
+        """
+        slot = self.next_slot
+        np.copyto(self.buffer[slot], frame_rgb)
+        self.next_slot = (slot + 1) % self.slots
+        return slot
+
+    def view(self, slot):
+        """View (không copy) của slot"""
+        return self.buffer[slot]
+
+    def close(self):
+        """Đóng mapping, process tạo ring thì unlink luôn"""
+        self.buffer = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _encode_hands(landmarks):
+    if landmarks is None:
+        return _TAG_NONE
+    return _TAG_HANDS + np.ascontiguousarray(landmarks, dtype=np.float32).tobytes()
+
+
+def _decode_hands(payload):
+    return np.frombuffer(payload, dtype=np.float32).reshape(-1, 3).astype(np.float64)
+
+
+def _encode_face(face_data):
+    if face_data is None:
+        return _TAG_NONE
+    landmarks = np.ascontiguousarray(face_data['landmarks'], dtype=np.float32)
+    header = _FACE_HEADER.pack(
+        face_data['neck_anchor'][0], face_data['neck_anchor'][1],
+        face_data['rotation'], face_data['face_scale'], len(landmarks)
+    )
+    return _TAG_FACE + header + landmarks.tobytes()
+
+
+def _decode_face(payload):
+    neck_x, neck_y, rotation, face_scale, count = _FACE_HEADER.unpack_from(payload)
+    landmarks = np.frombuffer(payload, dtype=np.float32, offset=_FACE_HEADER.size)
+    return {
+        'landmarks': landmarks.reshape(count, 3).astype(np.float64),
+        'neck_anchor': (float(neck_x), float(neck_y)),
+        'face_scale': float(face_scale),
+        'rotation': float(rotation)
+    }
+
+
+def _encode_frame(result):
+    # Mọi tay xếp liền (N * 21, 3); tay đầu tiên là 'hands'
+    multi_hands = result.get('multi_hands')
+    if multi_hands is None:
+        multi_hands = [] if result['hands'] is None else [result['hands']]
+    hands = _encode_hands(np.concatenate(multi_hands) if multi_hands else None)
+    face = _encode_face(result['face'])
+    # Shoulders cùng layout với hands (N, 3) float32
+    shoulders = _encode_hands(result.get('shoulders'))
+    frame_id = -1 if result['frame_id'] is None else result['frame_id']
+    timings = result.get('timings', {})
+    header = _FRAME_HEADER.pack(
+        frame_id, *(timings.get(stage, -1.0) for stage in _TIMING_STAGES), len(hands), len(face)
+    )
+    return _TAG_FRAME + header + hands + face + shoulders
+
+
+def _decode_frame(payload):
+    frame_id, *timing_values, hands_size, face_size = _FRAME_HEADER.unpack_from(payload)
+    hands_end = _FRAME_HEADER.size + hands_size
+    hands = payload[_FRAME_HEADER.size:hands_end]
+    face = payload[hands_end:hands_end + face_size]
+    shoulders = payload[hands_end + face_size:]
+    multi_hands = []
+    if hands[:1] != _TAG_NONE:
+        multi_hands = list(_decode_hands(hands[1:]).reshape(-1, len(HAND_INDICES), 3))
+    return {
+        'frame_id': None if frame_id < 0 else frame_id,
+        'hands': multi_hands[0] if multi_hands else None,
+        'multi_hands': multi_hands,
+        'face': None if face[:1] == _TAG_NONE else _decode_face(face[1:]),
+        'shoulders': None if shoulders[:1] == _TAG_NONE else _decode_hands(shoulders[1:]),
+        'timings': {
+            stage: value for stage, value in zip(_TIMING_STAGES, timing_values) if value >= 0
+        }
+    }
+
+
+def _worker_main(conn, perception_kwargs):
+    """Vòng lặp của process perception: nhận lệnh, chạy MediaPipe, trả bytes"""
+    from perception import Perception
+
+    perception = Perception(**perception_kwargs)
+    ring = None
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            op = message[0]
+            if op == 'stop':
+                break
+            try:
+                if op == 'attach':
+                    _, name, shape, slots = message
+                    if ring is not None:
+                        ring.close()
+                    ring = SharedFrameRing(shape, slots, name=name)
+                    conn.send_bytes(_TAG_OK)
+                elif op == 'hands':
+                    conn.send_bytes(_encode_hands(perception.process_hands(ring.view(message[1]))))
+                elif op == 'face':
+                    conn.send_bytes(_encode_face(perception.process_face(ring.view(message[1]))))
+                elif op == 'quality':
+                    perception.apply_quality(message[1])
+                    conn.send_bytes(_TAG_OK)
+                elif op == 'frame':
+                    _, slot, frame_id, try_on, timestamp = message
+                    result = perception.process_frame(
+                        ring.view(slot), frame_id, try_on=try_on, timestamp=timestamp
+                    )
+                    conn.send_bytes(_encode_frame(result))
+                else:
+                    raise ValueError(f"Lệnh không hợp lệ: {op}")
+            except Exception as e:
+                conn.send_bytes(_TAG_ERROR + str(e).encode('utf-8'))
+    finally:
+        if ring is not None:
+            ring.close()
+        perception.release()
+        conn.close()
+
+
+class ProcessPerception:
+    """
+    Cùng interface với Perception (process_frame, process_hands, process_face, release)
+    nhưng MediaPipe chạy trong process riêng
+    Mỗi frame chỉ được copy vào ring 1 lần dù gọi cả hands và face
+    """
+    def __init__(self, slots=2, start_timeout=60.0, **perception_kwargs):
+        """
+        Args:
+            slots: số slot của ring shared memory
+            start_timeout: giây chờ process con khởi tạo MediaPipe
+            perception_kwargs: tham số truyền cho Perception trong process con
+        """
+        ctx = multiprocessing.get_context('spawn')
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, perception_kwargs),
+            name='perception', daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.slots = slots
+        self.start_timeout = start_timeout
+        self.ring = None
+        self._last_frame = None  # Frame đã nằm trong ring
+        self._last_slot = None
+
+    def _slot_for(self, rgb_frame):
+        """Ghi frame vào ring nếu chưa có, trả về slot"""
+        if rgb_frame is self._last_frame:
+            return self._last_slot
+
+        if self.ring is None or self.ring.shape != rgb_frame.shape:
+            # Lần đầu hoặc đổi độ phân giải: tạo ring mới và báo process con
+            if self.ring is not None:
+                self.ring.close()
+            self.ring = SharedFrameRing(rgb_frame.shape, self.slots)
+            self.conn.send(('attach', self.ring.name, self.ring.shape, self.slots))
+            self._receive(timeout=self.start_timeout)
+
+        self._last_slot = self.ring.write(rgb_frame)
+        self._last_frame = rgb_frame
+        return self._last_slot
+
+    def _receive(self, timeout=None):
+        if timeout is not None and not self.conn.poll(timeout):
+            raise RuntimeError("Perception process không phản hồi")
+        try:
+            payload = self.conn.recv_bytes()
+        except EOFError:
+            raise RuntimeError("Perception process đã dừng")
+        tag, body = payload[:1], payload[1:]
+        if tag == _TAG_ERROR:
+            raise RuntimeError(f"Lỗi trong perception process: {body.decode('utf-8')}")
+        return tag, body
+
+    def process_frame(self, rgb_frame, frame_id=None, try_on=False, timestamp=None):
+        """
+        Chạy mọi model cần cho 1 frame (trong process perception)
+        Returns:
+            dict giống Perception.process_frame
+        """
+        slot = self._slot_for(rgb_frame)
+        self.conn.send(('frame', slot, frame_id, try_on, timestamp))
+        _, body = self._receive()
+        return _decode_frame(body)
+
+    def apply_quality(self, level):
+        """Áp dụng mức chất lượng trong process perception (xem Perception.apply_quality)"""
+        self.conn.send(('quality', level))
+        self._receive()
+
+    def process_hands(self, rgb_frame):
+        """
+        Xử lý hand detection (trong process perception)
+        Returns:
+            np.array (21, 3) hoặc None
+        """
+        slot = self._slot_for(rgb_frame)
+        self.conn.send(('hands', slot))
+        tag, body = self._receive()
+        if tag == _TAG_NONE:
+            return None
+        return _decode_hands(body)
+
+    def process_face(self, rgb_frame):
+        """
+        Xử lý face detection cho try-on (trong process perception)
+        Returns:
+            dict giống Perception.process_face hoặc None
+        """
+        slot = self._slot_for(rgb_frame)
+        self.conn.send(('face', slot))
+        tag, body = self._receive()
+        if tag == _TAG_NONE:
+            return None
+        return _decode_face(body)
+
+    def release(self):
+        """Dừng process perception và giải phóng shared memory"""
+        try:
+            if self.process.is_alive():
+                self.conn.send(('stop',))
+                self.process.join(timeout=5.0)
+            if self.process.is_alive():
+                self.process.terminate()
+        except Exception as e:
+            print(f"Lỗi khi dừng perception process: {e}")
+        finally:
+            self.conn.close()
+            if self.ring is not None:
+                self.ring.close()
+                self.ring = None
+            self._last_frame = None
@@ -0,0 +1,149 @@
+"""
+Interaction Pipeline - phần sau perception
+Track → Normalize → Motion → Gesture (+ trajectory) → State → transform try-on cho 1 frame
+Không có MediaPipe, không có camera: dùng chung cho System và replay
+Nhiều tay (nhiều người trước 1 camera): mỗi track 1 slot với filter, motion, gesture riêng;
+state machine (UI) dùng chung
+"""
+from clock import SystemClock
+from normalize import Normalizer
+from motion import MotionFeatureExtractor
+from gesture import GestureDetector
+from trajectory import TrajectoryRecognizer, default_templates
+from state import StateMachine, SystemState
+from tracking import HandTracker, palm_centers
+
+
+def _no_lap(stage):
+    pass
+
+
+class InteractionPipeline:
+    def __init__(self, screen_width=1920, screen_height=1080, idle_timeout=8.0, clock=None,
+                 max_tracks=1, templates=None):
+        """
+        Args:
+            screen_width, screen_height: kích thước màn hình (pixel)
+            idle_timeout: giây không hoạt động trước khi về IDLE
+            clock: SystemClock / SimulatedClock dùng chung cho mọi tầng (None = SystemClock)
+            max_tracks: số tay theo dõi cùng lúc
+            templates: TemplateLibrary cho trajectory gesture (None = default_templates())
+        """
+        self.clock = SystemClock() if clock is None else clock
+        self.normalizer = Normalizer(screen_width=screen_width, screen_height=screen_height,
+                                     clock=self.clock, max_tracks=max_tracks)
+        self.tracker = HandTracker(max_tracks=max_tracks)
+        # Trạng thái theo slot track, cấp phát 1 lần
+        self.motion_extractors = [MotionFeatureExtractor() for _ in range(max_tracks)]
+        self.gesture_detectors = [GestureDetector(motion) for motion in self.motion_extractors]
+        self.templates = default_templates() if templates is None else templates
+        self.trajectory_recognizers = [TrajectoryRecognizer(self.templates)
+                                       for _ in range(max_tracks)]
+        self.state_machine = StateMachine(idle_timeout=idle_timeout, clock=self.clock)
+
+    def is_try_on(self):
+        """True nếu frame kế tiếp cần Face Mesh + Pose"""
+        return self.state_machine.get_state() == SystemState.TRY_ON
+
+    def _reset_slot(self, slot):
+        self.normalizer.reset_cursor(slot)
+        self.motion_extractors[slot].reset()
+        self.gesture_detectors[slot].reset()
+        self.trajectory_recognizers[slot].reset()
+
+    def step(self, hands, face_data, timestamp=None, lap=_no_lap):
+        """
+        Xử lý kết quả perception của 1 frame
+        Args:
+            hands: list np.array (21, 3) - mọi tay thấy ở frame (xem 'multi_hands')
+            face_data: dict (xem Perception.process_face) hoặc None
+            timestamp: timestamp capture của frame, mọi tầng dùng chung
+                (clock được đẩy tới timestamp này; None = đọc từ clock)
+            lap: hàm lap(stage) ghi latency từng stage (xem metrics.Lap)
+        Returns:
+            dict: {
+                'gestures': list (track_id, gesture),
+                'cursors': list (track_id, pixel_x, pixel_y),
+                'transform': dict hoặc None,
+                'capture_ts': float
+            } (+ 'new_state' nếu có gesture hợp lệ)
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        else:
+            self.clock.advance_to(timestamp)
+        current_time = timestamp
+        results = {
+            'gestures': [], 'cursors': [], 'transform': None,
+            'capture_ts': timestamp
+        }
+
+        # Ghép tay với track (id ổn định qua các frame)
+        tracker = self.tracker
+        slots, started, ended = tracker.update(palm_centers(hands))
+        for slot in started + ended:
+            self._reset_slot(slot)
+        tracked = [(int(slot), hand) for slot, hand in zip(slots, hands) if slot >= 0]
+        lap('track')
+
+        hand_by_slot = {}
+        if tracked:
+            # Normalize & Smooth: cursor mọi track trong 1 lần cập nhật filter bank
+            track_slots = [slot for slot, _ in tracked]
+            cursors = self.normalizer.smooth_cursors(
+                [hand for _, hand in tracked], track_slots, current_time
+            ).tolist()
+            for (slot, hand), (x, y) in zip(tracked, cursors):
+                hand_by_slot[slot] = hand
+                pixel_x, pixel_y = self.normalizer.normalize_to_pixel(x, y)
+                results['cursors'].append((int(tracker.track_ids[slot]), pixel_x, pixel_y))
+            lap('normalize')
+            for slot, (x, y) in zip(track_slots, cursors):
+                self.motion_extractors[slot].update(x, y, current_time)
+                self.trajectory_recognizers[slot].update(x, y, current_time)
+            lap('motion')
+
+        # Gesture Detection: mỗi track đang mở (track tạm mất tay: reset hysteresis)
+        # Trajectory gesture chỉ thử khi frame không có gesture tức thời
+        for slot in tracker.active_slots():
+            hand = hand_by_slot.get(slot)
+            gesture = self.gesture_detectors[slot].process(hand, current_time)
+            if not gesture and hand is not None:
+                gesture = self.trajectory_recognizers[slot].process(current_time)
+            if gesture:
+                is_valid, should_emit = self.state_machine.handle_gesture(gesture, current_time)
+                if is_valid and should_emit:
+                    results['gestures'].append((int(tracker.track_ids[slot]), gesture))
+                    results['new_state'] = self.state_machine.get_state().value
+        lap('gesture')
+
+        # Try-on logic (nếu đang trong state TRY_ON)
+        if self.is_try_on() and face_data:
+            # Smooth neck anchor, rotation và scale (1 lần cập nhật filter bank)
+            smooth_anchor, smooth_rotation, smooth_scale = self.normalizer.smooth_face(
+                face_data['neck_anchor'][0],
+                face_data['neck_anchor'][1],
+                face_data['rotation'],
+                face_data['face_scale'],
+                current_time
+            )
+            anchor_x, anchor_y = self.normalizer.normalize_to_pixel(
+                smooth_anchor[0], smooth_anchor[1]
+            )
+
+            results['transform'] = {
+                'anchor': (anchor_x, anchor_y),
+                'rotation': smooth_rotation,
+                'scale': smooth_scale
+            }
+            lap('normalize_face')
+
+        return results
+
+    def check_timeout(self, timestamp=None):
+        """Idle timeout theo timestamp capture hoặc clock (True nếu vừa về IDLE)"""
+        if timestamp is None:
+            timestamp = self.clock()
+        else:
+            self.clock.advance_to(timestamp)
+        return self.state_machine.check_timeout(timestamp)
@@ -0,0 +1,79 @@
+"""
+Sampling profiler cho process đang chạy
+Lấy mẫu stack mọi thread (event loop, capture, perception executor, MediaPipe workers)
+trong N giây, trả về dạng collapsed stack (flamegraph.pl, speedscope, inferno)
+Không có thread hay hook nào chạy khi không lấy mẫu
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class ProfilerBusy(RuntimeError):
+    """Đã có 1 lần lấy mẫu đang chạy"""
+
+
+class SamplingProfiler:
+    def __init__(self, max_seconds=60.0, max_hz=1000.0):
+        """
+        Args:
+            max_seconds: giới hạn thời lượng 1 lần lấy mẫu
+            max_hz: giới hạn tần số lấy mẫu
+        """
+        self.max_seconds = max_seconds
+        self.max_hz = max_hz
+        self._lock = threading.Lock()
+        self.captures = 0
+
+    def sample(self, seconds=5.0, hz=100.0):
+        """
+        Lấy mẫu stack mọi thread (blocking, gọi từ thread riêng)
+        Args:
+            seconds: thời lượng lấy mẫu
+            hz: số mẫu mỗi giây
+        Returns:
+            (Counter {collapsed_stack: số mẫu}, số lần lấy mẫu)
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("Đang có phiên profile khác")
+        try:
+            seconds = min(max(seconds, 0.0), self.max_seconds)
+            interval = 1.0 / min(max(hz, 1.0), self.max_hz)
+            own_ident = threading.get_ident()
+            stacks = Counter()
+            samples = 0
+            deadline = time.perf_counter() + seconds
+            next_sample = time.perf_counter()
+            while next_sample < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_ident:
+                        continue
+                    stacks[self._collapse(names.get(ident, f'thread-{ident}'), frame)] += 1
+                samples += 1
+                next_sample += interval
+                delay = next_sample - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self.captures += 1
+            return stacks, samples
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _collapse(thread_name, frame):
+        """thread;root_func (file);...;leaf_func (file)"""
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f'{code.co_name} ({os.path.basename(code.co_filename)})')
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ';'.join(reversed(parts))
+
+    @staticmethod
+    def render(stacks):
+        """Collapsed stack text: mỗi dòng 'frame;frame;... count'"""
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
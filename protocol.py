@@ -0,0 +1,212 @@
+"""
+Wire protocol cho bridge WebSocket
+Client chọn qua subprotocol khi kết nối:
+- 'touchless.bin.v1': message tần suất cao (FRAME_UPDATE, CURSOR_MOVE, ITEM_TRANSFORM,
+  GESTURE, STATE_CHANGE) là binary frame layout cố định; message khác vẫn là JSON text frame
+- 'touchless.json.v1' hoặc không chọn subprotocol: mọi message là JSON (fallback)
+
+Binary frame (little-endian), header 13 byte chung:
+    u8 type | u32 seq | f64 capture_ts (giây epoch, NaN = không có)
+Body theo type:
+    CURSOR_MOVE     u16 track_id (0xFFFF = không gắn id) | i16 x | i16 y (pixel)
+    ITEM_TRANSFORM  i16 anchor_x | i16 anchor_y (pixel) | i16 rotation (x 1e4 rad) | u16 scale (x 1e4)
+    GESTURE         u16 track_id | u8 len | tên gesture UTF-8
+    STATE_CHANGE    u8 len | tên state UTF-8
+    FRAME_UPDATE    u8 n | n x (u16 track_id | i16 x | i16 y) |
+                    u8 m | m x (u16 track_id | u8 len | tên gesture) |
+                    u8 flags (1 = có state, 2 = có transform) |
+                    [u8 len | tên state] | [i16 anchor_x | i16 anchor_y | i16 rotation | u16 scale]
+Decoder tương ứng: WebSocketClient.decodeBinary trong frontend/index.html
+"""
+import json
+import math
+import struct
+
+SUBPROTOCOL_BINARY = 'touchless.bin.v1'
+SUBPROTOCOL_JSON = 'touchless.json.v1'
+# Thứ tự ưu tiên của server khi client hỗ trợ cả hai
+SUBPROTOCOLS = (SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON)
+
+TYPE_CODES = {'CURSOR_MOVE': 1, 'ITEM_TRANSFORM': 2, 'GESTURE': 3, 'STATE_CHANGE': 4,
+              'FRAME_UPDATE': 5}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+NO_TRACK = 0xFFFF
+ROTATION_SCALE = 1e4  # Bước 0.0001 rad, đủ ±pi trong i16
+SCALE_SCALE = 1e4     # face_scale 0 .. 6.5535
+
+HEADER = struct.Struct('<BId')
+CURSOR = struct.Struct('<BIdHhh')
+GESTURE = struct.Struct('<BIdHB')
+STATE = struct.Struct('<BIdB')
+# Phần sau header
+POINT = struct.Struct('<Hhh')            # track_id, x, y
+NAMED = struct.Struct('<HB')             # track_id, độ dài tên
+QUANTIZED_TRANSFORM = struct.Struct('<hhhH')
+
+FLAG_STATE = 1
+FLAG_TRANSFORM = 2
+
+
+def _clip(value, lo, hi):
+    return lo if value < lo else hi if value > hi else value
+
+
+def _track(track_id):
+    return NO_TRACK if track_id is None else _clip(int(track_id), 0, NO_TRACK - 1)
+
+
+def _pixel(value):
+    return _clip(int(value), -32768, 32767)
+
+
+def _name(text):
+    return text.encode('utf-8')[:255]
+
+
+def _transform(transform):
+    anchor = transform['anchor']
+    return QUANTIZED_TRANSFORM.pack(
+        _pixel(anchor['x']), _pixel(anchor['y']),
+        _clip(round(transform['rotation'] * ROTATION_SCALE), -32768, 32767),
+        _clip(round(transform['scale'] * SCALE_SCALE), 0, 65535)
+    )
+
+
+def _with_track(entry, track_id):
+    if track_id != NO_TRACK:
+        entry['track_id'] = track_id
+    return entry
+
+
+class _Reader:
+    """Đọc tuần tự 1 binary frame"""
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    def unpack(self, layout):
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def byte(self):
+        value = self.data[self.offset]
+        self.offset += 1
+        return value
+
+    def text(self, length=None):
+        if length is None:
+            length = self.byte()
+        start = self.offset
+        self.offset += length
+        return bytes(self.data[start:self.offset]).decode('utf-8')
+
+    def transform(self):
+        x, y, rotation, scale = self.unpack(QUANTIZED_TRANSFORM)
+        return {'anchor': {'x': x, 'y': y}, 'rotation': rotation / ROTATION_SCALE,
+                'scale': scale / SCALE_SCALE}
+
+
+def encode_json(payload, seq=None):
+    """Message JSON (text frame); seq gắn vào payload nếu có"""
+    if seq is not None:
+        payload['seq'] = seq
+    return json.dumps(payload)
+
+
+def _encode_frame_update(payload, header):
+    cursors = payload['cursors'][:255]
+    gestures = payload['gestures'][:255]
+    parts = [header, bytes((len(cursors),))]
+    for cursor in cursors:
+        parts.append(POINT.pack(_track(cursor.get('track_id')), _pixel(cursor['x']),
+                                _pixel(cursor['y'])))
+    parts.append(bytes((len(gestures),)))
+    for gesture in gestures:
+        name = _name(gesture['gesture'])
+        parts.append(NAMED.pack(_track(gesture.get('track_id')), len(name)))
+        parts.append(name)
+
+    state = payload.get('state')
+    transform = payload.get('transform')
+    flags = (FLAG_STATE if state is not None else 0) | (FLAG_TRANSFORM if transform is not None else 0)
+    parts.append(bytes((flags,)))
+    if state is not None:
+        name = _name(state)
+        parts.append(bytes((len(name),)))
+        parts.append(name)
+    if transform is not None:
+        parts.append(_transform(transform))
+    return b''.join(parts)
+
+
+def encode_binary(payload, seq):
+    """
+    Args:
+        payload: dict như WebSocketBridge.emit_* tạo (có thể có 'capture_ts')
+        seq: số thứ tự message (quấn vòng 2^32)
+    Returns:
+        bytes, hoặc None nếu type không có layout binary (gửi JSON)
+    """
+    code = TYPE_CODES.get(payload['type'])
+    if code is None:
+        return None
+    seq &= 0xFFFFFFFF
+    capture_ts = payload.get('capture_ts')
+    capture_ts = math.nan if capture_ts is None else capture_ts
+
+    if code == 1:
+        return CURSOR.pack(code, seq, capture_ts, _track(payload.get('track_id')),
+                           _pixel(payload['x']), _pixel(payload['y']))
+    if code == 2:
+        return HEADER.pack(code, seq, capture_ts) + _transform(payload)
+    if code == 3:
+        name = _name(payload['gesture'])
+        return GESTURE.pack(code, seq, capture_ts, _track(payload.get('track_id')),
+                            len(name)) + name
+    if code == 4:
+        name = _name(payload['state'])
+        return STATE.pack(code, seq, capture_ts, len(name)) + name
+    return _encode_frame_update(payload, HEADER.pack(code, seq, capture_ts))
+
+
+def decode_binary(data):
+    """
+    Giải mã 1 binary frame về dict cùng dạng JSON (dùng cho test / benchmark;
+    frontend có bản JavaScript tương ứng)
+    """
+    reader = _Reader(data)
+    code, seq, capture_ts = reader.unpack(HEADER)
+    payload = {'type': TYPE_NAMES[code], 'seq': seq}
+    if not math.isnan(capture_ts):
+        payload['capture_ts'] = capture_ts
+
+    if code == 1:
+        track_id, x, y = reader.unpack(POINT)
+        payload.update(x=x, y=y)
+        _with_track(payload, track_id)
+    elif code == 2:
+        payload.update(reader.transform())
+    elif code == 3:
+        track_id, length = reader.unpack(NAMED)
+        payload['gesture'] = reader.text(length)
+        _with_track(payload, track_id)
+    elif code == 4:
+        payload['state'] = reader.text()
+    else:
+        cursors = []
+        for _ in range(reader.byte()):
+            track_id, x, y = reader.unpack(POINT)
+            cursors.append(_with_track({'x': x, 'y': y}, track_id))
+        gestures = []
+        for _ in range(reader.byte()):
+            track_id, length = reader.unpack(NAMED)
+            gestures.append(_with_track({'gesture': reader.text(length)}, track_id))
+        payload.update(cursors=cursors, gestures=gestures)
+        flags = reader.byte()
+        if flags & FLAG_STATE:
+            payload['state'] = reader.text()
+        if flags & FLAG_TRANSFORM:
+            payload['transform'] = reader.transform()
+    return payload
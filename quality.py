@@ -0,0 +1,171 @@
+"""
+Quality Controller
+Giữ FPS mục tiêu bằng cách đổi chất lượng perception theo latency đo được
+Nút điều chỉnh: độ phân giải inference, model complexity, cadence từng model
+Không biết camera, không biết UI
+"""
+import time
+
+
+# Các mức chất lượng, từ cao xuống thấp
+# 'medium' trùng với cấu hình mặc định của Perception
+QUALITY_LEVELS = [
+    {
+        'name': 'high',
+        'inference_scale': 1.0,
+        'pose_complexity': 1,
+        'refine_landmarks': True,
+        'cadence': {'face_mesh': 1, 'pose': 2}
+    },
+    {
+        'name': 'medium',
+        'inference_scale': 1.0,
+        'pose_complexity': 1,
+        'refine_landmarks': True,
+        'cadence': {'face_mesh': 2, 'pose': 3}
+    },
+    {
+        'name': 'low',
+        'inference_scale': 0.75,
+        'pose_complexity': 0,
+        'refine_landmarks': False,
+        'cadence': {'face_mesh': 2, 'pose': 4}
+    },
+    {
+        'name': 'lowest',
+        'inference_scale': 0.5,
+        'pose_complexity': 0,
+        'refine_landmarks': False,
+        'cadence': {'face_mesh': 3, 'pose': 6}
+    },
+]
+
+DEFAULT_LEVEL = 'medium'
+
+
+def level_for_cadence(cadence, levels=None):
+    """
+    Tên mức có đúng cadence này (chọn mức khởi đầu theo --face-cadence / --pose-cadence)
+    Returns:
+        str hoặc None nếu không mức nào khớp
+    """
+    for level in levels or QUALITY_LEVELS:
+        if level['cadence'] == cadence:
+            return level['name']
+    return None
+
+
+def needs_rebuild(old_level, new_level):
+    """True nếu đổi mức cần tạo lại MediaPipe graph"""
+    return (old_level['pose_complexity'] != new_level['pose_complexity']
+            or old_level['refine_landmarks'] != new_level['refine_landmarks'])
+
+
+class QualityController:
+    def __init__(self, target_fps=30.0, levels=None, start_level=DEFAULT_LEVEL,
+                 ewma_alpha=0.1, down_ratio=1.0, up_ratio=0.6, hold_frames=30,
+                 min_rebuild_interval=5.0, clock=time.monotonic):
+        """
+        Args:
+            target_fps: FPS perception mục tiêu, budget = 1 / target_fps
+            levels: danh sách mức chất lượng (mặc định QUALITY_LEVELS)
+            start_level: tên mức khởi đầu
+            ewma_alpha: hệ số làm mượt latency
+            down_ratio: latency > budget * down_ratio liên tục -> giảm chất lượng
+            up_ratio: latency < budget * up_ratio liên tục -> tăng chất lượng
+            hold_frames: số frame liên tiếp trước khi đổi mức (tăng mức cần gấp đôi)
+            min_rebuild_interval: giây tối thiểu giữa 2 lần rebuild graph
+            clock: hàm trả về thời gian (giây)
+        """
+        self.levels = list(levels or QUALITY_LEVELS)
+        self.level_index = [level['name'] for level in self.levels].index(start_level)
+        self.budget = 1.0 / target_fps
+        self.ewma_alpha = ewma_alpha
+        self.down_ratio = down_ratio
+        self.up_ratio = up_ratio
+        self.hold_frames = hold_frames
+        self.min_rebuild_interval = min_rebuild_interval
+        self.clock = clock
+
+        # Latency EWMA theo từng stage (giây)
+        self.stage_latency = {}
+        self.over_budget_frames = 0
+        self.under_budget_frames = 0
+        self.last_rebuild_time = None
+        self.deferred_index = None  # Mức đang bị hoãn (đếm deferred 1 lần mỗi lần đổi mức)
+
+        # Metrics
+        self.changes = 0
+        self.rebuilds = 0
+        self.deferred = 0  # Lần đổi mức bị hoãn do giới hạn tần suất rebuild
+
+    @property
+    def level(self):
+        """Mức chất lượng hiện tại (dict)"""
+        return self.levels[self.level_index]
+
+    def observe(self, timings):
+        """
+        Ghi nhận latency 1 frame
+        Args:
+            timings: dict {stage: giây}, phải có 'total' (thời gian perception cả frame)
+        Returns:
+            dict: mức chất lượng mới nếu vừa đổi, None nếu giữ nguyên
+        """
+        for stage, seconds in timings.items():
+            previous = self.stage_latency.get(stage)
+            if previous is None:
+                self.stage_latency[stage] = seconds
+            else:
+                self.stage_latency[stage] = previous + self.ewma_alpha * (seconds - previous)
+
+        latency = self.stage_latency['total']
+        if latency > self.budget * self.down_ratio:
+            self.over_budget_frames += 1
+            self.under_budget_frames = 0
+        elif latency < self.budget * self.up_ratio:
+            self.under_budget_frames += 1
+            self.over_budget_frames = 0
+        else:
+            self.over_budget_frames = 0
+            self.under_budget_frames = 0
+            self.deferred_index = None
+
+        if self.over_budget_frames >= self.hold_frames:
+            return self._step(+1, latency)
+        if self.under_budget_frames >= self.hold_frames * 2:
+            return self._step(-1, latency)
+        return None
+
+    def _step(self, direction, latency):
+        """Đổi sang mức kế bên (+1 = thấp hơn, -1 = cao hơn)"""
+        new_index = self.level_index + direction
+        if new_index < 0 or new_index >= len(self.levels):
+            return None
+
+        old_level = self.level
+        new_level = self.levels[new_index]
+        now = self.clock()
+        if needs_rebuild(old_level, new_level):
+            if (self.last_rebuild_time is not None
+                    and now - self.last_rebuild_time < self.min_rebuild_interval):
+                # Mỗi frame sau đó vẫn bị chặn cho cùng lần đổi mức: không đếm lại
+                if self.deferred_index != new_index:
+                    self.deferred_index = new_index
+                    self.deferred += 1
+                return None
+            self.last_rebuild_time = now
+            self.rebuilds += 1
+
+        self.level_index = new_index
+        self.deferred_index = None
+        self.changes += 1
+        stages = ', '.join(f"{stage} {seconds * 1000:.1f}ms"
+                           for stage, seconds in sorted(self.stage_latency.items()))
+        print(f"Quality: {old_level['name']} -> {new_level['name']} "
+              f"(perception {latency * 1000:.1f}ms, budget {self.budget * 1000:.1f}ms; {stages})")
+        # Đo lại từ đầu ở mức mới, tránh nhảy 2 mức do EWMA còn giữ latency cũ
+        self.stage_latency.clear()
+        self.over_budget_frames = 0
+        self.under_budget_frames = 0
+        return new_level
@@ -0,0 +1,151 @@
+"""
+Landmark Recording - ghi / đọc kết quả perception mỗi frame
+File nhị phân: header 16 byte + các record kích thước cố định (numpy structured dtype)
+Đọc bằng np.memmap, không parse, không copy; record cuối bị cắt dở (crash) được bỏ qua
+"""
+import os
+import struct
+import numpy as np
+from landmarks import HAND_INDICES, FACE_INDICES, POSE_INDICES
+
+
+MAGIC = b'TLREC\x00\x00\x00'
+VERSION = 2
+# Số tay tối đa ghi mỗi frame (tay thừa bị bỏ)
+MAX_RECORDED_HANDS = 4
+# magic, version, kích thước 1 record (kiểm tra khớp dtype khi đọc)
+_HEADER = struct.Struct('<8sII')
+
+# Bit trong trường flags
+FLAG_HANDS = 1
+FLAG_FACE = 2
+FLAG_SHOULDERS = 4
+FLAG_TRY_ON = 8
+
+RECORD_DTYPE = np.dtype([
+    ('frame_id', '<i8'),
+    ('timestamp', '<f8'),              # Timestamp capture (giây)
+    ('flags', 'u1'),
+    ('hand_count', 'u1'),
+    ('hands', '<f4', (MAX_RECORDED_HANDS, len(HAND_INDICES), 3)),
+    ('face', '<f4', (len(FACE_INDICES), 3)),
+    ('shoulders', '<f4', (len(POSE_INDICES), 3)),
+    ('neck_anchor', '<f4', (2,)),
+    ('rotation', '<f4'),
+    ('face_scale', '<f4'),
+])
+
+
+class LandmarkRecorder:
+    """Ghi kết quả Perception.process_frame, 1 record mỗi frame"""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(_HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize))
+        # Buffer 1 record dùng lại cho mọi frame
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+        self.frames_written = 0
+
+    def write(self, perceived, timestamp, try_on=False):
+        """
+        Args:
+            perceived: dict từ Perception.process_frame
+            timestamp: timestamp capture của frame
+            try_on: frame được xử lý trong TRY_ON
+        """
+        record = self._record[0]
+        record['frame_id'] = -1 if perceived['frame_id'] is None else perceived['frame_id']
+        record['timestamp'] = timestamp
+        flags = FLAG_TRY_ON if try_on else 0
+
+        multi_hands = perceived.get('multi_hands')
+        if multi_hands is None:
+            multi_hands = [] if perceived['hands'] is None else [perceived['hands']]
+        hand_count = min(len(multi_hands), MAX_RECORDED_HANDS)
+        for slot in range(hand_count):
+            record['hands'][slot] = multi_hands[slot]
+        record['hand_count'] = hand_count
+        if hand_count:
+            flags |= FLAG_HANDS
+
+        face = perceived['face']
+        if face is not None:
+            landmarks = face['landmarks']
+            if landmarks is not None and len(landmarks) == len(FACE_INDICES):
+                record['face'] = landmarks
+            else:
+                # Buffer record dùng lại: không để landmark của frame trước nằm dưới FLAG_FACE
+                record['face'] = 0.0
+            record['neck_anchor'] = face['neck_anchor']
+            record['rotation'] = face['rotation']
+            record['face_scale'] = face['face_scale']
+            flags |= FLAG_FACE
+
+        shoulders = perceived.get('shoulders')
+        if shoulders is not None:
+            record['shoulders'] = shoulders
+            flags |= FLAG_SHOULDERS
+
+        record['flags'] = flags
+        self.file.write(self._record.tobytes())
+        self.frames_written += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class LandmarkRecording:
+    """Đọc file recording qua memmap: records[i] là 1 frame"""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, version, itemsize = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Không phải file landmark recording: {path}")
+        if version != VERSION or itemsize != RECORD_DTYPE.itemsize:
+            raise ValueError(f"Recording version {version} (record {itemsize} byte) không hỗ trợ")
+
+        self.path = path
+        count = (os.path.getsize(path) - _HEADER.size) // RECORD_DTYPE.itemsize
+        if count <= 0:
+            # mmap không map được vùng rỗng
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        else:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r',
+                                     offset=_HEADER.size, shape=(count,))
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def timestamps(self):
+        return self.records['timestamp']
+
+    def perceived(self, index):
+        """
+        Dựng lại output của Perception cho 1 frame
+        Returns:
+            dict: {'frame_id', 'timestamp', 'try_on', 'hands', 'multi_hands', 'face', 'shoulders'}
+        """
+        record = self.records[index]
+        flags = int(record['flags'])
+        face = None
+        if flags & FLAG_FACE:
+            neck_anchor = record['neck_anchor']
+            face = {
+                'landmarks': record['face'],
+                'neck_anchor': (float(neck_anchor[0]), float(neck_anchor[1])),
+                'face_scale': float(record['face_scale']),
+                'rotation': float(record['rotation'])
+            }
+        hands = record['hands']
+        multi_hands = [hands[slot] for slot in range(int(record['hand_count']))]
+        return {
+            'frame_id': int(record['frame_id']),
+            'timestamp': float(record['timestamp']),
+            'try_on': bool(flags & FLAG_TRY_ON),
+            'hands': multi_hands[0] if multi_hands else None,
+            'multi_hands': multi_hands,
+            'face': face,
+            'shoulders': record['shoulders'] if flags & FLAG_SHOULDERS else None
+        }
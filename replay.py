@@ -0,0 +1,106 @@
+"""
+Replay - chạy lại landmark recording qua Normalizer, Motion, Gesture, StateMachine
+Không cần MediaPipe, không cần camera: dùng cho regression test gesture và
+benchmark phần sau perception. Mọi tầng đọc thời gian từ SimulatedClock tiến theo
+timestamp capture đã ghi, nên cả phiên dài (timeout, cooldown) chạy lại trong vài giây
+
+Chạy: python replay.py session.tlrec --events
+"""
+import argparse
+import time
+from clock import SimulatedClock
+from pipeline import InteractionPipeline
+from recording import LandmarkRecording
+from state import SystemState
+from trajectory import TemplateLibrary
+
+
+def replay(recording, pipeline=None, max_tracks=1, templates=None):
+    """
+    Chạy mọi frame của recording qua pipeline, theo đúng thứ tự và timestamp capture
+    Args:
+        recording: LandmarkRecording
+        pipeline: InteractionPipeline với SimulatedClock
+            (None = tạo mới với cấu hình như System)
+        max_tracks: số tay theo dõi khi tạo pipeline mới
+        templates: TemplateLibrary cho trajectory gesture khi tạo pipeline mới
+    Returns:
+        dict: {
+            'events': list (frame_id, timestamp, type, value, track_id)
+                cho GESTURE / STATE_CHANGE (track_id None với STATE_CHANGE),
+            'cursor_moves': int,
+            'transforms': int,
+            'frames': int
+        }
+    """
+    if pipeline is None:
+        start = float(recording.timestamps[0]) if len(recording) else 0.0
+        pipeline = InteractionPipeline(clock=SimulatedClock(start), max_tracks=max_tracks,
+                                       templates=templates)
+    clock = pipeline.clock
+    events = []
+    cursor_moves = 0
+    transforms = 0
+    for index in range(len(recording)):
+        perceived = recording.perceived(index)
+        # Thời gian chỉ tiến khi có frame; các tầng đọc từ clock
+        clock.advance_to(perceived['timestamp'])
+        timestamp = clock()
+        results = pipeline.step(perceived['multi_hands'], perceived['face'])
+
+        cursor_moves += len(results['cursors'])
+        for track_id, gesture in results['gestures']:
+            events.append((perceived['frame_id'], timestamp, 'GESTURE', gesture, track_id))
+        if 'new_state' in results:
+            events.append((perceived['frame_id'], timestamp, 'STATE_CHANGE',
+                           results['new_state'], None))
+        if results['transform']:
+            transforms += 1
+        # Như System._sync_logic: kiểm tra idle timeout mỗi frame, sau step
+        if pipeline.check_timeout():
+            events.append((perceived['frame_id'], timestamp, 'STATE_CHANGE',
+                           SystemState.IDLE.value, None))
+    return {
+        'events': events,
+        'cursor_moves': cursor_moves,
+        'transforms': transforms,
+        'frames': len(recording)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', help="File ghi bằng main.py --record")
+    parser.add_argument('--repeat', type=int, default=1, help="Chạy lại N lần (benchmark)")
+    parser.add_argument('--events', action='store_true', help="In từng event")
+    parser.add_argument('--max-hands', type=int, default=1, help="Số tay theo dõi cùng lúc")
+    parser.add_argument('--templates', default=None, metavar='PATH',
+                        help="Thư viện template trajectory gesture (xem trajectory.py)")
+    args = parser.parse_args()
+
+    templates = TemplateLibrary.load(args.templates) if args.templates else None
+    recording = LandmarkRecording(args.path)
+    duration = 0.0
+    if len(recording) > 1:
+        duration = recording.timestamps[-1] - recording.timestamps[0]
+    print(f"{args.path}: {len(recording)} frames, {duration:.1f}s capture")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        result = replay(recording, max_tracks=args.max_hands, templates=templates)
+    elapsed = time.perf_counter() - start
+
+    if args.events:
+        for frame_id, timestamp, kind, value, track_id in result['events']:
+            track = '' if track_id is None else f" (track {track_id})"
+            print(f"  frame {frame_id:>7} t={timestamp - recording.timestamps[0]:9.3f}s "
+                  f"{kind:<12} {value}{track}")
+    frames = result['frames'] * args.repeat
+    print(f"{len(result['events'])} events, {result['cursor_moves']} cursor moves, "
+          f"{result['transforms']} transforms")
+    if elapsed > 0:
+        print(f"Replay: {frames} frames in {elapsed:.2f}s ({frames / elapsed:.0f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
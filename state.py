@@ -3,10 +3,8 @@ State Machine
 Quản lý trạng thái hệ thống: IDLE, BROWSE_ITEM, TRY_ON
 Quyết định gesture nào hợp lệ trong từng state
 """
-from enum import Enum
-
-
 import time
+from enum import Enum
 
 
 class SystemState(Enum):
@@ -16,10 +14,16 @@ class SystemState(Enum):
 
 
 class StateMachine:
-    def __init__(self, idle_timeout=10.0):
+    def __init__(self, idle_timeout=10.0, clock=time.time):
+        """
+        Args:
+            idle_timeout: giây không hoạt động trước khi về IDLE
+            clock: callable trả về giây, dùng khi không truyền now (xem clock.py)
+        """
+        self.clock = clock
         self.current_state = SystemState.IDLE
         self.transition_history = []
-        self.last_activity_time = time.time()
+        self.last_activity_time = clock()
         self.idle_timeout = idle_timeout
         self.last_transition_time = 0
         self.transition_cooldown = 1.5  # Giây - không cho phép chuyển state quá nhanh
@@ -28,31 +32,36 @@ class StateMachine:
         """Lấy trạng thái hiện tại"""
         return self.current_state
     
-    def update_activity(self):
-        """Cập nhật thời gian hoạt động cuối cùng"""
-        self.last_activity_time = time.time()
+    def update_activity(self, now=None):
+        """Cập nhật thời gian hoạt động cuối cùng (now = timestamp capture, None = clock())"""
+        self.last_activity_time = self.clock() if now is None else now
     
-    def check_timeout(self):
+    def check_timeout(self, now=None):
         """
         Kiểm tra nếu hệ thống không có hoạt động quá lâu thì về IDLE
+        Args:
+            now: timestamp capture của frame hiện tại (None = clock())
         Returns:
             bool: True nếu vừa có transition về IDLE
         """
+        if now is None:
+            now = self.clock()
         if self.current_state != SystemState.IDLE:
-            if time.time() - self.last_activity_time > self.idle_timeout:
+            if now - self.last_activity_time > self.idle_timeout:
                 print(f"Timeout! Tự động quay về IDLE sau {self.idle_timeout}s")
-                self.transition_to(SystemState.IDLE)
+                self.transition_to(SystemState.IDLE, now)
                 return True
         return False
 
-    def transition_to(self, new_state):
+    def transition_to(self, new_state, now=None):
         """
         Chuyển sang trạng thái mới
         Args:
             new_state: SystemState enum
+            now: timestamp capture (None = clock())
         """
         if new_state != self.current_state:
-            current_time = time.time()
+            current_time = self.clock() if now is None else now
             # Kiểm tra cooldown - không cho phép chuyển state quá nhanh
             if current_time - self.last_transition_time < self.transition_cooldown:
                 return  # Bỏ qua transition nếu chưa đủ cooldown
@@ -65,13 +74,14 @@ class StateMachine:
             })
             self.current_state = new_state
             self.last_transition_time = current_time
-            self.update_activity()
+            self.update_activity(current_time)
     
     def is_gesture_valid(self, gesture):
         """
         Kiểm tra gesture có hợp lệ trong state hiện tại không
         Args:
-            gesture: str (SWIPE_LEFT, SWIPE_RIGHT, PINCH, HOLD)
+            gesture: str (SWIPE_LEFT, SWIPE_RIGHT, PINCH, HOLD, POINT, FIST, OPEN,
+                CIRCLE, WAVE, CHECK)
         Returns:
             bool
         """
@@ -86,17 +96,23 @@ class StateMachine:
         if self.current_state == SystemState.IDLE:
             return False # IDLE chỉ nhận pinch/hold để start
             
-        return gesture in ['SWIPE_LEFT', 'SWIPE_RIGHT']
+        # Tư thế tĩnh (POINT, FIST, OPEN) và trajectory gesture (CIRCLE, WAVE, CHECK)
+        # chỉ báo cho frontend, không đổi state
+        return gesture in ['SWIPE_LEFT', 'SWIPE_RIGHT', 'POINT', 'FIST', 'OPEN',
+                           'CIRCLE', 'WAVE', 'CHECK']  # trajectory.TRAJECTORY_GESTURES
     
-    def handle_gesture(self, gesture):
+    def handle_gesture(self, gesture, now=None):
         """
         Xử lý gesture và chuyển state nếu cần
         Args:
             gesture: str
+            now: timestamp capture của frame sinh ra gesture (None = clock())
         Returns:
             tuple: (is_valid, should_emit_event)
         """
-        self.update_activity()
+        if now is None:
+            now = self.clock()
+        self.update_activity(now)
         
         if not self.is_gesture_valid(gesture):
             return False, False
@@ -104,10 +120,10 @@ class StateMachine:
         # Logic chuyển state
         if gesture == 'PINCH' or gesture == 'HOLD':
             if self.current_state == SystemState.IDLE:
-                self.transition_to(SystemState.BROWSE_ITEM)
+                self.transition_to(SystemState.BROWSE_ITEM, now)
                 return True, True
             elif self.current_state == SystemState.BROWSE_ITEM:
-                self.transition_to(SystemState.TRY_ON)
+                self.transition_to(SystemState.TRY_ON, now)
                 return True, True
             elif self.current_state == SystemState.TRY_ON:
                 # Khi ở TRY_ON, PINCH/HOLD không chuyển state nữa
@@ -115,7 +131,7 @@ class StateMachine:
                 # Không chuyển về BROWSE để tránh noise
                 return True, True
         
-        # SWIPE chỉ dùng để đổi item, không đổi state
+        # SWIPE chỉ dùng để đổi item, tư thế tĩnh chỉ để hiển thị: không đổi state
         return True, True
     
     def reset(self):
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import time
+from bridge import WebSocketBridge, CLOSE_OVERFLOW
+from protocol import SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON, decode_binary
+
+
+class FakeClient:
+    """WebSocket giả: mỗi send mất `delay` giây"""
+    def __init__(self, delay=0.0, subprotocol=None):
+        self.delay = delay
+        self.subprotocol = subprotocol
+        self.received = []
+        self.frames = []  # Message thô (str / bytes)
+        self.close_code = None
+
+    async def send(self, message):
+        await asyncio.sleep(self.delay)
+        self.frames.append(message)
+        self.received.append(decode_binary(message) if isinstance(message, bytes)
+                             else json.loads(message))
+
+    async def close(self, code=1000, reason=''):
+        self.close_code = code
+
+
+async def _drain(bridge, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while any(len(queue) for queue in bridge.clients.values()):
+        assert time.perf_counter() < deadline
+        await asyncio.sleep(0.005)
+    await asyncio.sleep(0.05)
+
+
+def test_slow_client_does_not_delay_others_and_coalesces():
+    async def scenario():
+        bridge = WebSocketBridge()
+        fast, slow = FakeClient(), FakeClient(delay=0.02)
+        await bridge.register_client(fast)
+        await bridge.register_client(slow)
+
+        start = time.perf_counter()
+        for i in range(50):
+            await bridge.emit_cursor_move(i * 10, 0, track_id=1)
+            await bridge.emit_cursor_move(0, i * 10, track_id=2)
+            if i % 10 == 0:
+                await bridge.emit_gesture_event(f'G{i}', track_id=1)
+            await bridge.emit_item_transform((i, i), 0.0, 1.0)
+            # ~1 frame: client nhanh gửi kịp hết, client chậm thì không
+            await asyncio.sleep(0.002)
+        await bridge.emit_state_change('TRY_ON')
+        # Broadcast không chờ socket của client chậm
+        assert time.perf_counter() - start < 0.5
+        await _drain(bridge)
+
+        assert len(fast.received) == 50 * 3 + 5 + 1
+        stats = {entry['client']: entry for entry in bridge.client_stats()}
+        assert stats[2]['coalesced'] > 0 and stats[1]['coalesced'] == 0
+
+        # Client chậm: đủ gesture / state đúng thứ tự, cursor / transform cuối cùng là bản mới nhất
+        reliable = [m.get('gesture', m.get('state')) for m in slow.received
+                    if m['type'] in ('GESTURE', 'STATE_CHANGE')]
+        assert reliable == ['G0', 'G10', 'G20', 'G30', 'G40', 'TRY_ON']
+        last = {}
+        for message in slow.received:
+            last[(message['type'], message.get('track_id'))] = message
+        assert (last[('CURSOR_MOVE', 1)]['x'], last[('CURSOR_MOVE', 2)]['y']) == (490, 490)
+        assert last[('ITEM_TRANSFORM', None)]['anchor'] == {'x': 49, 'y': 49}
+        assert len(slow.received) + stats[2]['coalesced'] == len(fast.received)
+        # Transform mới nhất không bị gửi trước STATE_CHANGE đứng trước nó trong hàng
+        kinds = [m['type'] for m in slow.received]
+        assert kinds[-1] == 'STATE_CHANGE'
+
+        for websocket in list(bridge.clients):
+            await bridge.unregister_client(websocket)
+        assert bridge.coalesced_total == stats[2]['coalesced']
+
+    asyncio.run(scenario())
+
+
+def test_reliable_overflow_closes_stalled_client():
+    async def scenario():
+        bridge = WebSocketBridge(max_reliable=4)
+        stalled = FakeClient(delay=10.0)
+        await bridge.register_client(stalled)
+        await asyncio.sleep(0)
+        for i in range(10):
+            await bridge.emit_gesture_event('PINCH')
+        queue = bridge.clients[stalled]
+        assert queue.overflowed and queue.reliable_pending == 4
+        await bridge.unregister_client(stalled)
+        assert bridge.overflow_disconnects == 1 and bridge.clients == {}
+
+        # Writer đóng kết nối khi thấy hàng tràn
+        bridge = WebSocketBridge(max_reliable=4)
+        client = FakeClient()
+        queue = await bridge.register_client(client)
+        for i in range(10):
+            queue.put(json.dumps({'type': 'GESTURE', 'gesture': 'PINCH'}))
+        await asyncio.sleep(0.05)
+        assert client.close_code == CLOSE_OVERFLOW
+        assert queue.task.done()
+        await bridge.unregister_client(client)
+
+    asyncio.run(scenario())
+
+
+def test_binary_and_json_clients_receive_same_messages():
+    async def scenario():
+        bridge = WebSocketBridge()
+        clients = [FakeClient(subprotocol=SUBPROTOCOL_BINARY),
+                   FakeClient(subprotocol=SUBPROTOCOL_JSON), FakeClient()]
+        for client in clients:
+            await bridge.register_client(client)
+        await bridge.emit_cursor_move(640, 360, capture_ts=1760000000.25, track_id=3)
+        await bridge.emit_gesture_event('SWIPE_LEFT', 1760000000.25, track_id=3)
+        await bridge.emit_state_change('BROWSE_ITEM')
+        await bridge.emit_item_transform((320, 410), -0.52359, 0.8537, 1760000000.25)
+        await bridge.broadcast({'type': 'DEBUG', 'note': 'không có layout binary'})
+        await _drain(bridge)
+
+        binary, as_json, legacy = clients
+        assert [type(frame) for frame in binary.frames] == [bytes] * 4 + [str]
+        assert all(isinstance(frame, str) for frame in as_json.frames + legacy.frames)
+        assert as_json.received == legacy.received
+        assert [m['seq'] for m in binary.received] == [1, 2, 3, 4, 5]
+        for decoded, expected in zip(binary.received, as_json.received):
+            if expected['type'] == 'ITEM_TRANSFORM':
+                # Lượng tử hóa: rotation / scale sai tối đa 0.5e-4
+                assert abs(decoded.pop('rotation') - expected.pop('rotation')) <= 0.5e-4
+                assert abs(decoded.pop('scale') - expected.pop('scale')) <= 0.5e-4
+            assert decoded == expected
+        # Cursor: header 13 byte + 6 byte, so với ~90 byte JSON
+        assert len(binary.frames[0]) == 19
+        stats = {entry['client']: entry for entry in bridge.client_stats()}
+        assert stats[1]['bytes_sent'] < stats[2]['bytes_sent'] / 2
+
+        for websocket in list(bridge.clients):
+            await bridge.unregister_client(websocket)
+
+    asyncio.run(scenario())
+
+
+def test_frame_update_bundles_one_frame_into_one_message():
+    async def scenario():
+        bridge = WebSocketBridge()
+        binary, as_json = FakeClient(subprotocol=SUBPROTOCOL_BINARY), FakeClient()
+        await bridge.register_client(binary)
+        await bridge.register_client(as_json)
+        transform = {'anchor': (320, 410), 'rotation': 0.25, 'scale': 0.75}
+        await bridge.emit_frame_update([(1, 100, 200), (2, 300, 400)], [(2, 'PINCH')],
+                                       'TRY_ON', transform, capture_ts=10.0)
+        # Cursor di chuyển < 2 pixel, không có gì khác: bỏ qua
+        await bridge.emit_frame_update([(1, 101, 200), (2, 300, 401)], capture_ts=10.1)
+        # Track 2 mất: snapshot mới
+        await bridge.emit_frame_update([(1, 101, 200)], capture_ts=10.2)
+        await _drain(bridge)
+
+        assert [type(frame) for frame in binary.frames] == [bytes, bytes]
+        first, second = as_json.received
+        assert first == {
+            'type': 'FRAME_UPDATE', 'seq': 1, 'capture_ts': 10.0,
+            'cursors': [{'track_id': 1, 'x': 100, 'y': 200}, {'track_id': 2, 'x': 300, 'y': 400}],
+            'gestures': [{'track_id': 2, 'gesture': 'PINCH'}], 'state': 'TRY_ON',
+            'transform': {'anchor': {'x': 320, 'y': 410}, 'rotation': 0.25, 'scale': 0.75}
+        }
+        assert second['cursors'] == [{'track_id': 1, 'x': 101, 'y': 200}]
+        assert 'state' not in second and 'transform' not in second
+        assert binary.received == as_json.received
+
+        # Client chậm: snapshot chỉ có cursor / transform được coalesce, frame có gesture / state thì không
+        slow = FakeClient(delay=0.02)
+        await bridge.register_client(slow)
+        for i in range(20):
+            gestures = [(1, 'SWIPE_LEFT')] if i == 10 else []
+            await bridge.emit_frame_update([(1, 10 * i, 0)], gestures,
+                                           transform=dict(transform, scale=1.0 + i / 100))
+        await _drain(bridge)
+        assert len(slow.received) < 20
+        assert [g['gesture'] for m in slow.received for g in m['gestures']] == ['SWIPE_LEFT']
+        assert slow.received[-1]['cursors'] == [{'track_id': 1, 'x': 190, 'y': 0}]
+        seqs = [m['seq'] for m in slow.received]
+        assert seqs == sorted(seqs)
+
+        for websocket in list(bridge.clients):
+            await bridge.unregister_client(websocket)
+
+    asyncio.run(scenario())
@@ -0,0 +1,150 @@
+import asyncio
+import time
+import cv2
+import numpy as np
+from camera import (
+    Camera, CaptureThread, Frame, FrameMailbox, SyntheticSource,
+    ImageDirectorySource, VideoFileSource, open_source, PACING_FAST, PACING_REALTIME
+)
+
+
+def test_synthetic_fast_pacing_keeps_media_timestamps():
+    source = SyntheticSource(width=64, height=48, fps=10.0, num_frames=5, pacing=PACING_FAST)
+    timestamps = []
+    start = time.time()
+    while True:
+        ok, frame, ts = source.read()
+        if not ok:
+            break
+        assert frame.shape == (48, 64, 3)
+        timestamps.append(ts)
+
+    assert source.finished
+    assert len(timestamps) == 5
+    # Không chờ, nhưng timestamp vẫn cách nhau đúng 1/fps
+    assert time.time() - start < 0.3
+    assert np.allclose(np.diff(timestamps), 0.1)
+
+
+def test_synthetic_realtime_pacing_waits():
+    source = SyntheticSource(width=32, height=32, fps=20.0, num_frames=4, pacing=PACING_REALTIME)
+    start = time.time()
+    while source.read()[0]:
+        pass
+    # 4 frames @ 20 FPS = 3 khoảng 50ms
+    assert time.time() - start >= 0.14
+
+
+def test_image_directory_loop(tmp_path):
+    for i in range(3):
+        cv2.imwrite(str(tmp_path / f"{i:03d}.png"), np.full((8, 8, 3), i * 50, np.uint8))
+    source = ImageDirectorySource(str(tmp_path), fps=30.0, pacing=PACING_FAST, loop=True)
+    values = [int(source.read()[1][0, 0, 0]) for _ in range(5)]
+    assert values == [0, 50, 100, 0, 50]
+
+
+def test_video_file_source(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25.0, (32, 24))
+    for i in range(6):
+        writer.write(np.full((24, 32, 3), i * 40, np.uint8))
+    writer.release()
+
+    source = open_source(path, pacing=PACING_FAST)
+    assert isinstance(source, VideoFileSource)
+    timestamps = []
+    while True:
+        ok, _, ts = source.read()
+        if not ok:
+            break
+        timestamps.append(ts)
+    assert len(timestamps) == 6
+    assert np.allclose(np.diff(timestamps), 1 / 25.0)
+
+
+class VariableRateCapture:
+    """cv2.VideoCapture giả: video frame rate thay đổi, POS_MSEC = timestamp frame vừa đọc"""
+    def __init__(self, times_ms):
+        self.times_ms = times_ms
+        self.index = -1
+
+    def read(self):
+        if self.index + 1 >= len(self.times_ms):
+            return False, None
+        self.index += 1
+        return True, np.zeros((4, 4, 3), np.uint8)
+
+    def get(self, prop):
+        assert prop == cv2.CAP_PROP_POS_MSEC
+        return float(self.times_ms[self.index])
+
+    def set(self, prop, value):
+        self.index = int(value) - 1
+
+    def release(self):
+        pass
+
+
+def test_video_file_source_uses_container_timestamps(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25.0, (32, 24))
+    writer.write(np.zeros((24, 32, 3), np.uint8))
+    writer.release()
+
+    source = VideoFileSource(path, pacing=PACING_FAST, loop=True)
+    source.cap.release()
+    # 25 FPS rồi tụt xuống 10 FPS giữa chừng
+    source.cap = VariableRateCapture([0, 40, 80, 180, 280])
+    timestamps = [source.read()[2] for _ in range(7)]
+    media = np.array(timestamps) - timestamps[0]
+    # Vòng 2 bắt đầu sau frame cuối + 1 frame (1/25s)
+    assert np.allclose(media, [0, 0.04, 0.08, 0.18, 0.28, 0.32, 0.36])
+
+
+def test_camera_wraps_source():
+    camera = Camera(source=SyntheticSource(width=16, height=16, num_frames=1, pacing=PACING_FAST))
+    ok, frame = camera.read_frame()
+    assert ok and frame.shape == (16, 16, 3) and frame.frame_id == 0
+    # Video stream dùng chung buffer với frame, không copy
+    assert camera.get_last_frame_bgr() is frame.bgr
+    assert not camera.read_frame()[0]
+    assert camera.finished
+
+
+def test_mailbox_latest_wins_and_wakes_loop():
+    async def scenario():
+        mailbox = FrameMailbox()
+        mailbox.bind(asyncio.get_running_loop())
+        mailbox.put('a')
+        mailbox.put('b')
+        assert await mailbox.get() == 'b'
+        assert mailbox.overwritten == 1
+
+        camera = Camera(source=SyntheticSource(width=8, height=8, num_frames=3, pacing=PACING_FAST))
+        thread = CaptureThread(camera, mailbox)
+        thread.start()
+        items = []
+        while True:
+            item = await mailbox.get(timeout=1.0)
+            if item is None:
+                break
+            items.append(item)
+        thread.join()
+        assert mailbox.closed and thread.frames_captured == 3
+        assert [frame.frame_id for frame in items][-1] == 2
+        assert items[-1].timestamp is not None
+
+    asyncio.run(scenario())
+
+
+def test_frame_is_read_only_and_converts_rgb_once():
+    bgr = np.zeros((4, 4, 3), np.uint8)
+    bgr[..., 0] = 255
+    frame = Frame(bgr, frame_id=7, timestamp=1.0)
+    assert not frame.bgr.flags.writeable
+    assert not frame.has_rgb
+
+    rgb = frame.rgb
+    assert frame.rgb is rgb
+    assert not rgb.flags.writeable
+    assert rgb[0, 0, 2] == 255 and rgb[0, 0, 0] == 0
@@ -1,6 +1,6 @@
 import numpy as np
 import time
-from normalize import OneEuroFilter
+from normalize import OneEuroFilter, OneEuroFilterBank, Normalizer
 
 def test_filter():
     print("Testing One Euro Filter...")
@@ -22,5 +22,34 @@ def test_filter():
         out = f(p, dt=0.033)
         print(f"In: {p[0]:.4f} -> Out: {out[0]:.4f} (Diff: {abs(p[0]-out[0]):.4f})")
 
+def test_filter_bank_matches_single_filters():
+    rng = np.random.default_rng(0)
+    cutoffs = [(0.5, 0.01), (0.2, 0.005)]
+    singles = [OneEuroFilter(min_cutoff=c, beta=b) for c, b in cutoffs]
+    # (N, D): 2 hàng x 3 kênh, min_cutoff / beta theo hàng
+    bank = OneEuroFilterBank((2, 3), min_cutoff=[0.5, 0.2], beta=[0.01, 0.005])
+
+    for i in range(30):
+        block = rng.random((2, 3))
+        out = bank(block, timestamp=i * 0.033)
+        for row, single in enumerate(singles):
+            expected = single(block[row], dt=None if i == 0 else 0.033)
+            assert np.allclose(out[row], expected)
+
+
+def test_normalizer_channels_are_independent_slices():
+    normalizer = Normalizer()
+    normalizer.smooth_position(0.2, 0.2, timestamp=0.0)
+    # Neck chưa từng cập nhật: lần đầu nhận nguyên giá trị dù cursor đã chạy
+    assert normalizer.smooth_neck_anchor(0.7, 0.8, timestamp=1.0) == (0.7, 0.8)
+    # Cursor lọc theo dt riêng của kênh cursor
+    x, _ = normalizer.smooth_position(0.4, 0.4, timestamp=1.0 / 30)
+    assert 0.2 < x < 0.4
+    assert normalizer.smooth_rotation(0.1, timestamp=1.0) == 0.1
+
+    # smooth_face = neck + rotation + scale trong 1 lần cập nhật
+    anchor, rotation, scale = normalizer.smooth_face(0.7, 0.8, 0.1, 1.5, timestamp=1.0 + 1.0 / 30)
+    assert anchor == (0.7, 0.8) and rotation == 0.1 and scale == 1.5
+
 if __name__ == "__main__":
     test_filter()
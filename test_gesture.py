@@ -0,0 +1,69 @@
+import numpy as np
+from gesture import GestureDetector, GESTURE_RULES
+from motion import MotionFeatureExtractor
+
+
+def _hand(extended=(), index_dz=0.0, pinch=False):
+    """Tay tổng hợp: cổ tay (0.5, 0.8), ngón trong `extended` duỗi, còn lại gập"""
+    hand = np.zeros((21, 3))
+    hand[:] = (0.5, 0.8, 0.0)
+    for name, tip in (('index', 8), ('middle', 12), ('ring', 16), ('pinky', 20)):
+        hand[tip, 1] -= 0.35 if name in extended else 0.1
+    hand[8, 2] = index_dz
+    hand[4] = hand[8] if pinch else (0.3, 0.7, 0.0)
+    return hand
+
+
+def _run(detector, hand, frames, t0=100.0, dt=1 / 30):
+    """Chạy `frames` frame (motion không cập nhật: chỉ feature tư thế); list gesture phát ra"""
+    return [detector.process(hand, t0 + i * dt) for i in range(frames)]
+
+
+def test_static_poses_are_detected_once_per_appearance():
+    cases = (
+        (_hand(extended=('index',), index_dz=-0.1), 'POINT'),
+        (_hand(), 'FIST'),
+        (_hand(extended=('index', 'middle', 'ring', 'pinky')), 'OPEN'),
+    )
+    for hand, expected in cases:
+        detector = GestureDetector(MotionFeatureExtractor())
+        emitted = _run(detector, hand, 60)
+        # Hysteresis 3 frame, sau đó giữ tư thế không phát lại
+        assert emitted[2] == expected
+        assert [g for g in emitted if g] == [expected]
+
+        # Tư thế biến mất rồi xuất hiện lại -> phát lần nữa
+        detector.process(None)
+        assert _run(detector, hand, 3, t0=110.0)[2] == expected
+
+
+def test_pinch_repeats_after_cooldown():
+    detector = GestureDetector(MotionFeatureExtractor())
+    # Dấu "OK": thumb chạm index, 3 ngón còn lại duỗi
+    emitted = _run(detector, _hand(extended=('middle', 'ring', 'pinky'), pinch=True), 30)
+    assert set(g for g in emitted if g) == {'PINCH'}
+    times = [i for i, g in enumerate(emitted) if g]
+    assert times[0] == 2
+    assert all(b - a >= 0.3 * 30 for a, b in zip(times, times[1:]))
+    assert len(times) >= 2
+
+
+def test_evaluate_matches_rule_table():
+    detector = GestureDetector(MotionFeatureExtractor())
+    features = detector.compute_features(_hand(extended=('index',), index_dz=-0.1)).copy()
+    detected = dict(zip(detector.gestures, detector.evaluate(features)))
+    assert detected['POINT'] and not detected['FIST'] and not detected['OPEN']
+    # Feature NaN (chưa có motion) không bao giờ thoả điều kiện
+    assert not detected['HOLD'] and not detected['SWIPE_LEFT']
+    assert detector.gestures == tuple(name for name, _, _ in GESTURE_RULES)
+
+
+def test_register_adds_gesture_without_code():
+    detector = GestureDetector(MotionFeatureExtractor())
+    detector.register('PEACE', {
+        'd_index': (0.25, None), 'd_middle': (0.25, None),
+        'd_ring': (None, 0.2), 'd_pinky': (None, 0.2),
+    }, repeat=False)
+    assert detector.gestures[-1] == 'PEACE'
+    emitted = _run(detector, _hand(extended=('index', 'middle')), 10)
+    assert [g for g in emitted if g] == ['PEACE']
@@ -0,0 +1,86 @@
+import numpy as np
+from perception import HandRoiTracker
+
+
+def _hand(center_x, center_y, size=0.1):
+    """21 landmark giả trải đều trong ô vuông quanh tâm (normalized)"""
+    offsets = np.linspace(-size / 2, size / 2, 21)
+    return np.stack([center_x + offsets, center_y + offsets[::-1], np.full(21, -0.02)], axis=1)
+
+
+class FakeDetector:
+    """Trả về landmark của 1 bàn tay cố định trong toạ độ frame gốc"""
+    def __init__(self, hand, frame_shape):
+        self.hand = hand
+        self.height, self.width = frame_shape[:2]
+        self.crops = []
+
+    def full(self, rgb):
+        return None if self.hand is None else self.hand.copy()
+
+    def crop(self, rgb):
+        self.crops.append(rgb.shape)
+        return None if self.hand is None else self._local(rgb)
+
+    def _local(self, rgb):
+        # Frame giả chứa toạ độ pixel ở kênh 0/1 -> biết crop nằm đâu
+        x0, y0 = int(rgb[0, 0, 0]) * 8, int(rgb[0, 0, 1]) * 8
+        crop_h, crop_w = rgb.shape[:2]
+        local = self.hand.copy()
+        local[:, 0] = (self.hand[:, 0] * self.width - x0) / crop_w
+        local[:, 1] = (self.hand[:, 1] * self.height - y0) / crop_h
+        local[:, 2] = self.hand[:, 2] * self.width / crop_w
+        return local
+
+
+def _frame(width=1280, height=720):
+    ys, xs = np.mgrid[0:height, 0:width]
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[..., 0] = xs // 8
+    frame[..., 1] = ys // 8
+    return frame
+
+
+def test_crop_after_first_detection_and_exact_remap():
+    frame = _frame()
+    hand = _hand(0.4, 0.5)
+    detector = FakeDetector(hand, frame.shape)
+    tracker = HandRoiTracker(step=8)
+
+    first = tracker.process(frame, detector.full, detector.crop)
+    assert tracker.full_frames == 1 and tracker.box is not None
+    x0, y0, x1, y1 = tracker.box
+    assert x0 % 8 == 0 and y0 % 8 == 0 and (x1 - x0) == (y1 - y0)
+
+    second = tracker.process(frame, detector.full, detector.crop)
+    assert tracker.roi_frames == 1
+    assert detector.crops[0][0] < frame.shape[0]
+    assert np.allclose(second, hand) and np.allclose(first, hand)
+
+
+def test_falls_back_to_full_frame_when_lost_or_near_edge():
+    frame = _frame()
+    detector = FakeDetector(_hand(0.4, 0.5), frame.shape)
+    tracker = HandRoiTracker(step=8)
+    tracker.process(frame, detector.full, detector.crop)
+
+    # Tay nhảy ra mép crop: bỏ kết quả crop, chạy lại full frame
+    detector.hand = _hand(0.47, 0.5)
+    result = tracker.process(frame, detector.full, detector.crop)
+    assert tracker.fallbacks == 1 and tracker.full_frames == 2
+    assert np.allclose(result, detector.hand)
+
+    # Mất tay: crop không thấy -> full frame, lần sau không crop nữa
+    detector.hand = None
+    assert tracker.process(frame, detector.full, detector.crop) is None
+    assert tracker.box is None
+    tracker.process(frame, detector.full, detector.crop)
+    assert tracker.fallbacks == 2 and tracker.full_frames == 4
+
+
+def test_large_hand_uses_full_frame():
+    frame = _frame()
+    detector = FakeDetector(_hand(0.5, 0.5, size=0.6), frame.shape)
+    tracker = HandRoiTracker()
+    tracker.process(frame, detector.full, detector.crop)
+    assert tracker.box is None
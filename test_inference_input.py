@@ -0,0 +1,46 @@
+import numpy as np
+from perception import InferenceInput
+
+
+def _project(inference, points):
+    """Map normalized của frame gốc -> normalized của ảnh inference (nghịch đảo to_frame)"""
+    scale, offset = inference.mapping
+    return (points - offset[:points.shape[1]]) / scale[:points.shape[1]]
+
+
+def test_scale_keeps_aspect_and_maps_back():
+    inference = InferenceInput(scale=0.5)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    image = inference.prepare(frame)
+    assert image.shape == (240, 320, 3)
+
+    # Không letterbox: normalized giữ nguyên, z cũng vậy
+    points = np.array([[0.25, 0.75, -0.1], [1.0, 0.0, 0.2]])
+    assert np.allclose(inference.to_frame(points.copy()), points)
+
+
+def test_letterbox_round_trip():
+    inference = InferenceInput(size=(256, 256))
+    frame = np.full((480, 640, 3), 200, dtype=np.uint8)
+    image = inference.prepare(frame)
+    assert image.shape == (256, 256, 3)
+
+    # 640x480 -> 256x192, viền đen 32px trên và dưới
+    pad_x, pad_y, content_w, content_h = inference.content_box
+    assert (pad_x, pad_y, content_w, content_h) == (0, 32, 256, 192)
+    assert image[:pad_y].max() == 0 and image[pad_y + content_h:].max() == 0
+    assert image[pad_y:pad_y + content_h].min() == 200
+
+    points = np.array([[0.0, 0.0, 0.0], [0.5, 0.5, -0.05], [1.0, 1.0, 0.1]])
+    projected = _project(inference, points)
+    # Góc frame nằm ở mép vùng nội dung, không phải mép ảnh inference
+    assert np.allclose(projected[0, :2], [0.0, 32 / 256])
+    assert np.allclose(projected[2, :2], [1.0, 224 / 256])
+    assert np.allclose(inference.to_frame(projected), points)
+
+
+def test_identity_returns_same_frame():
+    inference = InferenceInput()
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    assert inference.prepare(frame) is frame
+    assert inference.to_frame(None) is None
@@ -0,0 +1,31 @@
+import numpy as np
+from types import SimpleNamespace
+from landmarks import LandmarkSet, LandmarkFramePool, FACE_INDICES
+
+
+def _landmarks(count):
+    return [SimpleNamespace(x=i / count, y=1.0 - i / count, z=-0.01 * i, visibility=0.5)
+            for i in range(count)]
+
+
+def test_subset_fill_reuses_buffer_and_indexes_by_model_index():
+    face = LandmarkSet(FACE_INDICES)
+    buffer = face.points
+    points = face.fill(_landmarks(478))
+    assert points is buffer and points.dtype == np.float32
+    assert points.shape == (len(FACE_INDICES), 3) and face.present
+    assert np.allclose(face[152], [152 / 478, 1 - 152 / 478, -1.52])
+    assert np.allclose(face.visibility, 0.5)
+
+    face.clear()
+    assert not face.present
+
+
+def test_pool_cycles_preallocated_frames():
+    pool = LandmarkFramePool(size=2)
+    first = pool.acquire(frame_id=1, timestamp=0.5)
+    first.hands.fill(_landmarks(21))
+    second = pool.acquire(frame_id=2)
+    third = pool.acquire(frame_id=3)
+    assert third is first and second is not first
+    assert third.frame_id == 3 and third.timestamp is None and not third.hands.present
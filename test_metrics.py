@@ -0,0 +1,67 @@
+import numpy as np
+from metrics import Metrics
+from quality import QualityController
+from main import export_quality_metrics
+
+
+def test_rolling_quantiles_and_text_format():
+    metrics = Metrics(window=100)
+    for i in range(300):
+        metrics.record('hands', i / 1000.0)
+    metrics.increment('frames_dropped_total', 2)
+    metrics.set_counter('frames_processed_total', 300)
+
+    stats = metrics.stages['hands']
+    # Chỉ 100 mẫu gần nhất (200..299 ms) vào percentile, count / sum tính tất cả
+    assert np.isclose(stats.quantiles()[0], 0.2495)
+    assert stats.count == 300 and np.isclose(stats.total, sum(range(300)) / 1000.0)
+
+    text = metrics.render()
+    assert 'touchless_stage_latency_seconds{stage="hands",quantile="0.99"}' in text
+    assert 'touchless_stage_latency_seconds_count{stage="hands"} 300' in text
+    assert 'touchless_frames_dropped_total 2' in text
+    assert 'touchless_frames_processed_total 300' in text
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    lap = metrics.lap()
+    lap('gesture')
+    metrics.record_timings({'hands': 0.01})
+    metrics.increment('frames_dropped_total')
+    assert metrics.stages == {} and metrics.counters == {}
+
+
+def test_gauges_render_one_series_per_label_set():
+    metrics = Metrics()
+    metrics.set_gauge('bridge_client_queue_depth', 3, {'client': 1})
+    metrics.set_gauge('bridge_client_queue_depth', 0, {'client': 2})
+    metrics.set_gauge('clients', 2)
+    text = metrics.render()
+    assert text.count('# TYPE touchless_bridge_client_queue_depth gauge') == 1
+    assert 'touchless_bridge_client_queue_depth{client="1"} 3' in text
+    assert 'touchless_bridge_client_queue_depth{client="2"} 0' in text
+    assert 'touchless_clients 2' in text
+
+    metrics.clear_gauge('bridge_client_queue_depth')
+    assert 'client="1"' not in metrics.render()
+
+
+def test_quality_changes_are_exported():
+    metrics = Metrics()
+    quality = QualityController(target_fps=30.0, hold_frames=1, ewma_alpha=1.0,
+                                min_rebuild_interval=5.0, clock=lambda: 0.0)
+    export_quality_metrics(metrics, quality)
+    assert 'touchless_quality_level 1' in metrics.render()
+
+    # Giảm mức (rebuild), rồi lên lại bị hoãn vì chưa đủ 5 giây
+    assert quality.observe({'total': 0.1})['name'] == 'low'
+    for _ in range(4):
+        quality.observe({'total': 0.0})
+    export_quality_metrics(metrics, quality)
+    text = metrics.render()
+    assert 'touchless_quality_changes_total 1' in text
+    assert 'touchless_quality_graph_rebuilds_total 1' in text
+    assert 'touchless_quality_deferred_total 1' in text
+    assert '# TYPE touchless_quality_level gauge' in text
+    assert 'touchless_quality_level 2' in text
@@ -0,0 +1,60 @@
+import asyncio
+import numpy as np
+from camera import Frame
+from mjpeg import MjpegBroadcaster
+
+
+class FakeResponse:
+    """StreamResponse giả: mỗi write mất `delay` giây"""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.parts = []
+
+    async def write(self, data):
+        await asyncio.sleep(self.delay)
+        self.parts.append(data)
+
+
+def _frame(frame_id):
+    bgr = np.full((48, 64, 3), frame_id % 256, dtype=np.uint8)
+    return Frame(bgr, frame_id, float(frame_id))
+
+
+def test_encodes_each_frame_once_for_all_viewers():
+    async def scenario():
+        video = MjpegBroadcaster(max_fps=1000.0)
+        encoder = asyncio.create_task(video.run())
+        # Chưa có viewer: không encode
+        video.publish(_frame(1))
+        await asyncio.sleep(0.02)
+        assert video.encodes == 0
+
+        fast, other, slow = FakeResponse(), FakeResponse(), FakeResponse(delay=0.05)
+        viewers = [asyncio.create_task(video.stream(response)) for response in (fast, other, slow)]
+        await asyncio.sleep(0.02)
+        # Viewer mới nhận ngay frame hiện có
+        assert video.encodes == 1 and video.frame_id == 1
+        assert fast.parts == other.parts and len(fast.parts) == 1
+
+        for frame_id in range(2, 22):
+            video.publish(_frame(frame_id))
+            await asyncio.sleep(0.01)
+            # Cùng frame publish lại: không encode lại
+            video.publish(_frame(frame_id))
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.1)
+
+        assert video.encodes == 21 and video.unchanged >= 20
+        # Viewer nhanh nhận mọi frame, đúng bytes dùng chung; viewer chậm bỏ frame nhưng có bản cuối
+        assert len(fast.parts) == 21 and fast.parts == other.parts
+        assert fast.parts[-1] is video.part
+        assert slow.parts[0] is fast.parts[0]
+        assert len(slow.parts) < 21 and slow.parts[-1] is video.part
+        assert video.viewer_skips == 21 - len(slow.parts)
+        assert fast.parts[0].startswith(b'--frame\r\nContent-Type: image/jpeg\r\n\r\n\xff\xd8')
+
+        video.close()
+        await asyncio.gather(encoder, *viewers)
+        assert video.viewers == 0
+
+    asyncio.run(scenario())
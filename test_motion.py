@@ -0,0 +1,40 @@
+import numpy as np
+from motion import MotionFeatureExtractor
+
+
+def test_incremental_statistics_match_numpy_over_long_stream():
+    rng = np.random.default_rng(0)
+    motion = MotionFeatureExtractor(history_size=10, velocity_window=5)
+    times = 1_700_000_000.0 + np.cumsum(rng.uniform(0.02, 0.05, 5000))
+    times[3000:] += 3600.0   # Khoảng trống 1 giờ (replay phiên dài)
+    positions = rng.random((5000, 2))
+    for i, ((x, y), t) in enumerate(zip(positions, times)):
+        motion.update(x, y, t)
+        if i % 97 != 0 and i < 4990:
+            continue
+        window = positions[max(0, i - 9):i + 1]
+        assert np.allclose(motion.get_positions(), window)
+        assert np.allclose(motion.get_variance(), window.var(axis=0), atol=1e-12)
+        assert np.allclose(motion.get_mean(), window.mean(axis=0))
+        if i >= 1:
+            fit_t = times[max(0, i - 4):i + 1]
+            fit_p = positions[max(0, i - 4):i + 1]
+            expected = np.polyfit(fit_t - fit_t[0], fit_p, 1)[0]
+            vx, vy, magnitude = motion.get_velocity()
+            assert np.allclose((vx, vy), expected, rtol=1e-6, atol=1e-6)
+            assert np.isclose(magnitude, np.hypot(*expected), rtol=1e-6)
+    assert np.isclose(motion.get_distance(-10, -1),
+                      np.hypot(*(positions[-1] - positions[-10])))
+
+
+def test_velocity_needs_two_distinct_timestamps():
+    motion = MotionFeatureExtractor()
+    motion.update(0.1, 0.1, 5.0)
+    assert motion.get_velocity() is None and motion.get_direction() is None
+    motion.update(0.2, 0.1, 5.0)
+    assert motion.get_velocity() is None
+    motion.update(0.3, 0.1, 5.1)
+    assert motion.get_velocity()[0] > 0
+    assert motion.get_distance(-10, -1) is None
+    motion.reset()
+    assert len(motion) == 0 and motion.get_variance() is None
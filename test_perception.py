@@ -0,0 +1,84 @@
+import numpy as np
+from perception import Perception, TrackExtrapolator
+from quality import QUALITY_LEVELS
+
+
+def test_extrapolates_linearly_between_measurements():
+    track = TrackExtrapolator(max_age=0.3)
+    assert track.predict(0.0) is None
+    track.update(1.0, (0.5, 2.0))
+    # 1 lần đo: giữ nguyên giá trị
+    assert np.allclose(track.predict(1.05), (0.5, 2.0))
+    track.update(1.1, (0.6, 1.0))
+    assert np.allclose(track.predict(1.15), (0.65, 0.5))
+    assert np.allclose(track.predict(1.4), (0.9, -2.0))
+    # Quá max_age kể từ lần đo cuối: mất track
+    assert track.predict(1.41) is None
+    track.reset()
+    assert track.predict(1.15) is None
+
+
+def test_rotation_extrapolates_across_pi():
+    track = TrackExtrapolator(angles=(0,))
+    track.update(0.0, (np.pi - 0.1, 1.0))
+    track.update(0.1, (-np.pi + 0.1, 1.0))
+    # Cặp đo vắt qua pi: xoay +2 rad/s, không phải -2pi
+    rotation, scale = track.predict(0.2)
+    assert np.isclose(rotation, -np.pi + 0.3) and scale == 1.0
+    # Dự đoán vượt pi: wrap về [-pi, pi)
+    track.update(0.2, (np.pi - 0.2, 1.0))
+    track.update(0.3, (np.pi - 0.1, 1.0))
+    rotation, _ = track.predict(0.5)
+    assert np.isclose(rotation, -np.pi + 0.1)
+
+
+def test_cadence_and_reset_when_leaving_try_on():
+    perception = Perception(parallel=False, cadence={'face_mesh': 2, 'pose': 3})
+    try:
+        image = np.zeros((120, 160, 3), dtype=np.uint8)
+        for i in range(6):
+            perception.process_frame(image, i, try_on=True, timestamp=i / 30)
+        assert perception.model_runs == {'face_mesh': 3, 'pose': 2}
+
+        perception.face_track.update(1.0, (0.1, 0.3, 0.5, 0.6))
+        perception.neck_track.update(1.0, (0.5, 0.8))
+        perception.process_frame(image, 6, try_on=False)
+        assert perception.face_track.last is None and perception.neck_track.last is None
+        assert perception.cadence_counters == {'face_mesh': 0, 'pose': 0}
+
+        # Vào lại TRY_ON: mọi model chạy ngay frame đầu
+        perception.process_frame(image, 7, try_on=True, timestamp=1.0)
+        assert perception.model_runs == {'face_mesh': 4, 'pose': 3}
+    finally:
+        perception.release()
+
+
+def test_quality_level_scales_user_inference_size():
+    perception = Perception(parallel=False, inference_scale=0.5, inference_size=(320, 240))
+    try:
+        perception.apply_quality(QUALITY_LEVELS[-1])
+        image = np.zeros((480, 640, 3), dtype=np.uint8)
+        perception.inference.prepare(image)
+        # 0.5 (người dùng) x 0.5 (mức lowest) trên 320x240
+        assert perception.inference.target_size == (80, 60)
+        perception.apply_quality(QUALITY_LEVELS[0])
+        assert perception.inference.scale == 0.5
+    finally:
+        perception.release()
+
+
+def test_track_age_follows_cadence_at_low_fps():
+    perception = Perception(parallel=False, cadence={'face_mesh': 3, 'pose': 6})
+    try:
+        image = np.zeros((120, 160, 3), dtype=np.uint8)
+        perception.process_frame(image, 0, try_on=True, timestamp=0.0)
+        perception.neck_track.update(0.0, (0.5, 0.8))  # Như Pose vừa thấy vai
+        # 10 FPS, pose cadence 6: 5 frame bỏ qua = 0.5s > TRACK_MAX_AGE, track vẫn còn
+        for i in range(1, 6):
+            perception.process_frame(image, i, try_on=True, timestamp=i / 10)
+            assert perception.neck_track.predict(i / 10) is not None
+        assert np.isclose(perception.neck_track.max_age, 1.5 * 6 * 0.1)
+        # Camera đứng lâu hơn khoảng cách 2 lần chạy: vẫn mất track
+        assert perception.neck_track.predict(2.0) is None
+    finally:
+        perception.release()
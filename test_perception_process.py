@@ -0,0 +1,62 @@
+import numpy as np
+from perception_process import (
+    SharedFrameRing, _encode_hands, _decode_hands, _encode_face, _decode_face,
+    _encode_frame, _decode_frame
+)
+
+
+def test_ring_slots_share_memory_with_attached_view():
+    ring = SharedFrameRing((4, 6, 3), slots=2)
+    try:
+        attached = SharedFrameRing((4, 6, 3), slots=2, name=ring.name)
+        first = ring.write(np.full((4, 6, 3), 7, np.uint8))
+        second = ring.write(np.full((4, 6, 3), 9, np.uint8))
+        assert (first, second) == (0, 1)
+        assert ring.write(np.zeros((4, 6, 3), np.uint8)) == 0
+        assert attached.view(1)[0, 0, 0] == 9
+        attached.close()
+    finally:
+        ring.close()
+
+
+def test_result_codecs_roundtrip():
+    hands = np.random.default_rng(0).random((21, 3))
+    assert _encode_hands(None) == b'N'
+    payload = _encode_hands(hands)
+    assert np.allclose(_decode_hands(payload[1:]), hands, atol=1e-6)
+
+    face = {
+        'landmarks': np.random.default_rng(1).random((478, 3)),
+        'neck_anchor': (0.5, 0.7),
+        'face_scale': 0.3,
+        'rotation': -0.1
+    }
+    decoded = _decode_face(_encode_face(face)[1:])
+    assert decoded['landmarks'].shape == (478, 3)
+    assert np.allclose(decoded['neck_anchor'], face['neck_anchor'])
+    assert abs(decoded['rotation'] - face['rotation']) < 1e-6
+
+    frame = _decode_frame(_encode_frame({
+        'frame_id': 12, 'hands': hands, 'face': face, 'shoulders': hands[:2],
+        'timings': {'hands': 0.01, 'total': 0.02}
+    })[1:])
+    assert frame['frame_id'] == 12
+    assert set(frame['timings']) == {'hands', 'total'}
+    assert np.allclose(frame['hands'], hands, atol=1e-6)
+    assert np.allclose(frame['face']['neck_anchor'], face['neck_anchor'])
+    assert np.allclose(frame['shoulders'], hands[:2], atol=1e-6)
+    assert len(frame['multi_hands']) == 1
+
+    second = hands[::-1].copy()
+    both = _decode_frame(_encode_frame({
+        'frame_id': 13, 'hands': hands, 'multi_hands': [hands, second], 'face': None
+    })[1:])
+    assert len(both['multi_hands']) == 2
+    assert np.allclose(both['hands'], hands, atol=1e-6)
+    assert np.allclose(both['multi_hands'][1], second, atol=1e-6)
+
+    empty = _decode_frame(_encode_frame({'frame_id': None, 'hands': None, 'face': None})[1:])
+    assert empty == {
+        'frame_id': None, 'hands': None, 'multi_hands': [], 'face': None, 'shoulders': None,
+        'timings': {}
+    }
@@ -0,0 +1,40 @@
+import threading
+import time
+from profiler import SamplingProfiler, ProfilerBusy
+
+
+def _busy_worker(stop_event):
+    while not stop_event.is_set():
+        time.sleep(0.001)
+
+
+def test_samples_named_threads_as_collapsed_stacks():
+    stop_event = threading.Event()
+    worker = threading.Thread(target=_busy_worker, args=(stop_event,), name='mp-hands')
+    worker.start()
+    try:
+        profiler = SamplingProfiler()
+        stacks, samples = profiler.sample(seconds=0.2, hz=100)
+    finally:
+        stop_event.set()
+        worker.join()
+
+    assert samples > 5
+    text = profiler.render(stacks)
+    line = next(line for line in text.splitlines() if line.startswith('mp-hands;'))
+    stack, count = line.rsplit(' ', 1)
+    assert stack.endswith('_busy_worker (test_profiler.py)') and int(count) > 0
+
+
+def test_only_one_capture_at_a_time():
+    profiler = SamplingProfiler()
+    runner = threading.Thread(target=profiler.sample, args=(0.3, 50))
+    runner.start()
+    time.sleep(0.05)
+    try:
+        profiler.sample(0.1)
+        assert False, "phải báo bận"
+    except ProfilerBusy:
+        pass
+    runner.join()
+    assert profiler.captures == 1
@@ -0,0 +1,52 @@
+from quality import QualityController, level_for_cadence
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_steps_down_when_over_budget_and_back_up_when_idle():
+    clock = FakeClock()
+    controller = QualityController(target_fps=30.0, hold_frames=5, clock=clock)
+    assert controller.level['name'] == 'medium'
+
+    changed = [controller.observe({'total': 0.060}) for _ in range(5)]
+    assert changed[:4] == [None] * 4
+    assert changed[4]['name'] == 'low'
+    assert controller.changes == 1 and controller.rebuilds == 1
+
+    # Latency thấp phải giữ gấp đôi số frame mới tăng mức
+    clock.now = 10.0
+    results = [controller.observe({'total': 0.005}) for _ in range(60)]
+    upgraded = [level for level in results if level is not None]
+    assert upgraded and upgraded[0]['name'] == 'medium'
+
+
+def test_graph_rebuilds_are_rate_limited():
+    clock = FakeClock()
+    controller = QualityController(target_fps=30.0, hold_frames=1, ewma_alpha=1.0,
+                                   min_rebuild_interval=5.0, clock=clock)
+    assert controller.observe({'total': 0.1})['name'] == 'low'
+
+    # Lên lại 'medium' cần rebuild, nhưng chưa đủ 5 giây
+    for _ in range(4):
+        controller.observe({'total': 0.0})
+    assert controller.level['name'] == 'low'
+    # 4 frame bị chặn cho cùng 1 lần đổi mức: đếm 1 lần
+    assert controller.deferred == 1
+
+    clock.now = 6.0
+    controller.observe({'total': 0.0})
+    controller.observe({'total': 0.0})
+    assert controller.level['name'] == 'medium'
+    assert controller.rebuilds == 2
+
+
+def test_start_level_from_cadence():
+    assert level_for_cadence({'face_mesh': 2, 'pose': 3}) == 'medium'
+    assert level_for_cadence({'face_mesh': 1, 'pose': 2}) == 'high'
+    assert level_for_cadence({'face_mesh': 5, 'pose': 5}) is None
@@ -0,0 +1,146 @@
+import numpy as np
+from recording import LandmarkRecorder, LandmarkRecording, FACE_INDICES
+from replay import replay
+
+
+def _pinch_hand():
+    hand = np.full((21, 3), 0.5, dtype=np.float32)
+    hand[:, 2] = 0.0
+    hand[4, 0] += 0.01   # thumb tip sát index tip (8)
+    return hand
+
+
+def _write_session(path):
+    recorder = LandmarkRecorder(path)
+    frame_id = 0
+    # 5 frame pinch, 1 frame thả tay, rồi 10 giây không có tay (idle timeout 8s)
+    for i in range(5):
+        perceived = {'frame_id': frame_id, 'hands': _pinch_hand(), 'face': None}
+        recorder.write(perceived, 100.0 + i / 30)
+        frame_id += 1
+    # Thả tay: System giữ landmarks tay cuối cùng cho gesture detector
+    open_hand = _pinch_hand()
+    open_hand[4, 0] -= 0.2
+    recorder.write({'frame_id': frame_id, 'hands': open_hand, 'face': None}, 100.2)
+    frame_id += 1
+    for i in range(10):
+        perceived = {'frame_id': frame_id, 'hands': None, 'face': None, 'shoulders': None}
+        recorder.write(perceived, 101.0 + i)
+        frame_id += 1
+    recorder.close()
+    return frame_id
+
+
+def test_recording_round_trip_and_truncated_tail(tmp_path):
+    path = tmp_path / 'session.tlrec'
+    frames = _write_session(path)
+    recording = LandmarkRecording(path)
+    assert len(recording) == frames
+    first = recording.perceived(0)
+    assert first['frame_id'] == 0 and first['timestamp'] == 100.0
+    assert np.allclose(first['hands'], _pinch_hand()) and first['face'] is None
+    assert recording.perceived(frames - 1)['hands'] is None
+
+    # Crash giữa lúc ghi: record cuối bị cắt dở được bỏ qua
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 7)
+    assert len(LandmarkRecording(path)) == frames
+
+
+def test_face_without_usable_landmarks_does_not_reuse_previous_frame(tmp_path):
+    path = tmp_path / 'face.tlrec'
+    recorder = LandmarkRecorder(path)
+    landmarks = np.full((len(FACE_INDICES), 3), 0.5, dtype=np.float32)
+    for frame_id, face_landmarks in enumerate((landmarks, landmarks[:2], None)):
+        face = {'landmarks': face_landmarks, 'neck_anchor': (0.5, 0.7),
+                'rotation': 0.1 * frame_id, 'face_scale': 0.3}
+        recorder.write({'frame_id': frame_id, 'hands': None, 'face': face}, 10.0 + frame_id)
+    recorder.close()
+
+    recording = LandmarkRecording(path)
+    assert np.allclose(recording.perceived(0)['face']['landmarks'], 0.5)
+    for index in (1, 2):
+        face = recording.perceived(index)['face']
+        assert np.all(face['landmarks'] == 0.0)
+        assert np.isclose(face['rotation'], 0.1 * index)
+
+
+def test_replay_is_deterministic_and_follows_capture_timestamps(tmp_path):
+    path = tmp_path / 'session.tlrec'
+    _write_session(path)
+    recording = LandmarkRecording(path)
+
+    result = replay(recording)
+    kinds = [(kind, value) for _, _, kind, value, _ in result['events']]
+    assert kinds == [
+        ('GESTURE', 'PINCH'),
+        ('STATE_CHANGE', 'BROWSE_ITEM'),
+        ('STATE_CHANGE', 'IDLE'),
+    ]
+    # PINCH sau 3 frame hysteresis; timeout theo timestamp capture
+    assert result['events'][0][0] == 2
+    assert result['events'][2][1] > 100.0 + 8.0
+    assert replay(recording)['events'] == result['events']
+
+
+def test_eight_hour_session_replays_on_simulated_clock(tmp_path):
+    path = tmp_path / 'kiosk.tlrec'
+    recorder = LandmarkRecorder(path)
+    start = 1_700_000_000.0
+    frame_id = 0
+    visitors = 16
+    for visitor in range(visitors):
+        t0 = start + visitor * 1800.0
+        hand = _pinch_hand()
+        hand[:, 0] += 0.3 * (visitor % 2)   # Mỗi khách đứng 1 chỗ khác
+        open_hand = hand.copy()
+        open_hand[4, 0] -= 0.2
+        for i in range(6):
+            recorder.write({'frame_id': frame_id, 'hands': hand if i < 5 else open_hand,
+                            'face': None}, t0 + i / 10)
+            frame_id += 1
+        # Không có ai: 1 frame mỗi 3 giây đến khách tiếp theo
+        for second in range(3, 1800, 3):
+            recorder.write({'frame_id': frame_id, 'hands': None, 'face': None}, t0 + second)
+            frame_id += 1
+    recorder.close()
+
+    recording = LandmarkRecording(path)
+    result = replay(recording)
+    events = result['events']
+    assert len(events) == 3 * visitors
+    for visitor in range(visitors):
+        t0 = start + visitor * 1800.0
+        (_, pinch_ts, _, pinch, _), (_, _, _, browse, _), (_, idle_ts, _, idle, _) = \
+            events[3 * visitor:3 * visitor + 3]
+        assert (pinch, browse, idle) == ('PINCH', 'BROWSE_ITEM', 'IDLE')
+        assert abs(pinch_ts - (t0 + 0.2)) < 1e-6
+        # Timeout 8s tính theo clock giả lập, không theo wall time
+        assert idle_ts == t0 + 9
+    assert replay(recording)['events'] == events
+
+
+def test_two_hands_keep_track_ids_and_tag_gestures(tmp_path):
+    path = tmp_path / 'wall.tlrec'
+    recorder = LandmarkRecorder(path)
+    open_hand = _pinch_hand()
+    open_hand[:, 0] -= 0.3
+    open_hand[4, 0] -= 0.2
+    pinch = _pinch_hand()
+    pinch[:, 0] += 0.3
+    for i in range(6):
+        # Thứ tự tay từ MediaPipe đổi mỗi frame
+        hands = [open_hand, pinch] if i % 2 else [pinch, open_hand]
+        recorder.write({'frame_id': i, 'hands': hands[0], 'multi_hands': hands, 'face': None},
+                       100.0 + i / 30)
+    recorder.close()
+
+    recording = LandmarkRecording(path)
+    assert len(recording.perceived(0)['multi_hands']) == 2
+    result = replay(recording, max_tracks=2)
+    assert result['cursor_moves'] == 12
+    gestures = [event for event in result['events'] if event[2] == 'GESTURE']
+    # Tay pinch xuất hiện đầu tiên ở frame 0 -> track 1; tay kia mọi đầu ngón trùng
+    # cổ tay = tư thế FIST, hợp lệ sau khi pinch đưa state ra khỏi IDLE
+    assert gestures == [(2, 100.0 + 2 / 30, 'GESTURE', 'PINCH', 1),
+                        (2, 100.0 + 2 / 30, 'GESTURE', 'FIST', 2)]
@@ -0,0 +1,70 @@
+import asyncio
+import time
+import numpy as np
+from camera import Frame, open_source
+from main import System, SCHEDULE_LATEST
+from state import SystemState
+
+
+def test_latest_schedule_processes_newest_frame_and_records_lag():
+    system = System(source=open_source('synthetic:160x120'), schedule=SCHEDULE_LATEST)
+    processed, emitted = [], []
+
+    def slow_logic(frame):
+        # Perception giả: worker bận 50ms mỗi frame
+        processed.append(frame.frame_id)
+        time.sleep(0.05)
+        return {'frame_id': frame.frame_id}
+
+    async def record(results):
+        emitted.append(results['frame_id'])
+
+    system._sync_logic = slow_logic
+    system._emit_results = record
+
+    async def scenario():
+        system.running = True
+        system.frame_event = asyncio.Event()
+        worker = asyncio.create_task(system.perception_worker())
+        image = np.zeros((120, 160, 3), dtype=np.uint8)
+        for frame_id in range(1, 6):
+            # Đến 100ms trước khi tới worker: input lag >= 0.1s
+            # (timestamp là media time như nguồn PACING_FAST, không dùng để đo lag)
+            system.current_frame = Frame(image.copy(), frame_id, frame_id / 30,
+                                         arrival=time.time() - 0.1)
+            system.frame_event.set()
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.2)
+        system.running = False
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        system.executor.shutdown(wait=True)
+        system.perception.release()
+        system.camera.release()
+
+    # Frame 1 bắt đầu ngay; 2..4 bị frame mới hơn thay trong lúc worker bận
+    assert processed == emitted == [1, 5]
+    assert system.frame_count == 2 and system.dropped_frames == 3
+    assert system.frame_age_count == 2 and 0.1 <= system.frame_age_last < 1.0
+    assert system.metrics.stages['input_lag'].count == 2
+
+
+def test_idle_timeout_is_checked_with_the_frame_on_the_perception_thread():
+    system = System(source=open_source('synthetic:160x120'))
+    try:
+        image = np.zeros((120, 160, 3), dtype=np.uint8)
+        system.state_machine.transition_to(SystemState.BROWSE_ITEM, 100.0)
+        results = system._process_frame(Frame(image, 1, 105.0))
+        assert 'new_state' not in results
+        # Hết idle_timeout (8s) theo timestamp capture: IDLE đi kèm FRAME_UPDATE của frame
+        results = system._process_frame(Frame(image.copy(), 2, 108.5))
+        assert results['new_state'] == SystemState.IDLE.value
+        assert system.pipeline.state_machine.get_state() == SystemState.IDLE
+    finally:
+        system.executor.shutdown(wait=True)
+        system.perception.release()
+        system.camera.release()
@@ -0,0 +1,33 @@
+from clock import SimulatedClock
+from state import StateMachine, SystemState
+
+
+def test_transitions_and_timeout_follow_capture_timestamps():
+    machine = StateMachine(idle_timeout=8.0)
+    assert machine.handle_gesture('PINCH', now=100.0) == (True, True)
+    assert machine.get_state() == SystemState.BROWSE_ITEM
+    assert machine.transition_history[-1]['time'] == 100.0
+
+    # Cooldown tính theo timestamp capture, không theo đồng hồ hệ thống
+    machine.handle_gesture('PINCH', now=101.0)
+    assert machine.get_state() == SystemState.BROWSE_ITEM
+    machine.handle_gesture('PINCH', now=102.0)
+    assert machine.get_state() == SystemState.TRY_ON
+
+    assert not machine.check_timeout(now=109.0)
+    assert machine.check_timeout(now=110.5)
+    assert machine.get_state() == SystemState.IDLE
+
+
+def test_state_machine_reads_injected_clock():
+    clock = SimulatedClock(start=50.0)
+    machine = StateMachine(idle_timeout=8.0, clock=clock)
+    assert machine.handle_gesture('PINCH') == (True, True)
+    assert machine.transition_history[-1]['time'] == 50.0
+
+    clock.advance(8.0)
+    assert not machine.check_timeout()
+    clock.advance_to(58.5)
+    clock.advance_to(10.0)   # Không lùi
+    assert machine.check_timeout()
+    assert machine.get_state() == SystemState.IDLE
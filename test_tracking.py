@@ -0,0 +1,82 @@
+import itertools
+import numpy as np
+from clock import SimulatedClock
+from pipeline import InteractionPipeline
+from tracking import HandTracker, linear_assignment
+
+
+def test_linear_assignment_is_optimal():
+    rng = np.random.default_rng(0)
+    for rows, cols in ((3, 3), (2, 4), (4, 2), (5, 5)):
+        cost = rng.random((rows, cols))
+        assignment = linear_assignment(cost)
+        total = sum(cost[row, col] for row, col in enumerate(assignment) if col >= 0)
+        small = cost if rows <= cols else cost.T
+        best = min(
+            sum(small[row, col] for row, col in enumerate(columns))
+            for columns in itertools.permutations(range(small.shape[1]), small.shape[0])
+        )
+        assert np.isclose(total, best)
+        assert sum(col >= 0 for col in assignment) == min(rows, cols)
+
+
+def test_track_ids_stable_when_detection_order_changes():
+    tracker = HandTracker(max_tracks=3, max_distance=0.2, max_missed=2)
+    left, right = np.array([0.2, 0.5]), np.array([0.8, 0.5])
+    slots, started, _ = tracker.update([left, right])
+    ids = dict(zip(('left', 'right'), tracker.track_ids[slots]))
+    assert len(started) == 2 and ids['left'] != ids['right']
+
+    # MediaPipe trả tay theo thứ tự bất kỳ; 2 tay di chuyển dần
+    for step in range(1, 20):
+        left = left + [0.01, 0.0]
+        right = right - [0.01, 0.0]
+        order = [right, left] if step % 2 else [left, right]
+        slots, started, ended = tracker.update(order)
+        got = tracker.track_ids[slots]
+        expected = [ids['right'], ids['left']] if step % 2 else [ids['left'], ids['right']]
+        assert list(got) == expected and not started and not ended
+
+
+def test_track_survives_short_gaps_then_ends():
+    tracker = HandTracker(max_tracks=2, max_distance=0.2, max_missed=2)
+    slots, _, _ = tracker.update([[0.5, 0.5]])
+    first_id = tracker.track_ids[slots[0]]
+    tracker.update([])
+    tracker.update([])
+    slots, started, _ = tracker.update([[0.52, 0.5]])
+    assert tracker.track_ids[slots[0]] == first_id and not started
+
+    for _ in range(3):
+        _, _, ended = tracker.update([])
+    assert ended == [int(slots[0])]
+    slots, started, _ = tracker.update([[0.5, 0.5]])
+    assert started and tracker.track_ids[slots[0]] != first_id
+
+    # Hết slot: tay thừa không có track
+    slots, _, _ = tracker.update([[0.5, 0.5], [0.1, 0.1], [0.9, 0.9]])
+    assert (slots >= 0).sum() == 2
+
+
+def test_fast_single_hand_keeps_its_track():
+    # 1 slot: tay đi > max_distance mỗi frame vẫn là cùng track, luôn có cursor
+    pipeline = InteractionPipeline(clock=SimulatedClock(100.0), max_tracks=1)
+    track_ids = set()
+    for i, x in enumerate([0.2, 0.45, 0.7, 0.45, 0.2, 0.45, 0.7]):
+        hand = np.full((21, 3), 0.5)
+        hand[:, 0] = x
+        results = pipeline.step([hand], None, timestamp=100.0 + i / 30)
+        assert len(results['cursors']) == 1
+        track_ids.add(results['cursors'][0][0])
+    assert len(track_ids) == 1
+
+
+def test_stale_track_gives_up_its_slot_when_slots_are_full():
+    tracker = HandTracker(max_tracks=2, max_distance=0.2, max_missed=5)
+    tracker.update([[0.2, 0.5], [0.8, 0.5]])
+    first_ids = list(tracker.track_ids)
+    # Tay trái nhảy xa khỏi gate: track trái mất, tay mới lấy slot đó thay vì không có slot
+    slots, started, ended = tracker.update([[0.55, 0.5], [0.8, 0.5]])
+    assert (slots >= 0).all() and started == ended == [int(slots[0])]
+    assert tracker.track_ids[slots[1]] == first_ids[1]
+    assert tracker.track_ids[slots[0]] not in first_ids
@@ -0,0 +1,111 @@
+import math
+import numpy as np
+from recording import LandmarkRecorder, LandmarkRecording
+from trajectory import (
+    TemplateLibrary, TrajectoryRecognizer, default_templates, dtw_distance,
+    extract_trajectory
+)
+
+
+def _full_dtw(a, b, window):
+    n, m = len(a), len(b)
+    cost = np.full((n + 1, m + 1), np.inf)
+    cost[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(max(1, i - window), min(m, i + window) + 1):
+            cost[i, j] = ((a[i - 1] - b[j - 1]) ** 2).sum() + min(
+                cost[i - 1, j - 1], cost[i - 1, j], cost[i, j - 1])
+    return cost[n, m]
+
+
+def _stream(recognizer, path, t0=0.0, fps=30.0):
+    """Đưa từng điểm vào recognizer như pipeline; list (thứ tự mẫu, gesture)"""
+    emitted = []
+    for i, (x, y) in enumerate(path):
+        t = t0 + i / fps
+        recognizer.update(x, y, t)
+        gesture = recognizer.process(t)
+        if gesture:
+            emitted.append((i, gesture))
+    return emitted
+
+
+def test_pruned_match_equals_exhaustive_search():
+    library = default_templates()
+    rng = np.random.default_rng(0)
+    queries, best = [], []
+    for _ in range(30):
+        query = library.prepare(np.cumsum(rng.standard_normal((40, 2)), axis=0))
+        exhaustive = [_full_dtw(query, path, library.window) for path in library.paths]
+        # LB_Keogh không bao giờ vượt DTW
+        assert np.all(library.lower_bounds(query).sum(axis=1) <= np.array(exhaustive) + 1e-9)
+        _, index, distance = library.match(query[None])
+        assert np.isclose(distance, min(exhaustive))
+        assert np.isclose(exhaustive[index], min(exhaustive))
+        # Với ngưỡng nhỏ hơn kết quả tốt nhất: không có match, DTW bỏ ngang
+        assert library.match(query[None], best=min(exhaustive) * 0.99) is None
+        queries.append(query)
+        best.append(min(exhaustive))
+
+    # Nhiều query 1 lượt: cặp tốt nhất trên mọi query
+    query_index, _, distance = library.match(np.stack(queries))
+    assert np.isclose(distance, min(best)) and query_index == int(np.argmin(best))
+
+    query = [tuple(point) for point in library.paths[0].tolist()]
+    template = [tuple(point) for point in library.paths[5].tolist()]
+    full = _full_dtw(library.paths[0], library.paths[5], library.window)
+    assert np.isclose(dtw_distance(query, template, library.window), full)
+    assert dtw_distance(query, template, library.window, best=full * 0.5) == math.inf
+
+
+def test_recognizer_spots_gestures_in_cursor_stream():
+    rng = np.random.default_rng(1)
+    t = np.linspace(0.0, 1.0, 30)
+    still = np.tile([0.5, 0.5], (20, 1))
+    circle = np.column_stack((0.5 + 0.1 * np.sin(2 * np.pi * t), 0.4 + 0.1 * np.cos(2 * np.pi * t)))
+    wave = np.column_stack((0.5 - 0.1 * np.cos(3 * np.pi * t), 0.5 + 0.02 * np.sin(6 * np.pi * t)))
+    check = np.concatenate([np.linspace([0.4, 0.4], [0.45, 0.46], 8)[:-1],
+                            np.linspace([0.45, 0.46], [0.6, 0.25], 14)])
+
+    for path, expected in ((circle, 'CIRCLE'), (wave, 'WAVE'), (check, 'CHECK')):
+        recognizer = TrajectoryRecognizer()
+        noisy = path + 0.002 * rng.standard_normal(path.shape)
+        emitted = _stream(recognizer, np.concatenate([still, noisy, np.tile(path[-1], (20, 1))]))
+        # Đúng 1 lần, khi tay dừng sau đường đi
+        assert [gesture for _, gesture in emitted] == [expected]
+        assert len(still) + len(path) <= emitted[0][0] < len(still) + len(path) + 10
+
+    # Chuyển động ngẫu nhiên, đứng yên, swipe: không có gesture
+    recognizer = TrajectoryRecognizer()
+    walk = 0.5 + np.cumsum(0.01 * rng.standard_normal((300, 2)), axis=0)
+    swipe = np.column_stack((np.linspace(0.2, 0.8, 20), np.full(20, 0.5)))
+    assert _stream(recognizer, np.concatenate([still, walk, swipe])) == []
+
+
+def test_template_from_recording_roundtrip(tmp_path):
+    path = tmp_path / 'triangle.tlrec'
+    recorder = LandmarkRecorder(path)
+    corners = np.array([[0.4, 0.6], [0.5, 0.4], [0.6, 0.6], [0.4, 0.6]])
+    tips = np.concatenate([np.linspace(a, b, 10, endpoint=False) for a, b in zip(corners, corners[1:])])
+    for i, tip in enumerate(tips):
+        hand = np.zeros((21, 3))
+        hand[:, :2] = tip
+        recorder.write({'frame_id': i + 100, 'hands': hand, 'face': None}, 50.0 + i / 30)
+    recorder.close()
+
+    trajectory = extract_trajectory(LandmarkRecording(path), 100, 130)
+    assert trajectory.shape == (30, 2)
+    library = TemplateLibrary()
+    library.add('TRIANGLE', trajectory)
+    library.save(tmp_path / 'templates')
+    loaded = TemplateLibrary.load(tmp_path / 'templates')
+    assert loaded.names == ['TRIANGLE']
+    assert np.allclose(loaded.paths, library.paths)
+    assert np.allclose(loaded.lower, library.lower)
+
+    # Vẽ lại (to hơn, lệch chỗ) rồi dừng tay: khớp
+    redrawn = tips * 1.2 + 0.05
+    recognizer = TrajectoryRecognizer(loaded)
+    emitted = _stream(recognizer, np.concatenate([np.tile(redrawn[0], (10, 1)), redrawn,
+                                                  np.tile(redrawn[-1], (10, 1))]))
+    assert [gesture for _, gesture in emitted] == ['TRIANGLE']
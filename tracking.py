@@ -0,0 +1,174 @@
+"""
+Hand Tracking - gán track id ổn định cho nhiều tay qua các frame
+Mỗi frame ghép detection với track theo khoảng cách tâm bàn tay (assignment tối ưu)
+Trạng thái track nằm trong array theo slot (cấp phát 1 lần, tối đa max_tracks)
+Không biết MediaPipe, không biết gesture
+"""
+import numpy as np
+
+
+# Tâm bàn tay: cổ tay (0) và gốc ngón giữa (9)
+PALM_INDICES = (0, 9)
+
+
+def linear_assignment(cost):
+    """
+    Hungarian (Kuhn-Munkres) cho ma trận chi phí (N, M), O(N^2 M)
+    Returns:
+        list: cột được gán cho mỗi hàng (-1 nếu hàng không được gán khi N > M)
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    rows, cols = cost.shape
+    if rows == 0 or cols == 0:
+        return [-1] * rows
+    if rows > cols:
+        assignment = [-1] * rows
+        for col, row in enumerate(linear_assignment(cost.T)):
+            assignment[row] = col
+        return assignment
+
+    # Potential u (hàng), v (cột); p[j] = hàng đang giữ cột j (1-indexed, 0 = trống)
+    cost = cost.tolist()
+    inf = float('inf')
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (cols + 1)
+    p = [0] * (cols + 1)
+    way = [0] * (cols + 1)
+    for row in range(1, rows + 1):
+        p[0] = row
+        col0 = 0
+        min_value = [inf] * (cols + 1)
+        used = [False] * (cols + 1)
+        while True:
+            used[col0] = True
+            row0 = p[col0]
+            delta = inf
+            col1 = 0
+            row_cost = cost[row0 - 1]
+            for col in range(1, cols + 1):
+                if not used[col]:
+                    current = row_cost[col - 1] - u[row0] - v[col]
+                    if current < min_value[col]:
+                        min_value[col] = current
+                        way[col] = col0
+                    if min_value[col] < delta:
+                        delta = min_value[col]
+                        col1 = col
+            for col in range(cols + 1):
+                if used[col]:
+                    u[p[col]] += delta
+                    v[col] -= delta
+                else:
+                    min_value[col] -= delta
+            col0 = col1
+            if p[col0] == 0:
+                break
+        # Đảo đường tăng
+        while col0:
+            col1 = way[col0]
+            p[col0] = p[col1]
+            col0 = col1
+
+    assignment = [-1] * rows
+    for col in range(1, cols + 1):
+        if p[col]:
+            assignment[p[col] - 1] = col - 1
+    return assignment
+
+
+def palm_centers(hands):
+    """
+    Args:
+        hands: list np.array (21, 3)
+    Returns:
+        np.array (N, 2) tâm bàn tay (x, y normalized)
+    """
+    if not hands:
+        return np.zeros((0, 2))
+    return np.stack([hand[PALM_INDICES, :2] for hand in hands]).mean(axis=1)
+
+
+class HandTracker:
+    def __init__(self, max_tracks=4, max_distance=0.2, max_missed=5):
+        """
+        Args:
+            max_tracks: số track tối đa (= số slot)
+            max_distance: khoảng cách tâm (normalized) lớn nhất để ghép vào track cũ
+                (max_tracks=1: không giới hạn, tay duy nhất luôn nối vào track đang có)
+            max_missed: số frame liên tiếp không thấy trước khi bỏ track
+        """
+        self.max_tracks = max_tracks
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.track_ids = np.full(max_tracks, -1, dtype=np.int64)  # -1 = slot trống
+        self.centers = np.zeros((max_tracks, 2))
+        self.missed = np.zeros(max_tracks, dtype=np.int64)
+        self.next_id = 1
+
+    def active_slots(self):
+        return np.flatnonzero(self.track_ids >= 0)
+
+    def update(self, centers):
+        """
+        Ghép detection của frame hiện tại với các track
+        Args:
+            centers: np.array (N, 2) tâm từng tay (xem palm_centers)
+        Returns:
+            tuple: (slots, started, ended)
+                slots: np.array (N,) slot của từng detection (-1 nếu hết slot)
+                started: list slot vừa mở track mới (cần reset trạng thái slot)
+                ended: list slot vừa mất track (kể cả slot bị track mới lấy lại)
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        slots = np.full(len(centers), -1, dtype=np.int64)
+        active = self.active_slots()
+        matched = np.zeros(self.max_tracks, dtype=bool)
+
+        if len(active) and len(centers):
+            distance = np.linalg.norm(centers[:, None, :] - self.centers[active][None], axis=2)
+            # Cặp xa hơn ngưỡng không được ghép; chặn trên để không làm lệch assignment
+            gated = np.minimum(distance, 2.0 * self.max_distance)
+            # 1 slot: không có track khác để nhầm, tay di chuyển nhanh vẫn giữ track
+            max_distance = np.inf if self.max_tracks == 1 else self.max_distance
+            for detection, column in enumerate(linear_assignment(gated)):
+                if column >= 0 and distance[detection, column] <= max_distance:
+                    slots[detection] = active[column]
+                    matched[active[column]] = True
+
+        # Detection chưa ghép: mở track mới ở slot trống, hết slot trống thì lấy slot
+        # của track không thấy ở frame này (mất lâu nhất, rồi track cũ nhất trước)
+        started = []
+        ended = []
+        free = list(np.flatnonzero(self.track_ids < 0))
+        stale = sorted((slot for slot in active if not matched[slot]),
+                       key=lambda slot: (-self.missed[slot], self.track_ids[slot]))
+        for detection in np.flatnonzero(slots < 0):
+            if free:
+                slot = free.pop(0)
+            elif stale:
+                slot = stale.pop(0)
+                ended.append(int(slot))
+            else:
+                break
+            self.track_ids[slot] = self.next_id
+            self.next_id += 1
+            slots[detection] = slot
+            matched[slot] = True
+            started.append(int(slot))
+
+        assigned = slots >= 0
+        self.centers[slots[assigned]] = centers[assigned]
+        self.missed[matched] = 0
+
+        # Track không thấy ở frame này
+        for slot in active:
+            if not matched[slot]:
+                self.missed[slot] += 1
+                if self.missed[slot] > self.max_missed:
+                    self.track_ids[slot] = -1
+                    ended.append(int(slot))
+        return slots, started, ended
+
+    def reset(self):
+        self.track_ids[:] = -1
+        self.missed[:] = 0
@@ -0,0 +1,421 @@
+"""
+Trajectory Gesture Layer - gesture theo quỹ đạo (CIRCLE, WAVE, CHECK)
+So đường đi của cursor trong vài giây gần nhất với thư viện template
+
+Đường đi được resample đều theo độ dài cung và chuẩn hoá (tâm, kích thước), rồi so
+bằng DTW (dynamic time warping, band Sakoe-Chiba). Mỗi frame:
+- LB_Keogh của query với envelope mọi template tính trong 1 lượt numpy
+- template được thử theo thứ tự lower bound tăng dần, dừng khi lower bound >= kết quả tốt nhất
+- DTW bỏ ngang (early abandon) khi cả 1 hàng đã vượt kết quả tốt nhất
+Kết quả tốt nhất khởi đầu = ngưỡng nhận dạng, nên chuyển động thường bị loại gần như
+hoàn toàn ở bước lower bound
+
+Template ghi từ recording (xem replay.py --events để tìm frame):
+    python trajectory.py templates.npz --add CIRCLE --recording session.tlrec --frames 120 160
+"""
+import argparse
+import math
+import numpy as np
+from clock import SimulatedClock
+from normalize import Normalizer
+from recording import LandmarkRecording
+
+
+# Tên gesture (event GESTURE) mà state machine / frontend biết
+TRAJECTORY_GESTURES = ('CIRCLE', 'WAVE', 'CHECK')
+
+RESAMPLE_POINTS = 32   # Số điểm mỗi đường đi sau resample
+WARPING_WINDOW = 3     # Bán kính band Sakoe-Chiba (số điểm)
+MATCH_DISTANCE = 0.025 # DTW trung bình mỗi điểm (đường đi chuẩn hoá về khung 1x1)
+MIN_EXTENT = 0.08      # Đường đi nhỏ hơn (normalized) là rung tay, không so
+MIN_DURATION = 0.4     # Giây chuyển động tối thiểu (1 đoạn cung ngắn giống mọi template)
+# Các độ dài cửa sổ (giây) kết thúc ở frame hiện tại được thử mỗi frame
+WINDOW_DURATIONS = (0.6, 0.9, 1.2, 1.5)
+
+
+def resample(points, count=RESAMPLE_POINTS):
+    """
+    Resample đường đi thành `count` điểm cách đều theo độ dài cung
+    Args:
+        points: np.array (K, 2)
+    Returns:
+        np.array (count, 2) hoặc None nếu đường đi có độ dài 0
+    """
+    points = np.asarray(points, dtype=np.float64)
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    arc = np.concatenate(([0.0], np.cumsum(steps)))
+    if len(points) < 2 or arc[-1] <= 0.0:
+        return None
+    targets = np.linspace(0.0, arc[-1], count)
+    return np.column_stack((np.interp(targets, arc, points[:, 0]),
+                            np.interp(targets, arc, points[:, 1])))
+
+
+def normalize_path(points):
+    """
+    Dời tâm về gốc, scale đều để cạnh dài nhất của bounding box = 1
+    Args:
+        points: np.array (..., K, 2) - 1 hoặc nhiều đường đi
+    """
+    points = points - points.mean(axis=-2, keepdims=True)
+    extent = np.ptp(points, axis=-2).max(axis=-1)
+    return points / np.where(extent > 0, extent, 1.0)[..., None, None]
+
+
+def dtw_distance(query, template, window=WARPING_WINDOW, best=math.inf, remaining=None):
+    """
+    DTW (bình phương khoảng cách Euclid) trong band |i - j| <= window
+    Args:
+        query, template: list (x, y)
+        best: bỏ ngang khi mọi ô của 1 hàng + lower bound phần còn lại >= best
+        remaining: list, remaining[i] = lower bound chi phí các điểm query sau điểm i
+            (LB_Keogh cộng dồn từ cuối; None = 0)
+    Returns:
+        float: tổng chi phí đường warp tốt nhất (inf nếu bị bỏ ngang)
+    """
+    n = len(query)
+    m = len(template)
+    window = max(window, abs(n - m))
+    inf = math.inf
+    previous = [inf] * (m + 1)
+    previous[0] = 0.0
+    for i in range(1, n + 1):
+        qx, qy = query[i - 1]
+        current = [inf] * (m + 1)
+        row_min = inf
+        for j in range(max(1, i - window), min(m, i + window) + 1):
+            tx, ty = template[j - 1]
+            dx = qx - tx
+            dy = qy - ty
+            cell = previous[j - 1]
+            if previous[j] < cell:
+                cell = previous[j]
+            if current[j - 1] < cell:
+                cell = current[j - 1]
+            cell += dx * dx + dy * dy
+            current[j] = cell
+            if cell < row_min:
+                row_min = cell
+        if remaining is not None:
+            row_min += remaining[i - 1]
+        if row_min >= best:
+            return inf
+        previous = current
+    return previous[m]
+
+
+class TemplateLibrary:
+    """
+    Template quỹ đạo đã resample + chuẩn hoá, kèm envelope cho LB_Keogh
+    paths / lower / upper: np.array (T, RESAMPLE_POINTS, 2)
+    """
+    def __init__(self, points=RESAMPLE_POINTS, window=WARPING_WINDOW):
+        self.points = points
+        self.window = window
+        self.names = []
+        self.paths = np.zeros((0, points, 2))
+        self.lower = self.paths
+        self.upper = self.paths
+        self._path_lists = []
+        # Đếm phục vụ benchmark
+        self.dtw_calls = 0
+        self.abandoned = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def prepare(self, trajectory):
+        """Đường đi thô (K, 2) -> query (points, 2) hoặc None"""
+        path = resample(trajectory, self.points)
+        return None if path is None else normalize_path(path)
+
+    def add(self, name, trajectory):
+        """Thêm template từ đường đi thô (K, 2) (vd. cursor normalized của 1 đoạn recording)"""
+        path = self.prepare(trajectory)
+        if path is None:
+            raise ValueError(f"Template {name}: đường đi có độ dài 0")
+        self._append(name, path)
+
+    def _append(self, name, path):
+        self.names.append(name)
+        self.paths = np.concatenate((self.paths, path[None]))
+        self._path_lists.append([tuple(point) for point in path.tolist()])
+        # Envelope: min / max của template trong band quanh mỗi điểm
+        windows = np.lib.stride_tricks.sliding_window_view(
+            np.pad(self.paths, ((0, 0), (self.window, self.window), (0, 0)), mode='edge'),
+            2 * self.window + 1, axis=1)
+        self.lower = windows.min(axis=3)
+        self.upper = windows.max(axis=3)
+
+    def lower_bounds(self, query):
+        """
+        LB_Keogh của query với mọi template
+        Args:
+            query: np.array (..., points, 2)
+        Returns:
+            np.array (..., T, points): phần của từng điểm query; tổng <= DTW tương ứng
+        """
+        excess = np.maximum(query - self.upper, 0.0) + np.maximum(self.lower - query, 0.0)
+        return (excess * excess).sum(axis=-1)
+
+    def match(self, queries, best=math.inf):
+        """
+        Cặp (query, template) gần nhất với DTW < best
+        Lower bound của mọi cặp tính trong 1 lượt; DTW chạy theo lower bound tăng dần
+        Args:
+            queries: np.array (Q, points, 2) từ prepare() / normalize_path()
+            best: chỉ nhận kết quả nhỏ hơn (tổng DTW, không chia số điểm)
+        Returns:
+            tuple: (index query, index template, DTW) hoặc None
+        """
+        if not self.names or not len(queries):
+            return None
+        contributions = self.lower_bounds(queries[:, None])
+        # remaining[..., i] = lower bound các điểm query sau điểm i (early abandon chặt hơn)
+        remaining = np.zeros_like(contributions)
+        remaining[..., :-1] = np.cumsum(contributions[..., :0:-1], axis=-1)[..., ::-1]
+        bounds = (remaining[..., 0] + contributions[..., 0]).ravel()
+        templates = len(self.names)
+        query_lists = {}
+        result = None
+        for pair in np.argsort(bounds).tolist():
+            if bounds[pair] >= best:
+                break
+            query_index, index = divmod(pair, templates)
+            query_list = query_lists.get(query_index)
+            if query_list is None:
+                query_list = query_lists[query_index] = [
+                    tuple(point) for point in queries[query_index].tolist()]
+            self.dtw_calls += 1
+            distance = dtw_distance(query_list, self._path_lists[index], self.window, best,
+                                    remaining[query_index, index].tolist())
+            if distance < best:
+                best = distance
+                result = (query_index, index, distance)
+            elif distance == math.inf:
+                self.abandoned += 1
+        return result
+
+    def save(self, path):
+        # File object: np.savez không tự thêm đuôi .npz
+        with open(path, 'wb') as f:
+            np.savez(f, names=np.array(self.names), paths=self.paths,
+                     window=np.array(self.window))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        paths = data['paths']
+        library = cls(points=paths.shape[1], window=int(data['window']))
+        for name, template in zip(data['names'].tolist(), paths):
+            library._append(name, template)
+        return library
+
+
+def default_templates():
+    """
+    Template tổng hợp cho CIRCLE, WAVE, CHECK (toạ độ ảnh: y hướng xuống)
+    Dùng khi chưa có thư viện ghi từ recording
+    """
+    library = TemplateLibrary()
+    angles = np.linspace(0.0, 2 * np.pi, 48)
+    for start in (0.0, 0.5 * np.pi, np.pi, 1.5 * np.pi):
+        for direction in (1.0, -1.0):
+            theta = start + direction * angles
+            library.add('CIRCLE', np.column_stack((np.cos(theta), np.sin(theta))))
+    for half_waves in (3, 4):
+        t = np.linspace(0.0, half_waves * np.pi, 48)
+        for direction in (1.0, -1.0):
+            library.add('WAVE', np.column_stack((-direction * np.cos(t), 0.3 * np.sin(2 * t))))
+    for ratio in (1.5, 2.5):
+        # Xuống phải ngắn rồi lên phải dài
+        library.add('CHECK', np.array([(0.0, 0.0), (0.4, 0.4), (0.4 + 0.4 * ratio, -0.4 * ratio)]))
+    return library
+
+
+class TrajectoryRecognizer:
+    """
+    Nhận dạng trajectory gesture cho 1 track
+    History là ring (x, y, t) ghi đôi (index i và i + size) để cửa sổ cuối luôn là 1 slice
+    """
+    def __init__(self, library=None, durations=WINDOW_DURATIONS, history_size=64,
+                 max_distance=MATCH_DISTANCE, min_extent=MIN_EXTENT,
+                 min_duration=MIN_DURATION, pause_time=0.2, pause_extent=0.015,
+                 candidate_timeout=0.5, cooldown=0.5):
+        """
+        Args:
+            library: TemplateLibrary (None = default_templates())
+            durations: độ dài các cửa sổ (giây) được thử mỗi frame
+            history_size: số mẫu giữ lại (đủ cho cửa sổ dài nhất ở FPS camera)
+            max_distance: ngưỡng DTW trung bình mỗi điểm
+            min_extent: kích thước tối thiểu của đường đi (normalized)
+            min_duration: thời gian tối thiểu giữa 5% và 95% độ dài đường đi
+            pause_time, pause_extent: tay dừng = di chuyển < pause_extent trong pause_time giây
+            candidate_timeout: giây tay tiếp tục chuyển động trước khi bỏ ứng viên
+            cooldown: giây giữa 2 trajectory gesture
+        """
+        self.library = default_templates() if library is None else library
+        self.durations = np.array(sorted(durations))
+        self.history_size = history_size
+        self.max_distance = max_distance
+        self.min_extent = min_extent
+        self.min_duration = min_duration
+        self.pause_time = pause_time
+        self.pause_extent = pause_extent
+        self.candidate_timeout = candidate_timeout
+        self.cooldown = cooldown
+        self.positions = np.zeros((2 * history_size, 2))
+        self.times = np.zeros(2 * history_size)
+        self.last_gesture_time = None
+        self.reset()
+
+    def update(self, x, y, current_time):
+        """Thêm 1 mẫu cursor (normalized)"""
+        head = self.head
+        size = self.history_size
+        self.positions[head] = self.positions[head + size] = (x, y)
+        self.times[head] = self.times[head + size] = current_time
+        self.head = (head + 1) % size
+        self.count = min(self.count + 1, size)
+
+    def _history(self):
+        """(positions, times) của các mẫu trong history, cũ -> mới (view, không copy)"""
+        end = self.head + self.history_size
+        start = end - self.count
+        return self.positions[start:end], self.times[start:end]
+
+    def _match(self, positions, times, extents, current_time):
+        """
+        Template khớp nhất qua mọi cửa sổ kết thúc ở mẫu mới nhất
+        Độ dài cung tính 1 lần trên history; mọi cửa sổ lọc, resample, so trong 1 lượt
+        Args:
+            extents: np.array (K,) cạnh dài nhất bounding box của đoạn từ mẫu k tới mẫu mới nhất
+        Returns:
+            tuple: (index template, DTW) hoặc None
+        """
+        arc = np.empty(len(positions))
+        arc[0] = 0.0
+        np.cumsum(np.hypot(*np.diff(positions, axis=0).T), out=arc[1:])
+        durations = self.durations
+        starts = np.searchsorted(times, current_time - durations)
+        # Phần đứng yên trong cửa sổ không tính: đo thời gian của phần chuyển động
+        lengths = arc[-1] - arc[starts]
+        first = np.searchsorted(arc, arc[starts] + 0.05 * lengths)
+        last = np.minimum(np.searchsorted(arc, arc[starts] + 0.95 * lengths), len(arc) - 1)
+        moving = times[last] - times[np.maximum(first - 1, starts)]
+        valid = (
+            (times[0] <= current_time - 0.9 * durations)   # History phủ hết cửa sổ
+            & (len(positions) - starts >= 8)
+            & (extents[starts] >= self.min_extent)
+            & (moving >= self.min_duration)
+        )
+        if not valid.any():
+            return None
+
+        library = self.library
+        targets = np.linspace(arc[starts[valid]], arc[-1], library.points, axis=1)
+        queries = normalize_path(np.stack((np.interp(targets, arc, positions[:, 0]),
+                                           np.interp(targets, arc, positions[:, 1])), axis=-1))
+        match = library.match(queries, self.max_distance * library.points)
+        return None if match is None else match[1:]
+
+    def process(self, current_time):
+        """
+        Gesture kết thúc khi tay dừng: trong lúc tay chuyển động, match mới nhất
+        (dưới ngưỡng) là ứng viên - đoạn đầu của CIRCLE có thể giống CHECK, nhưng khi
+        vòng tròn hoàn tất thì CIRCLE thay thế; tay dừng lại thì phát ứng viên
+        Returns:
+            str: tên template hoặc None
+        """
+        if self.count < 8:
+            return None
+        if self.last_gesture_time is not None and \
+                current_time - self.last_gesture_time < self.cooldown:
+            return None
+        positions, times = self._history()
+        # Bounding box của mọi đoạn cuối history (max / min tích luỹ từ mẫu mới nhất)
+        reverse = positions[::-1]
+        extents = (np.maximum.accumulate(reverse) - np.minimum.accumulate(reverse)).max(axis=1)[::-1]
+        # Tay dừng: mọi mẫu trong `pause_time` giây cuối nằm trong ô pause_extent
+        recent = int(np.searchsorted(times, current_time - self.pause_time))
+        paused = recent < len(times) - 1 and extents[recent] < self.pause_extent
+        if paused and self.candidate is None:
+            return None
+
+        match = self._match(positions, times, extents, current_time)
+        if match is not None:
+            self.candidate = match[0]
+            self.candidate_time = current_time
+        elif self.candidate is not None and current_time - self.candidate_time > self.candidate_timeout:
+            # Tay chuyển động tiếp mà không khớp gì nữa: ứng viên là đoạn giữa 1 chuyển động khác
+            self.candidate = None
+        if not paused or self.candidate is None:
+            return None
+
+        result = self.library.names[self.candidate]
+        # Quên đường đi đã dùng, không nhận lại cùng gesture ở frame sau
+        self.count = 0
+        self.candidate = None
+        self.last_gesture_time = current_time
+        return result
+
+    def reset(self):
+        self.head = 0
+        self.count = 0
+        self.candidate = None
+        self.candidate_time = None
+
+
+def extract_trajectory(recording, start_frame, stop_frame, hand=0):
+    """
+    Đường đi cursor (normalized, đã lọc như pipeline) của 1 đoạn recording
+    Args:
+        recording: LandmarkRecording
+        start_frame, stop_frame: frame_id đầu (gồm) / cuối (không gồm)
+        hand: thứ tự tay trong frame
+    Returns:
+        np.array (K, 2)
+    """
+    frame_ids = recording.records['frame_id']
+    indices = np.flatnonzero((frame_ids >= start_frame) & (frame_ids < stop_frame))
+    normalizer = Normalizer(clock=SimulatedClock())
+    points = []
+    for index in indices.tolist():
+        perceived = recording.perceived(index)
+        if len(perceived['multi_hands']) > hand:
+            points.append(normalizer.smooth_cursors(
+                [perceived['multi_hands'][hand]], [0], perceived['timestamp'])[0])
+    return np.array(points).reshape(-1, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thư viện template trajectory gesture")
+    parser.add_argument('library', help="File template (.npz)")
+    parser.add_argument('--add', metavar='NAME', choices=TRAJECTORY_GESTURES,
+                        help="Thêm template cho gesture NAME (%(choices)s)")
+    parser.add_argument('--recording', help="Recording chứa đoạn quỹ đạo (main.py --record)")
+    parser.add_argument('--frames', type=int, nargs=2, metavar=('START', 'STOP'),
+                        help="Frame id đầu / cuối (không gồm) của đoạn quỹ đạo")
+    parser.add_argument('--hand', type=int, default=0, help="Thứ tự tay trong frame")
+    args = parser.parse_args()
+
+    try:
+        library = TemplateLibrary.load(args.library)
+    except FileNotFoundError:
+        library = TemplateLibrary()
+    if args.add:
+        if not args.recording or not args.frames:
+            parser.error("--add cần --recording và --frames")
+        trajectory = extract_trajectory(LandmarkRecording(args.recording), *args.frames,
+                                        hand=args.hand)
+        library.add(args.add, trajectory)
+        library.save(args.library)
+        print(f"Đã thêm {args.add} ({len(trajectory)} mẫu)")
+    names, counts = np.unique(library.names, return_counts=True)
+    print(f"{args.library}: {len(library)} template")
+    for name, count in zip(names.tolist(), counts.tolist()):
+        print(f"  {name:<12} {count}")
+
+
+if __name__ == "__main__":
+    main()